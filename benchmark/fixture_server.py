@@ -0,0 +1,348 @@
+"""Local stand-in for Google Maps used by the offline benchmark
+
+Serves synthetic search and place pages with the DOM structure the scraper
+targets:
+- a "Results for" feed whose cards lazy-load on scroll and end with the
+  end-of-list marker
+- the same results as Maps' search payloads: the first page embedded in
+  APP_INITIALIZATION_STATE, later pages fetched from /maps/search?tbm=map
+  as the feed scrolls (read by the scraper's 'network' mode)
+- place pages with h1.fontHeadlineLarge, the rating and reviews elements, the
+  status span, the address, phone and website buttons, the opening-hours div
+  and the Back button
+- optionally, Google's "unusual traffic" captcha instead of some place pages,
+  to exercise the scraper's pacing and driver retirement
+
+Everything is generated deterministically from the query and place ID, so
+runs are repeatable. Response latency, lazy-load delay, detail pane render
+delay, list size, photo weight and captcha rate are configurable:
+
+    python benchmark/fixture_server.py --port 8765 --results 60 --latency 50
+
+Point the scraper at it with SCRAPER_MAPS_BASE_URL=http://127.0.0.1:8765/maps.
+"""
+import argparse
+import html
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CATEGORIES = ["Coffee shop", "Bakery", "Restaurant", "Bookstore", "Gym", "Florist", "Hardware store", "Pharmacy"]
+NAME_WORDS = ["Golden", "Corner", "Blue", "Riverside", "Urban", "Maple", "Harbor", "Sunny", "Old Town", "North"]
+STREETS = ["Main St", "Oak Ave", "Market St", "Station Rd", "Park Ln", "High St", "Mill Rd", "Church St"]
+STATUSES = [("Open", "Closes 9 PM"), ("Open 24 hours", ""), ("Closed", "Opens 8 AM"), ("Open", "Closes soon")]
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Place IDs below this are shared by every keyword of a location (see FixtureConfig.overlap)
+SHARED_ID_SPACE = 1 << 20
+
+class FixtureConfig:
+    """Knobs of the fixture; times are in milliseconds"""
+
+    def __init__(self, results=60, page_size=20, latency=50, jitter=0, lazy_delay=300, render_delay=150,
+                 image_kb=0, overlap=0.0, captcha_rate=0.0):
+        self.results = results            # Cards per search before the end-of-list marker
+        self.page_size = page_size        # Cards per lazy-load batch (the first batch is in the page)
+        self.latency = latency            # Server delay before every response
+        self.jitter = jitter              # Extra random delay, 0..jitter
+        self.lazy_delay = lazy_delay      # Client delay before fetching the next batch after a scroll
+        self.render_delay = render_delay  # Client delay before the place pane is rendered
+        self.image_kb = image_kb          # Size of the photo on every card and place page (0: no photos)
+        self.overlap = overlap            # Share of each keyword's results shared with other keywords
+        self.captcha_rate = captcha_rate  # Share of place pages redirected to the captcha page
+
+def place(place_id):
+    """Synthetic business for a place ID"""
+    rng = random.Random(place_id)
+    category = rng.choice(CATEGORIES)
+    status, status_detail = rng.choice(STATUSES)
+    open_hour, close_hour = rng.randint(6, 10), rng.randint(5, 11)
+    return {
+        'id': place_id,
+        'name': f"{rng.choice(NAME_WORDS)} {category} {place_id % 10000}",
+        'category': category,
+        'rating': f"{rng.randint(30, 50) / 10:.1f}",
+        'reviews': f"{rng.randint(1, 4000):,}",
+        'status': status,
+        'status_detail': status_detail,
+        'address': f"{rng.randint(1, 999)} {rng.choice(STREETS)}",
+        'phone': f"+1 555-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+        'website': f"https://example.com/{place_id}" if rng.random() < 0.8 else "",
+        'hours': "; ".join(f"{day}, {open_hour} AM to {close_hour} PM" for day in DAYS),
+    }
+
+def search_ids(query, config):
+    """Place IDs listed for a search query, in feed order"""
+    keyword, _, location = query.partition(" in ")
+    location_seed = zlib.crc32(location.lower().encode())
+    query_seed = zlib.crc32(query.lower().encode())
+    shared = random.Random(location_seed).sample(range(1, SHARED_ID_SPACE), max(1, config.results))
+    rng = random.Random(query_seed)
+    ids = []
+    for i in range(config.results):
+        if rng.random() < config.overlap:
+            ids.append(shared[i])
+        else:
+            ids.append(SHARED_ID_SPACE + (query_seed % 100000) * 1000 + i)
+    return ids
+
+def feature_id(p):
+    return f"0x{p['id']:x}:0x{p['id'] * 7919:x}"
+
+def place_url(base_url, p):
+    feature = feature_id(p)
+    name = urllib.parse.quote_plus(p['name'])
+    return f"{base_url}/place/{name}/data=!4m7!3m6!1s{feature}!8m2!3d0!4d0!16s%2Fg%2F{p['id']}"
+
+def photo_tag(base_url, p, config):
+    if not config.image_kb:
+        return ""
+    return f'<img src="{base_url}/photo/{p["id"]}.jpg" width="80" height="80" alt="">'
+
+def card_html(base_url, p, config):
+    e = html.escape
+    status_color = "#188038" if p['status'].startswith("Open") else "#d93025"
+    return (
+        f'<div><div class="Nv2PK" jsaction="mouseover:pane.wfvdle">'
+        f'<a class="hfpxzc" aria-label="{e(p["name"])}" href="{e(place_url(base_url, p))}"></a>'
+        f'{photo_tag(base_url, p, config)}'
+        f'<div class="qBF1Pd fontHeadlineSmall">{e(p["name"])}</div>'
+        f'<span class="MW4etd">{p["rating"]}</span><span class="UY7F9">({p["reviews"]})</span>'
+        f'<div class="W4Efsd"><div class="W4Efsd"><span>{e(p["category"])} · </span><span> · {e(p["address"])}</span></div>'
+        f'<div class="W4Efsd"><span style="color: {status_color}">{e(p["status"])}</span>'
+        f'<span> · {e(p["status_detail"])}</span></div></div>'
+        f'</div></div>'
+    )
+
+def place_payload(p):
+    """A place array laid out like the entries of Maps' search payloads"""
+    entry = [None] * 179
+    entry[4] = [None] * 7 + [float(p['rating']), int(p['reviews'].replace(',', ''))]
+    entry[7] = [p['website'], p['website']] if p['website'] else None
+    entry[10] = feature_id(p)
+    entry[11] = p['name']
+    entry[13] = [p['category']]
+    hours = [[day, [hours]] for day, hours in (part.split(", ", 1) for part in p['hours'].split("; "))]
+    status = p['status'] + (f" ⋅ {p['status_detail']}" if p['status_detail'] else "")
+    entry[34] = [None, hours, None, None, [None, None, None, None, status]]
+    entry[39] = p['address']
+    entry[178] = [[p['phone']]]
+    return entry
+
+def search_payload(query, offset, limit, config):
+    """The ")]}'"-guarded JSON body of one page of search results"""
+    places = [[None] * 14 + [place_payload(place(i))] for i in search_ids(query, config)[offset:offset + limit]]
+    return ")]}'\n" + json.dumps([[query, places]])
+
+def app_state(query, config):
+    """The search page's APP_INITIALIZATION_STATE, carrying the first page of results"""
+    state = [None, None, None, [None, None, None, None, None, search_payload(query, 0, config.page_size, config)]]
+    return json.dumps(state).replace("</", "<\\/")
+
+END_OF_LIST_HTML = '<div><span class="HlvSq">You\'ve reached the end of the list.</span></div>'
+
+def cards_html(base_url, query, offset, limit, config):
+    ids = search_ids(query, config)
+    chunk = "".join(card_html(base_url, place(i), config) for i in ids[offset:offset + limit])
+    if offset + limit >= len(ids):
+        chunk += END_OF_LIST_HTML
+    return chunk
+
+SEARCH_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{query} - Google Maps</title>
+<style>body {{ margin: 0; font-family: sans-serif; }} #feed {{ height: 600px; width: 400px; overflow-y: auto; }}
+.Nv2PK {{ height: 120px; border-bottom: 1px solid #ddd; position: relative; }}
+.hfpxzc {{ position: absolute; inset: 0; }}</style></head>
+<body><div role="main"><div id="feed" role="feed" aria-label="Results for {query}">{cards}</div></div>
+<script>
+window.APP_INITIALIZATION_STATE={app_state};window.APP_FLAGS=[];
+const feed = document.getElementById('feed');
+const query = {query_json};
+let loaded = {loaded}, loading = false, done = {done};
+feed.addEventListener('scroll', () => {{
+    if (loading || done || feed.scrollTop + feed.clientHeight < feed.scrollHeight - 50) return;
+    loading = true;
+    setTimeout(() => {{
+        fetch('{base_url}/search?tbm=map&q=' + encodeURIComponent(query) + '&offset=' + loaded);
+        fetch('{base_url}/api/cards?q=' + encodeURIComponent(query) + '&offset=' + loaded)
+            .then(response => response.text())
+            .then(chunk => {{
+                feed.insertAdjacentHTML('beforeend', chunk);
+                loaded += {page_size};
+                done = chunk.includes('HlvSq');
+                loading = false;
+            }});
+    }}, {lazy_delay});
+}});
+</script></body></html>"""
+
+CAPTCHA_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Sorry...</title></head>
+<body><div>Our systems have detected unusual traffic from your computer network.</div>
+<form id="captcha-form" action="index" method="post"><input type="submit" value="Submit"></form>
+</body></html>"""
+
+PLACE_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{name} - Google Maps</title></head>
+<body><div id="pane" role="main"></div>
+<template id="place">
+<div role="main" aria-label="{name}">
+  <button aria-label="Back" jsaction="pane.place.backToList">Back</button>
+  {photo}
+  <h1 class="DUwDvf lfPIob fontHeadlineLarge">{name}</h1>
+  <div class="F7nice" jsaction="pane.rating.moreReviews"><div>{rating}</div><div>stars</div></div>
+  <button class="HHrUdb" jsaction="pane.rating.moreReviews">({reviews}) reviews</button>
+  <button class="DkEaL">{category}</button>
+  <span class="ZDu9vd">{status} · {status_detail}</span>
+  <div class="t39EBf GUrTXd" aria-label="{hours}"></div>
+  <button data-item-id="address" aria-label="Address: {address}">{address}</button>
+  {website}
+  <button data-item-id="phone:tel:{phone_digits}" data-tooltip="Copy phone number" aria-label="Phone: {phone}">{phone}</button>
+</div>
+</template>
+<script>
+setTimeout(() => {{
+    document.getElementById('pane').replaceWith(document.getElementById('place').content.cloneNode(true));
+}}, {render_delay});
+</script></body></html>"""
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    server_version = "MapsFixture/1.0"
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+    def _send(self, body, content_type="text/html; charset=utf-8", status=200):
+        config = self.server.config
+        delay = config.latency + (random.uniform(0, config.jitter) if config.jitter else 0)
+        if delay:
+            time.sleep(delay / 1000)
+        data = body if isinstance(body, bytes) else body.encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        config = self.server.config
+        base_url = self.server.base_url
+        url = urllib.parse.urlsplit(self.path)
+        path = urllib.parse.unquote_plus(url.path)
+        if url.path == "/maps/search":
+            params = urllib.parse.parse_qs(url.query)
+            offset = int(params.get('offset', ["0"])[0])
+            self._send(search_payload(params.get('q', [""])[0], offset, config.page_size, config),
+                       "application/json; charset=utf-8")
+        elif path.startswith("/maps/search/"):
+            # Viewport searches (".../search/<keyword>/@lat,lng,zoomz") get their own results per viewport
+            query, _, viewport = path[len("/maps/search/"):].strip("/").partition("/@")
+            if viewport:
+                query = f"{query} in {viewport}"
+            done = config.page_size >= config.results
+            self._send(SEARCH_PAGE.format(
+                query=html.escape(query), query_json=repr(query), base_url=base_url,
+                cards=cards_html(base_url, query, 0, config.page_size, config), app_state=app_state(query, config),
+                loaded=config.page_size, done=str(done).lower(), page_size=config.page_size,
+                lazy_delay=config.lazy_delay,
+            ))
+        elif url.path == "/maps/api/cards":
+            params = urllib.parse.parse_qs(url.query)
+            query = params.get('q', [""])[0]
+            offset = int(params.get('offset', ["0"])[0])
+            self._send(cards_html(base_url, query, offset, config.page_size, config))
+        elif path.startswith("/maps/place/") and random.random() < config.captcha_rate:
+            self.send_response(302)
+            self.send_header("Location", "/sorry/index?continue=" + urllib.parse.quote(self.path, safe=""))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif url.path == "/sorry/index":
+            self._send(CAPTCHA_PAGE, status=429)
+        elif path.startswith("/maps/place/"):
+            match = re.search(r'!1s0x([0-9a-f]+):', url.path)
+            if not match:
+                self._send("Unknown place", "text/plain", 404)
+                return
+            p = place(int(match.group(1), 16))
+            e = html.escape
+            website = (f'<a data-item-id="authority" data-tooltip="Open website" href="{e(p["website"])}">Website</a>'
+                       if p['website'] else "")
+            self._send(PLACE_PAGE.format(
+                name=e(p['name']), rating=p['rating'], reviews=p['reviews'], category=e(p['category']),
+                status=e(p['status']), status_detail=e(p['status_detail']), hours=e(p['hours']),
+                address=e(p['address']), website=website, phone=e(p['phone']),
+                phone_digits=re.sub(r'\D', '', p['phone']), photo=photo_tag(base_url, p, config),
+                render_delay=config.render_delay,
+            ))
+        elif path.startswith("/maps/photo/"):
+            self._send(random.Random(path).randbytes(config.image_kb * 1024), "image/jpeg")
+        else:
+            self._send("Not found", "text/plain", 404)
+
+class FixtureServer:
+    """The fixture HTTP server running in a background thread"""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or FixtureConfig()
+        self.httpd = ThreadingHTTPServer((host, port), FixtureHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.config = self.config
+        self.httpd.base_url = self.base_url
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/maps"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fixture-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def add_config_arguments(parser):
+    """Command-line options for FixtureConfig, shared with the benchmark harness"""
+    defaults = FixtureConfig()
+    parser.add_argument('--results', type=int, default=defaults.results, help="cards per search")
+    parser.add_argument('--page-size', type=int, default=defaults.page_size, help="cards per lazy-load batch")
+    parser.add_argument('--latency', type=int, default=defaults.latency, help="server delay per response (ms)")
+    parser.add_argument('--jitter', type=int, default=defaults.jitter, help="extra random server delay (ms)")
+    parser.add_argument('--lazy-delay', type=int, default=defaults.lazy_delay, help="feed lazy-load delay (ms)")
+    parser.add_argument('--render-delay', type=int, default=defaults.render_delay, help="place pane render delay (ms)")
+    parser.add_argument('--image-kb', type=int, default=defaults.image_kb, help="photo size per card/place (KB)")
+    parser.add_argument('--overlap', type=float, default=defaults.overlap,
+                        help="share of results shared between keywords (0..1)")
+    parser.add_argument('--captcha-rate', type=float, default=defaults.captcha_rate,
+                        help="share of place pages answered with a captcha (0..1)")
+
+def config_from_args(args):
+    return FixtureConfig(args.results, args.page_size, args.latency, args.jitter, args.lazy_delay,
+                         args.render_delay, args.image_kb, args.overlap, args.captcha_rate)
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve synthetic Google Maps pages for offline benchmarks.")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8765)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    server = FixtureServer(config_from_args(args), args.host, args.port)
+    print(f"Serving Google Maps fixture at {server.base_url} (SCRAPER_MAPS_BASE_URL={server.base_url})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Offline benchmark of the scraping engine against the local Maps fixture
+
+Starts benchmark/fixture_server.py in-process, points the scraper at it and
+runs scrape_google_maps with real Chrome drivers, without touching Google:
+
+    python benchmark/run_benchmark.py --label baseline
+    python benchmark/run_benchmark.py --mode fast --compare benchmark/results/<baseline>.json
+
+Reports items/s, per-item p50/p95 latency (one place page, from navigation
+to extraction) and time per phase, and saves everything with the fixture and
+scraper settings to benchmark/results/<timestamp>_<label>.json. With
+--compare, metrics are printed next to a saved run and the exit code is 1 if
+throughput or p95 item latency regressed by more than --tolerance.
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+import maps_scraper  # noqa: E402
+from fixture_server import FixtureServer, add_config_arguments, config_from_args  # noqa: E402
+from maps_scraper import (  # noqa: E402
+    DEFAULT_LEAN_PROFILE, DETAIL_EXTRACTORS, EXTRACTION_MODES, CheckpointStore, DriverPool, PageStats, PhaseTimer,
+    scrape_google_maps,
+)
+
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+KEYWORDS = ["coffee shop", "bakery", "bookstore", "gym", "florist", "pharmacy", "hardware store", "restaurant"]
+LOCATION = "Benchmark City"
+
+# (metric, label, higher is better) rows of the report and of --compare
+REPORT_METRICS = [
+    ('items_per_second', "items/s", True),
+    ('item_p50', "item p50 (s)", False),
+    ('item_p95', "item p95 (s)", False),
+    ('wall_seconds', "wall per run (s)", False),
+]
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCHMARK_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_once(args, keywords, pool, root):
+    """One scrape job against the fixture; returns (items, wall seconds, timer, pages)"""
+    lean = not args.full_profile
+    timer = PhaseTimer()
+    pages = PageStats('lean' if lean else 'full')
+    params = {'keywords': keywords, 'location': LOCATION, 'max_results': args.max_results, 'mode': args.mode,
+              'fields': None, 'extractor': args.extractor, 'detail_tabs': args.detail_tabs, 'lean': lean}
+    store = CheckpointStore.create(params, root=root)
+    start = time.perf_counter()
+    store = scrape_google_maps(
+        keywords, LOCATION, args.max_results, pool_size=args.pool_size, pool=pool, extractor=args.extractor,
+        mode=args.mode, detail_tabs=args.detail_tabs, cache=None, store=store, log_level=args.log_level,
+        lean=lean, pages=pages, timer=timer,
+    )
+    wall = time.perf_counter() - start
+    items = sum(1 for _ in store.iter_results())
+    store.close()
+    return items, wall, timer, pages
+
+def run_benchmark(args):
+    keywords = KEYWORDS[:args.keywords]
+    server = FixtureServer(config_from_args(args)).start()
+    maps_scraper.MAPS_BASE_URL = server.base_url
+    pool = DriverPool(args.pool_size)
+    runs, timer, pages = [], PhaseTimer(), None
+    try:
+        with tempfile.TemporaryDirectory() as root:
+            for i in range(args.warmup + args.repeat):
+                items, wall, run_timer, run_pages = run_once(args, keywords, pool, root)
+                measured = i >= args.warmup
+                print(f"{'run' if measured else 'warm-up'} {i + 1}: {items} items in {wall:.1f}s", file=sys.stderr)
+                if not measured:
+                    continue
+                runs.append({'items': items, 'wall_seconds': wall, 'items_per_second': items / wall if wall else 0.0})
+                timer.merge(run_timer)
+                if pages is None:
+                    pages = run_pages
+                else:
+                    pages.merge(run_pages)
+    finally:
+        pool.close()
+        server.stop()
+
+    phases = timer.summary()
+    item = phases.get('item', {})
+    return {
+        'label': args.label,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'config': {
+            'keywords': keywords, 'max_results': args.max_results, 'mode': args.mode, 'extractor': args.extractor,
+            'detail_tabs': args.detail_tabs, 'pool_size': args.pool_size, 'lean': not args.full_profile,
+            'warmup': args.warmup, 'repeat': args.repeat,
+            'fixture': vars(config_from_args(args)),
+        },
+        'runs': runs,
+        'items_per_second': statistics.median(r['items_per_second'] for r in runs),
+        'wall_seconds': statistics.median(r['wall_seconds'] for r in runs),
+        'item_p50': item.get('p50'),
+        'item_p95': item.get('p95'),
+        'phases': phases,
+        'counters': dict(timer.counters),
+        'pages': pages.summary() if pages else {},
+    }
+
+def print_report(result):
+    print(f"Benchmark '{result['label']}' at {result['git_commit'] or 'unknown commit'}")
+    for metric, label, _ in REPORT_METRICS:
+        value = result.get(metric)
+        print(f"  {label:<18} {'-' if value is None else f'{value:.3f}'}")
+    for name, s in result['phases'].items():
+        print(f"  phase {name:<12} {s['count']:>5}x  total {s['total']:8.2f}s  p50 {s['p50']:.3f}s  "
+              f"p95 {s['p95']:.3f}s")
+    for kind, s in result['pages'].items():
+        print(f"  {kind} pages: {s['pages']}, mean {s['mean_kb']:.0f} KB, load mean {s['mean_seconds']:.2f}s")
+
+def compare(result, baseline, tolerance):
+    """Print metric deltas against a baseline; returns the names of regressed metrics"""
+    print(f"Compared with '{baseline['label']}' ({baseline['created_at']}, {baseline['git_commit'] or 'unknown'})")
+    regressions = []
+    for metric, label, higher_is_better in REPORT_METRICS:
+        before, after = baseline.get(metric), result.get(metric)
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        worse = -change if higher_is_better else change
+        flag = "  REGRESSION" if worse > tolerance else ""
+        print(f"  {label:<18} {before:10.3f} -> {after:10.3f}  ({change:+.1%}){flag}")
+        if flag and metric in ('items_per_second', 'item_p95'):
+            regressions.append(metric)
+    for name, s in result['phases'].items():
+        before = baseline.get('phases', {}).get(name)
+        if before and before['total']:
+            print(f"  phase {name:<12} {before['total']:8.2f}s -> {s['total']:8.2f}s "
+                  f"({(s['total'] - before['total']) / before['total']:+.1%})")
+    return regressions
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the scraper offline against a local Maps fixture.")
+    parser.add_argument('--label', default='run', help="name stored with the results (default run)")
+    parser.add_argument('--keywords', type=int, default=2, choices=range(1, len(KEYWORDS) + 1), metavar='N',
+                        help=f"keywords per job, 1-{len(KEYWORDS)} (default 2)")
+    parser.add_argument('-n', '--max-results', type=int, default=20, help="max results per keyword (default 20)")
+    parser.add_argument('--mode', choices=EXTRACTION_MODES, default='full')
+    parser.add_argument('--extractor', choices=list(DETAIL_EXTRACTORS), default='js')
+    parser.add_argument('--detail-tabs', type=int, default=1)
+    parser.add_argument('-p', '--pool-size', type=int, default=1, help="parallel browsers (default 1)")
+    parser.add_argument('--full-profile', action='store_true', default=not DEFAULT_LEAN_PROFILE)
+    parser.add_argument('--warmup', type=int, default=1, help="unmeasured runs first, e.g. to start Chrome")
+    parser.add_argument('--repeat', type=int, default=3, help="measured runs (default 3)")
+    parser.add_argument('--compare', metavar='RESULT_JSON', help="saved result to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help="relative slowdown counted as a regression (default 0.10)")
+    parser.add_argument('--output-dir', default=RESULTS_DIR)
+    parser.add_argument('--no-save', action='store_true', help="do not write the result JSON")
+    parser.add_argument('-v', '--verbose', action='store_const', dest='log_level', const=logging.INFO,
+                        default=logging.WARNING, help="show the scraper's job log")
+    fixture = parser.add_argument_group("fixture")
+    add_config_arguments(fixture)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.repeat < 1:
+        build_parser().error("--repeat must be at least 1")
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as handle:
+            baseline = json.load(handle)
+
+    result = run_benchmark(args)
+    print_report(result)
+    if not args.no_save:
+        os.makedirs(args.output_dir, exist_ok=True)
+        path = os.path.join(args.output_dir, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{args.label}.json")
+        with open(path, 'w', encoding='utf-8') as handle:
+            json.dump(result, handle, indent=2)
+        print(f"Saved {path}")
+    if baseline and compare(result, baseline, args.tolerance):
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,3394 @@
+"""Google Maps scraping engine
+
+Everything needed to run a scrape without Streamlit: the Chrome driver pool,
+event-driven waits, field extraction, the result cache, cross-keyword dedup
+and checkpointed result storage. The Streamlit UI (streamlit_app.py) and the
+batch CLI (scrape_cli.py) both drive it through scrape_google_maps() and a
+ProgressReporter.
+"""
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException, WebDriverException
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import Counter, deque
+from contextlib import contextmanager
+import base64
+import csv
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import sys
+import uuid
+import random
+import threading
+import time
+import urllib.parse
+import zlib
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import psutil
+except ImportError:  # Optional: without it, drivers are only recycled by page-load count
+    psutil = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Optional: only needed for Parquet export
+    pyarrow = None
+
+try:
+    import lxml.html
+    from lxml.cssselect import CSSSelector
+except ImportError:  # Optional: only needed to re-extract page snapshots offline
+    lxml = None
+
+# Number of Chrome instances scraping keywords in parallel (the UI slider starts here)
+DEFAULT_POOL_SIZE = int(os.environ.get("SCRAPER_POOL_SIZE", "1"))
+MAX_POOL_SIZE = max(2, DEFAULT_POOL_SIZE, int(os.environ.get("SCRAPER_MAX_POOL_SIZE", str(os.cpu_count() or 4))))
+
+# Pooled drivers are recycled after this many page loads or once Chrome's RSS passes the limit
+DEFAULT_MAX_PAGE_LOADS = int(os.environ.get("SCRAPER_MAX_PAGE_LOADS", "300"))
+DEFAULT_MAX_RSS_MB = int(os.environ.get("SCRAPER_MAX_RSS_MB", "1500"))
+
+# Job logs are kept in a bounded ring buffer that front ends can display
+LOG_BUFFER_LINES = int(os.environ.get("SCRAPER_LOG_BUFFER_LINES", "2000"))
+LOG_JSONL_FILE = "log.jsonl"
+
+logger = logging.getLogger("maps_scraper")
+
+class RingBufferHandler(logging.Handler):
+    """Keep the last `capacity` formatted log lines in memory
+
+    `version` increases with every record, so readers can tell whether
+    anything changed since their last snapshot without copying the buffer.
+    """
+    
+    def __init__(self, capacity=LOG_BUFFER_LINES):
+        super().__init__()
+        self.lines = deque(maxlen=capacity)
+        self.version = 0
+    
+    def emit(self, record):
+        try:
+            line = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        # handle() already holds self.lock here
+        self.lines.append(line)
+        self.version += 1
+    
+    def snapshot(self, tail=None):
+        """(version, text of the last `tail` lines)"""
+        self.acquire()
+        try:
+            lines = list(self.lines)
+            version = self.version
+        finally:
+            self.release()
+        if tail:
+            lines = lines[-tail:]
+        return version, "\n".join(lines)
+
+class JsonlLogHandler(logging.Handler):
+    """Append one JSON object per log record to a file"""
+    
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+    
+    def emit(self, record):
+        try:
+            entry = {
+                'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+                'level': record.levelname,
+                'message': record.getMessage().strip(),
+            }
+            for name in ('job_id', 'keyword'):
+                value = getattr(record, name, None)
+                if value is not None:
+                    entry[name] = value
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+        except Exception:
+            self.handleError(record)
+    
+    def close(self):
+        self.acquire()
+        try:
+            self._file.close()
+        finally:
+            self.release()
+        super().close()
+
+class ScrapeLog(logging.LoggerAdapter):
+    """The `log` object passed through the scraper
+
+    Calling it logs at INFO, so `log("...")` reads like a plain print. Per-item
+    lines use `log.debug("... %s", value)`: with verbose logging off they are
+    dropped before the message is ever formatted.
+    """
+    
+    def __call__(self, message, *args):
+        self.info(message, *args)
+    
+    def process(self, msg, kwargs):
+        kwargs['extra'] = dict(self.extra, **kwargs.get('extra', {}))
+        prefix = self.extra.get('prefix')
+        if prefix:
+            msg = f"{prefix} {msg}"
+        return msg, kwargs
+    
+    def for_keyword(self, keyword, prefixed=True):
+        """Adapter tagging records with the keyword (and a [keyword] prefix when keywords run in parallel)"""
+        return ScrapeLog(self.logger, dict(self.extra, keyword=keyword, prefix=f"[{keyword}]" if prefixed else None))
+
+def create_job_logger(job_id, level=logging.INFO, jsonl_path=None):
+    """Logger for one job writing to the console, a ring buffer and optionally a JSONL file
+
+    Returns (log, ring buffer). The logger is not registered with the logging
+    module, so it and its buffer are freed with the job.
+    """
+    job_logger = logging.Logger(f"{logger.name}.{job_id}", level)
+    formatter = logging.Formatter("%(message)s")
+    buffer = RingBufferHandler()
+    # stderr keeps stdout free for results when the batch CLI streams them there
+    console = logging.StreamHandler(sys.stderr)
+    for handler in (buffer, console):
+        handler.setFormatter(formatter)
+        job_logger.addHandler(handler)
+    if jsonl_path:
+        job_logger.addHandler(JsonlLogHandler(jsonl_path))
+    return ScrapeLog(job_logger, {'job_id': job_id}), buffer
+
+def close_job_logger(log):
+    for handler in list(log.logger.handlers):
+        log.logger.removeHandler(handler)
+        handler.close()
+
+# Base URL of Google Maps; the offline benchmark points it at its fixture server
+MAPS_BASE_URL = os.environ.get("SCRAPER_MAPS_BASE_URL", "https://www.google.com/maps").rstrip('/')
+
+# Lean browsing profile: the scraper only reads text and attributes, so images,
+# media, fonts and map tiles are never downloaded and the viewport stays small
+DEFAULT_LEAN_PROFILE = os.environ.get("SCRAPER_LEAN_PROFILE", "1") == "1"
+LEAN_WINDOW_SIZE = (1280, 900)
+LEAN_CHROME_PREFS = {
+    'profile.managed_default_content_settings.images': 2,
+    'profile.default_content_setting_values.notifications': 2,
+    'profile.default_content_setting_values.geolocation': 2,
+}
+# Chrome DevTools URL patterns ('*' wildcards) blocked on every tab of a lean driver
+LEAN_BLOCKED_URLS = [
+    # Images and photos
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.ico", "*.bmp",
+    "*.googleusercontent.com/*", "*.ggpht.com/*",
+    # Media
+    "*.mp4", "*.webm", "*.mp3", "*.m4a",
+    # Fonts
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*fonts.gstatic.com/*", "*fonts.googleapis.com/*",
+    # Map tiles, satellite imagery and Street View
+    "*/maps/vt?*", "*/maps/vt/*", "*/kh/v=*", "*khms*.google.com/*", "*streetviewpixels*", "*/maps/preview/photo*",
+]
+
+def apply_lean_profile(driver):
+    """Block LEAN_BLOCKED_URLS in the driver's current tab (DevTools blocking is per tab)"""
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': LEAN_BLOCKED_URLS})
+
+def setup_driver(lean=False, capture=False):
+    """Setup Chrome driver with options
+
+    capture turns on Chrome's performance log with network events, which
+    NetworkCapture reads to decode Maps' search payloads.
+    """
+    chrome_options = Options()
+    chrome_options.add_argument('--headless')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+    chrome_options.add_argument('--log-level=3')
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    if lean:
+        chrome_options.add_argument('--window-size=%d,%d' % LEAN_WINDOW_SIZE)
+        chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+        chrome_options.add_experimental_option('prefs', LEAN_CHROME_PREFS)
+    if capture:
+        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        chrome_options.add_experimental_option('perfLoggingPrefs', {'enableNetwork': True, 'enablePage': False})
+    
+    driver = webdriver.Chrome(options=chrome_options)
+    driver.lean = lean
+    driver.capture = capture
+    if lean:
+        apply_lean_profile(driver)
+    else:
+        driver.maximize_window()
+    return driver
+
+# Selectors shared by the scraper and the wait engine
+RESULTS_CONTAINER_XPATH = '//div[contains(@aria-label, "Results for")]'
+RESULTS_ITEM_XPATH = '//div[contains(@aria-label, "Results for")]/div/div[./a]'
+DETAIL_NAME_SELECTOR = "h1.fontHeadlineLarge"
+# Place link of each result card; its href opens the place's detail page directly
+PLACE_LINK_SELECTOR = "a.hfpxzc"
+# Maps appends this marker to the feed once no more results will load
+END_OF_LIST_SELECTOR = "span.HlvSq"
+END_OF_LIST_TEXT = "reached the end of the list"
+
+FEED_STATE_JS = """
+const [feedXPath, cardXPath, endSelector, endText] = arguments;
+const feed = document.evaluate(feedXPath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+const cards = document.evaluate(cardXPath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+let end = !!document.querySelector(endSelector);
+if (!end && feed && feed.lastElementChild) {
+    end = (feed.lastElementChild.innerText || '').includes(endText);
+}
+return {count: cards.snapshotLength, end: end};
+"""
+
+# Timeout (seconds) for each event-driven wait. A wait returns as soon as its DOM
+# signal appears, so these are upper bounds, not fixed delays.
+DEFAULT_WAIT_TIMEOUTS = {
+    'results_feed': 20,   # "Results for" feed appears after a search navigation
+    'feed_growth': 8,     # feed child count grows after a scroll
+    'detail_pane': 10,    # detail h1 switches to a new business name after opening a place
+}
+
+# The fixed sleeps each wait replaced, used to report how much idle time was saved
+FIXED_SLEEP_BASELINE = {
+    'results_feed': 15,
+    'feed_growth': 5,
+    'detail_pane': 7,     # 5s after the click plus 2s after Back
+}
+
+class WaitEngine:
+    """Wait for concrete Google Maps DOM signals and record per-wait latency"""
+
+    def __init__(self, driver, timeouts=None, poll_frequency=0.2):
+        self.driver = driver
+        self.timeouts = dict(DEFAULT_WAIT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.poll_frequency = poll_frequency
+        self.latencies = {name: [] for name in self.timeouts}
+        self.timeouts_hit = {name: 0 for name in self.timeouts}
+
+    def _wait(self, name, condition):
+        """Run a WebDriverWait under the named timeout, recording how long it took"""
+        start = time.perf_counter()
+        try:
+            return WebDriverWait(
+                self.driver,
+                self.timeouts[name],
+                poll_frequency=self.poll_frequency,
+                ignored_exceptions=(NoSuchElementException, StaleElementReferenceException),
+            ).until(condition)
+        except TimeoutException:
+            self.timeouts_hit[name] += 1
+            raise
+        finally:
+            self.latencies[name].append(time.perf_counter() - start)
+
+    def results_feed(self):
+        """Wait for the "Results for" feed after navigating to a search URL"""
+        return self._wait('results_feed', EC.presence_of_element_located((By.XPATH, RESULTS_CONTAINER_XPATH)))
+
+    def feed_growth(self, previous_count):
+        """Wait until the feed holds more than previous_count cards or shows the end-of-list marker
+
+        Returns {'count': ..., 'end': ...} for the feed at that moment.
+        """
+        def grown(driver):
+            state = driver.execute_script(FEED_STATE_JS, RESULTS_CONTAINER_XPATH, RESULTS_ITEM_XPATH,
+                                          END_OF_LIST_SELECTOR, END_OF_LIST_TEXT)
+            return state if state['count'] > previous_count or state['end'] else False
+        return self._wait('feed_growth', grown)
+
+    def detail_pane(self, previous_heading=None):
+        """Wait until a new detail h1 shows a business name
+
+        previous_heading is the h1 element the tab showed before navigating.
+        Readiness means a different element, so a place named like the
+        previous one (a chain store) is not mistaken for the old page.
+        """
+        def heading_replaced(driver):
+            heading = driver.find_element(By.CSS_SELECTOR, DETAIL_NAME_SELECTOR)
+            if previous_heading is not None and heading == previous_heading:
+                return False
+            return heading.text or False
+        return self._wait('detail_pane', heading_replaced)
+
+    def merge(self, other):
+        """Fold another engine's samples into this one (used to aggregate pool workers)"""
+        for name, samples in other.latencies.items():
+            self.latencies.setdefault(name, []).extend(samples)
+            self.timeouts_hit[name] = self.timeouts_hit.get(name, 0) + other.timeouts_hit.get(name, 0)
+
+    def summary(self):
+        """Per-wait count, total/mean/max latency, timeouts and time saved vs fixed sleeps"""
+        stats = {}
+        for name, samples in self.latencies.items():
+            if not samples:
+                continue
+            total = sum(samples)
+            stats[name] = {
+                'count': len(samples),
+                'total': total,
+                'mean': total / len(samples),
+                'max': max(samples),
+                'timeouts': self.timeouts_hit[name],
+                'saved': FIXED_SLEEP_BASELINE.get(name, 0) * len(samples) - total,
+            }
+        return stats
+
+def log_wait_summary(waits, log, prefix="[WAIT]"):
+    """Log per-wait latency and the idle time saved compared to the old fixed sleeps"""
+    stats = waits.summary()
+    total_saved = 0
+    for name, s in stats.items():
+        total_saved += s['saved']
+        log(f"{prefix} {name}: {s['count']} waits, mean {s['mean']:.2f}s, max {s['max']:.2f}s, "
+            f"timeouts {s['timeouts']}, saved {s['saved']:.1f}s vs fixed sleeps")
+    if stats:
+        log(f"{prefix} Total idle time saved vs fixed sleeps: {total_saved:.1f}s")
+
+# Bytes transferred and load time of the current page, from the Resource Timing API.
+# Cross-origin responses without Timing-Allow-Origin report no size and are counted as opaque.
+PAGE_METRICS_JS = """
+const nav = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+let bytes = nav ? nav.transferSize : 0, opaque = 0;
+for (const r of resources) {
+    if (r.transferSize) bytes += r.transferSize;
+    else if (!r.encodedBodySize) opaque++;
+}
+const load = nav && nav.loadEventEnd ? nav.loadEventEnd : performance.now();
+return {bytes: bytes, seconds: load / 1000, requests: resources.length + 1, opaque: opaque};
+"""
+
+class PageStats:
+    """Per-page bytes transferred and load time, grouped by page kind ('search', 'detail')"""
+
+    def __init__(self, profile='lean'):
+        self.profile = profile
+        self.pages = {}
+
+    def record(self, driver, kind):
+        """Sample the current page; metrics are best effort and never fail the scrape"""
+        try:
+            metrics = driver.execute_script(PAGE_METRICS_JS)
+        except Exception:
+            return None
+        self.pages.setdefault(kind, []).append(metrics)
+        return metrics
+
+    def merge(self, other):
+        for kind, samples in other.pages.items():
+            self.pages.setdefault(kind, []).extend(samples)
+
+    def summary(self):
+        """Per-kind page count, mean/total KB, mean/max load seconds and opaque request share"""
+        stats = {}
+        for kind, samples in self.pages.items():
+            if not samples:
+                continue
+            total_kb = sum(m['bytes'] for m in samples) / 1024
+            seconds = [m['seconds'] for m in samples]
+            requests = sum(m['requests'] for m in samples)
+            stats[kind] = {
+                'pages': len(samples),
+                'total_kb': total_kb,
+                'mean_kb': total_kb / len(samples),
+                'mean_seconds': sum(seconds) / len(seconds),
+                'max_seconds': max(seconds),
+                'opaque_share': sum(m['opaque'] for m in samples) / requests if requests else 0.0,
+            }
+        return stats
+
+def log_page_summary(pages, log, prefix="[NET]"):
+    """Log bytes and load time per page kind for the job's browsing profile"""
+    for kind, s in pages.summary().items():
+        log(f"{prefix} {kind} pages ({pages.profile} profile): {s['pages']} pages, mean {s['mean_kb']:.0f} KB, "
+            f"total {s['total_kb'] / 1024:.1f} MB, load mean {s['mean_seconds']:.2f}s / max {s['max_seconds']:.2f}s, "
+            f"{s['opaque_share']:.0%} requests without size info")
+
+def percentile(samples, q):
+    """Nearest-rank percentile (q in 0..1) of a non-empty list"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+# Quantiles come from each phase's most recent samples; counts and totals are exact
+PHASE_SAMPLE_LIMIT = int(os.environ.get("SCRAPER_PHASE_SAMPLE_LIMIT", "10000"))
+
+class PhaseTimer:
+    """Wall-clock durations per scrape phase, plus event counters
+
+    Phases are 'driver' (getting a ready browser from the pool), 'keyword' (a
+    whole keyword) or 'tile' (one tile search of a tiled keyword), 'pacing'
+    (waiting for the Pacer before a page load), 'search' (search page until
+    the feed shows), split into 'navigate' and 'feed_wait', 'scroll' (the
+    scroll phase) and 'scroll_step' (each scroll), 'cards' (fast and network
+    mode card parsing), 'payloads' (network mode payload capture and
+    decoding), 'details' (all place pages of a keyword), 'item' (one place
+    page, from the start of its navigation until it is extracted),
+    'detail_wait', 'extract' (one item's field extraction) and 'snapshot'
+    (saving its page snapshot).
+
+    Counters are events such as 'items_extracted', 'items_retried',
+    'items_skipped', 'fields_missing', 'stale_elements', 'wait_timeouts',
+    'scroll_stalls', 'tiles_searched', 'tiles_split', 'keywords_failed',
+    'payload_places', 'payload_misses', 'pacing_backoffs', 'interstitials',
+    'searches_retried' and 'snapshots_failed'. The timer is thread-safe, so a
+    metrics endpoint can read it while a job merges into it.
+    """
+
+    def __init__(self, sample_limit=PHASE_SAMPLE_LIMIT):
+        self.sample_limit = sample_limit
+        self.samples = {}
+        self.totals = {}  # phase -> [count, total seconds, max seconds]
+        self.counters = Counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        with self._lock:
+            self._add(name, [seconds], [1, seconds, seconds])
+
+    def _add(self, name, samples, totals):
+        self.samples.setdefault(name, deque(maxlen=self.sample_limit)).extend(samples)
+        current = self.totals.setdefault(name, [0, 0.0, 0.0])
+        current[0] += totals[0]
+        current[1] += totals[1]
+        current[2] = max(current[2], totals[2])
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def merge(self, other):
+        with other._lock:
+            samples = {name: list(values) for name, values in other.samples.items()}
+            totals = {name: list(values) for name, values in other.totals.items()}
+            counters = Counter(other.counters)
+        with self._lock:
+            for name, values in samples.items():
+                self._add(name, values, totals[name])
+            self.counters.update(counters)
+
+    def summary(self):
+        """Per-phase count, total, mean, p50, p95 and max seconds"""
+        with self._lock:
+            samples = {name: list(values) for name, values in self.samples.items() if values}
+            totals = {name: list(values) for name, values in self.totals.items()}
+        return {
+            name: {
+                'count': totals[name][0],
+                'total': totals[name][1],
+                'mean': totals[name][1] / totals[name][0],
+                'p50': percentile(values, 0.5),
+                'p95': percentile(values, 0.95),
+                'max': totals[name][2],
+            }
+            for name, values in samples.items()
+        }
+
+    def snapshot(self):
+        """JSON-ready phases and counters"""
+        with self._lock:
+            counters = dict(self.counters)
+        return {'phases': self.summary(), 'counters': counters}
+
+def log_phase_summary(timer, log, prefix="[PHASE]"):
+    """Log count, total and p50/p95 duration of each phase, then the event counters"""
+    snapshot = timer.snapshot()
+    for name, s in snapshot['phases'].items():
+        log(f"{prefix} {name}: {s['count']}x, total {s['total']:.1f}s, p50 {s['p50']:.2f}s, "
+            f"p95 {s['p95']:.2f}s, max {s['max']:.2f}s")
+    if snapshot['counters']:
+        log(f"{prefix} Events: " + ", ".join(f"{name} {n}" for name, n in sorted(snapshot['counters'].items())))
+
+# Pacing: page loads of a job are spaced by a delay that adapts to how Maps responds
+PACING_MIN_DELAY = float(os.environ.get("SCRAPER_PACING_MIN_DELAY", "0"))
+PACING_MAX_DELAY = float(os.environ.get("SCRAPER_PACING_MAX_DELAY", "60"))
+PACING_FAILURE_DELAY = 1.0   # Smallest delay after a failed page
+PACING_BLOCKED_DELAY = 15.0  # Smallest delay (and job-wide pause) after an interstitial page
+PACING_SLOW_FACTOR = 2.0     # Page latency above this multiple of the baseline counts as slow
+PACING_SLOW_STEP = 0.25      # Delay added per slow page
+PACING_DECAY = 0.85          # Delay multiplier per fast page
+PACING_JITTER = 0.5          # Each sleep is the delay times 1 +/- this
+# Searches that hit an interstitial or a browser failure are retried on another driver
+SEARCH_MAX_ATTEMPTS = int(os.environ.get("SCRAPER_SEARCH_MAX_ATTEMPTS", "3"))
+# Drivers are retired once their recent page success rate drops below this
+DRIVER_MIN_SUCCESS_RATE = float(os.environ.get("SCRAPER_DRIVER_MIN_SUCCESS_RATE", "0.6"))
+DRIVER_HEALTH_WINDOW = 20      # Recent page outcomes kept per driver
+DRIVER_HEALTH_MIN_SAMPLES = 8  # Outcomes needed before the success rate is judged
+
+# Google's consent wall, its "unusual traffic" captcha and similar pages shown instead of Maps
+INTERSTITIAL_JS = """
+const url = location.href;
+if (/consent\\.google\\./.test(url) || document.querySelector('form[action*="consent.google"]')) return 'consent';
+if (url.includes('/sorry/') || document.querySelector('#captcha-form, iframe[src*="recaptcha"]')) return 'captcha';
+const text = document.body ? document.body.innerText.slice(0, 3000) : '';
+if (/unusual traffic|automated queries/i.test(text)) return 'blocked';
+return null;
+"""
+
+class InterstitialPage(Exception):
+    """Raised when a consent, captcha or block page is shown instead of Maps"""
+
+    def __init__(self, kind, url=None):
+        super().__init__(f"{kind} page at {url}" if url else f"{kind} page")
+        self.kind = kind
+        self.url = url
+
+def detect_interstitial(driver):
+    """'consent', 'captcha' or 'blocked' if the current tab shows such a page, else None"""
+    try:
+        return driver.execute_script(INTERSTITIAL_JS)
+    except WebDriverException:
+        return None
+
+def check_interstitial(driver):
+    """Raise InterstitialPage if the current tab is not showing Maps"""
+    kind = detect_interstitial(driver)
+    if kind:
+        raise InterstitialPage(kind, driver.current_url)
+
+class DriverHealth:
+    """Success rate and latency of a driver's recent page loads"""
+
+    def __init__(self, window=DRIVER_HEALTH_WINDOW):
+        self.outcomes = deque(maxlen=window)  # (ok, seconds or None)
+        self.interstitials = 0
+
+    def record(self, ok, seconds=None):
+        self.outcomes.append((ok, seconds))
+
+    def success_rate(self):
+        if not self.outcomes:
+            return 1.0
+        return sum(1 for ok, _ in self.outcomes if ok) / len(self.outcomes)
+
+    def retire_reason(self):
+        """Why the driver should be replaced, or None if it is healthy"""
+        if self.interstitials:
+            return f"{self.interstitials} interstitial page(s)"
+        if len(self.outcomes) >= DRIVER_HEALTH_MIN_SAMPLES and self.success_rate() < DRIVER_MIN_SUCCESS_RATE:
+            return f"success rate {self.success_rate():.0%} over its last {len(self.outcomes)} pages"
+        return None
+
+class Pacer:
+    """Job-wide delay between page loads, adapted to how Maps is responding
+
+    Workers call wait() before every navigation and report each page with
+    success(seconds), failure() or blocked(). Failures double the delay and an
+    interstitial page quadruples it and pauses every worker for that long;
+    pages slower than PACING_SLOW_FACTOR times the baseline latency (the
+    lowest smoothed latency seen) add a small step, and fast pages shrink the
+    delay again. Sleeps are jittered so workers do not load pages in lockstep.
+    """
+
+    def __init__(self, min_delay=PACING_MIN_DELAY, max_delay=PACING_MAX_DELAY):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.delay = min_delay
+        self.latency = None   # Smoothed page latency
+        self.baseline = None  # Lowest smoothed latency seen
+        self.pause_until = 0.0
+        self.pages = 0
+        self.backoffs = 0
+        self.slept = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self, cancel=None):
+        """Sleep for the current delay (with jitter) and any job-wide pause; returns seconds slept"""
+        with self._lock:
+            seconds = self.delay * random.uniform(1 - PACING_JITTER, 1 + PACING_JITTER) if self.delay else 0.0
+            seconds = max(seconds, self.pause_until - time.monotonic())
+        if seconds <= 0:
+            return 0.0
+        if cancel is not None:
+            cancel.wait(seconds)
+        else:
+            time.sleep(seconds)
+        with self._lock:
+            self.slept += seconds
+        return seconds
+
+    def _back_off(self, factor, floor):
+        self.delay = min(self.max_delay, max(self.delay * factor, floor))
+        self.backoffs += 1
+
+    def success(self, seconds):
+        with self._lock:
+            self.pages += 1
+            self.latency = seconds if self.latency is None else 0.8 * self.latency + 0.2 * seconds
+            if self.pages >= 5:
+                self.baseline = self.latency if self.baseline is None else min(self.baseline, self.latency)
+            if self.baseline and self.latency > PACING_SLOW_FACTOR * self.baseline:
+                self.delay = min(self.max_delay, self.delay + PACING_SLOW_STEP)
+            else:
+                self.delay = max(self.min_delay, self.delay * PACING_DECAY)
+                if self.delay < 0.05:
+                    self.delay = self.min_delay
+
+    def failure(self):
+        with self._lock:
+            self.pages += 1
+            self._back_off(2, PACING_FAILURE_DELAY)
+
+    def blocked(self):
+        with self._lock:
+            self.pages += 1
+            self._back_off(4, PACING_BLOCKED_DELAY)
+            self.pause_until = max(self.pause_until, time.monotonic() + self.delay)
+
+    def stats(self):
+        with self._lock:
+            return {'delay': self.delay, 'latency': self.latency, 'baseline': self.baseline,
+                    'pages': self.pages, 'backoffs': self.backoffs, 'slept': self.slept}
+
+def log_pacing_summary(pacer, log, prefix="[PACING]"):
+    s = pacer.stats()
+    if not s['pages']:
+        return
+    latency = f"{s['latency']:.2f}s" if s['latency'] is not None else "-"
+    baseline = f"{s['baseline']:.2f}s" if s['baseline'] is not None else "-"
+    log(f"{prefix} Pacing: {s['pages']} pages, final delay {s['delay']:.2f}s, latency {latency} "
+        f"(baseline {baseline}), {s['backoffs']} backoffs, {s['slept']:.1f}s spent waiting")
+
+def report_page(driver, pacer, ok, seconds=None, timer=None):
+    """Record one page's outcome in the driver's health and the job's pacer"""
+    health = getattr(driver, 'health', None)
+    if health is not None:
+        health.record(ok, seconds)
+    if pacer is not None:
+        if ok:
+            pacer.success(seconds)
+        else:
+            pacer.failure()
+            if timer is not None:
+                timer.count('pacing_backoffs')
+
+def report_interstitial(driver, pacer):
+    """A page was replaced by an interstitial: mark the driver for retirement and pause the job"""
+    health = getattr(driver, 'health', None)
+    if health is not None:
+        health.interstitials += 1
+    if pacer is not None:
+        pacer.blocked()
+
+def pace(pacer, cancel=None, timer=None):
+    """Wait for the pacer before a navigation, recording the sleep as the 'pacing' phase"""
+    if pacer is None:
+        return
+    slept = pacer.wait(cancel)
+    if slept and timer is not None:
+        timer.record('pacing', slept)
+
+class DriverPool:
+    """Bounded pool of Chrome drivers shared by scraping worker threads
+
+    Drivers are health-checked before reuse, reset (cookies and extra tabs) when
+    handed to a new job, and recycled after max_page_loads navigations or once
+    the Chrome process tree grows past max_rss_mb. A driver started with a
+    different browsing profile (lean or full) or network capture setting than
+    requested is replaced, and so is a driver whose DriverHealth says it is
+    being blocked or failing too often.
+    """
+
+    def __init__(self, size, factory=setup_driver, max_page_loads=None, max_rss_mb=None):
+        self.size = max(1, size)
+        self.factory = factory
+        self.max_page_loads = max_page_loads if max_page_loads is not None else DEFAULT_MAX_PAGE_LOADS
+        self.max_rss_mb = max_rss_mb if max_rss_mb is not None else DEFAULT_MAX_RSS_MB
+        self._idle = deque()
+        self._drivers = []
+        self._starting = 0
+        self._lock = threading.Lock()
+        # Waiters for a driver are woken on every release and discard: a freed
+        # slot lets them start a replacement
+        self._available = threading.Condition(self._lock)
+        self.started = 0
+        self.recycled = 0
+
+    def _start_driver(self, lean=False, capture=False):
+        """Start a driver in a slot reserved by acquire()"""
+        try:
+            driver = self.factory(lean, capture)
+            driver.lean = lean
+            driver.capture = capture
+            driver.page_loads = 0
+            driver.health = DriverHealth()
+            with self._lock:
+                self._drivers.append(driver)
+                self.started += 1
+        finally:
+            with self._lock:
+                self._starting -= 1
+                self._available.notify()  # If Chrome failed to start, the slot is free again
+        return driver
+
+    def _take(self, cancel=None):
+        """An idle driver, or None after reserving a slot for a new one; waits while the pool is full
+
+        Raises JobCancelled if the cancel event is set while waiting.
+        """
+        with self._available:
+            while True:
+                if self._idle:
+                    return self._idle.popleft()
+                if len(self._drivers) + self._starting < self.size:
+                    self._starting += 1  # Reserve the slot while Chrome starts
+                    return None
+                if cancel is not None and cancel.is_set():
+                    raise JobCancelled()
+                self._available.wait(timeout=0.5)
+
+    def recycle_reason(self, driver):
+        """Why an idle driver should not be reused, or None if it is healthy"""
+        try:
+            driver.window_handles  # Cheap round trip that fails once Chrome is gone
+        except Exception as e:
+            return f"health check failed: {type(e).__name__}"
+        if self.max_page_loads and getattr(driver, 'page_loads', 0) >= self.max_page_loads:
+            return f"{driver.page_loads} page loads (limit {self.max_page_loads})"
+        rss_mb = driver_rss_mb(driver)
+        if self.max_rss_mb and rss_mb is not None and rss_mb >= self.max_rss_mb:
+            return f"RSS {rss_mb:.0f} MB (limit {self.max_rss_mb} MB)"
+        health = getattr(driver, 'health', None)
+        return health.retire_reason() if health is not None else None
+
+    def _reset(self, driver):
+        """Close extra tabs and clear cookies so a job starts from a clean session"""
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        try:
+            driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+        except Exception:
+            driver.delete_all_cookies()  # Only clears the current domain
+        driver.get("about:blank")
+
+    def acquire(self, job_id=None, lean=False, capture=False, cancel=None):
+        """Return a healthy driver, reusing a warm one or starting a new one under the size limit
+
+        While the pool is full this waits for a release; setting the cancel
+        event stops the wait with JobCancelled.
+        """
+        while True:
+            driver = self._take(cancel)
+            if driver is None:
+                driver = self._start_driver(lean, capture)
+                driver.job_id = job_id
+                return driver
+            reason = self.recycle_reason(driver)
+            if reason is None and getattr(driver, 'lean', False) != lean:
+                reason = f"switching to the {'lean' if lean else 'full'} browsing profile"
+            if reason is None and getattr(driver, 'capture', False) != capture:
+                reason = f"{'enabling' if capture else 'disabling'} network capture"
+            if reason is None and getattr(driver, 'job_id', None) != job_id:
+                try:
+                    self._reset(driver)
+                except Exception as e:
+                    reason = f"reset failed: {type(e).__name__}"
+            if reason:
+                logger.warning("[POOL] Recycling driver: %s", reason)
+                self.discard(driver)
+                continue
+            driver.job_id = job_id
+            return driver
+
+    def release(self, driver):
+        with self._available:
+            self._idle.append(driver)
+            self._available.notify()
+
+    def discard(self, driver):
+        """Quit a driver and free its slot"""
+        with self._available:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+                self.recycled += 1
+            self._available.notify()
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    @contextmanager
+    def driver(self, job_id=None, lean=False, capture=False, cancel=None):
+        """Lend a driver for a with block; it always goes back to the pool, or is
+        quit if the browser failed or is being blocked"""
+        driver = self.acquire(job_id, lean, capture, cancel)
+        broken = False
+        try:
+            yield driver
+        except (WebDriverException, InterstitialPage) as e:
+            # Don't hand a failed or blocked browser to the next keyword
+            broken = True
+            if isinstance(e, InterstitialPage):
+                logger.warning("[POOL] Retiring driver: %s", e)
+            raise
+        finally:
+            # Any other exception (e.g. JobCancelled) still returns the driver
+            if broken:
+                self.discard(driver)
+            else:
+                self.release(driver)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'running': len(self._drivers),
+                'idle': len(self._idle),
+                'started': self.started,
+                'recycled': self.recycled,
+            }
+
+    def close(self):
+        """Quit every driver the pool has started"""
+        with self._available:
+            drivers, self._drivers = self._drivers, []
+            self._idle.clear()
+            self._available.notify_all()
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        return len(drivers)
+
+def driver_rss_mb(driver):
+    """Resident memory of chromedriver and its Chrome children in MB, or None if unknown"""
+    if psutil is None:
+        return None
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        processes = [root] + root.children(recursive=True)
+    except (AttributeError, psutil.Error):
+        return None
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:
+            pass
+    return total / (1024 * 1024)
+
+def navigate(driver, url):
+    """driver.get() that counts page loads so pooled drivers can be recycled"""
+    driver.get(url)
+    driver.page_loads = getattr(driver, 'page_loads', 0) + 1
+
+# Result cache: one SQLite file shared by every job in the process
+CACHE_PATH = os.environ.get("SCRAPER_CACHE_PATH", os.path.join(".cache", "scraper_cache.sqlite3"))
+CACHE_TTL_HOURS = float(os.environ.get("SCRAPER_CACHE_TTL_HOURS", "24"))
+CACHE_MAX_QUERIES = int(os.environ.get("SCRAPER_CACHE_MAX_QUERIES", "1000"))
+CACHE_MAX_PLACES = int(os.environ.get("SCRAPER_CACHE_MAX_PLACES", "50000"))
+
+def place_key(url):
+    """Stable key for a place URL: its feature ID (0x...:0x...) or the URL without /data= and query"""
+    match = re.search(r'!1s(0x[0-9a-f]+:0x[0-9a-f]+)', url or "")
+    if match:
+        return match.group(1)
+    return (url or "").split('?')[0].split('/data=')[0].rstrip('/')
+
+class ResultCache:
+    """SQLite-backed cache of keyword search results and extracted place records
+
+    The query layer maps (keyword, location, max_results, mode) to a result list,
+    the place layer maps a place key (see place_key) to a detail record. Entries
+    expire after ttl_seconds; each layer is trimmed to its size limit by evicting
+    the least recently used rows.
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl_seconds=CACHE_TTL_HOURS * 3600,
+                 max_queries=CACHE_MAX_QUERIES, max_places=CACHE_MAX_PLACES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.limits = {'queries': max_queries, 'places': max_places}
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.hits = {'queries': 0, 'places': 0}
+        self.misses = {'queries': 0, 'places': 0}
+        with self._lock, self._conn:
+            for table in self.limits:
+                self._conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)")
+
+    @staticmethod
+    def query_key(keyword, location, max_results, mode='full', fields=None):
+        key = {'keyword': keyword.strip().lower(), 'location': location.strip().lower(),
+               'max_results': max_results, 'mode': mode}
+        if mode != 'full':
+            key['fields'] = sorted(fields or [])
+        return json.dumps(key, sort_keys=True)
+
+    def _get(self, table, key):
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(f"SELECT value, stored_at FROM {table} WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] > self.ttl_seconds:
+                self._conn.execute(f"DELETE FROM {table} WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses[table] += 1
+                return None
+            self._conn.execute(f"UPDATE {table} SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits[table] += 1
+        return json.loads(row[0])
+
+    def _put(self, table, key, value):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {table} (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now)
+            )
+            self._conn.execute(
+                f"DELETE FROM {table} WHERE key IN (SELECT key FROM {table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.limits[table],)
+            )
+
+    def get_query(self, key):
+        return self._get('queries', key)
+
+    def put_query(self, key, results):
+        self._put('queries', key, results)
+
+    def get_place(self, url):
+        return self._get('places', place_key(url))
+
+    def put_place(self, url, record):
+        self._put('places', place_key(url), record)
+
+    def purge_expired(self):
+        """Delete expired rows from both layers, returning how many were removed"""
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        with self._lock, self._conn:
+            for table in self.limits:
+                removed += self._conn.execute(f"DELETE FROM {table} WHERE stored_at < ?", (cutoff,)).rowcount
+        return removed
+
+    def stats(self):
+        with self._lock:
+            return {
+                'query_hits': self.hits['queries'],
+                'query_misses': self.misses['queries'],
+                'place_hits': self.hits['places'],
+                'place_misses': self.misses['places'],
+            }
+
+# Declarative spec of the detail pane fields. Each field lists candidates tried in
+# order until one yields a value (the fallback chain). A candidate reads 'attr' from
+# the first element matching 'selector' ('text' means the rendered text) and then
+# applies its 'post' steps in order:
+#   ['split', sep, index]  split on sep (None: whitespace) and keep the part at index
+#   ['replace', old, new]  replace every occurrence of old with new
+#   ['strip']              trim surrounding whitespace
+# A candidate fails when its element or attribute is missing or a split index is out
+# of range; a field whose candidates all fail is "".
+DETAIL_FIELD_SPECS = {
+    'name': [
+        {'selector': DETAIL_NAME_SELECTOR, 'attr': 'text'},
+    ],
+    'rating': [
+        {'selector': "div[jsaction='pane.rating.moreReviews']", 'attr': 'text', 'post': [['split', '\n', 0]]},
+    ],
+    'reviews': [
+        {'selector': 'button[jsaction="pane.rating.moreReviews"]', 'attr': 'text',
+         'post': [['split', None, 0], ['replace', '(', ''], ['replace', ')', '']]},
+    ],
+    'status': [
+        {'selector': "span.ZDu9vd", 'attr': 'text', 'post': [['split', '·', 0], ['strip']]},
+    ],
+    'address': [
+        {'selector': "button[data-item-id='address']", 'attr': 'aria-label', 'post': [['split', ':', -1], ['strip']]},
+    ],
+    'website': [
+        {'selector': "a[data-tooltip='Open website']", 'attr': 'href'},
+    ],
+    'phone': [
+        {'selector': "button[data-item-id*='phone']", 'attr': 'aria-label', 'post': [['split', ':', -1], ['strip']]},
+        {'selector': "button[data-tooltip='Copy phone number']", 'attr': 'aria-label', 'post': [['split', ':', -1], ['strip']]},
+    ],
+    'opening_hours': [
+        {'selector': "div.t39EBf.GUrTXd", 'attr': 'aria-label'},
+    ],
+}
+
+# Fields already rendered on each result card in the feed. Selectors are relative to
+# the card element matched by RESULTS_ITEM_XPATH.
+CARD_FIELD_SPECS = {
+    'name': [
+        {'selector': PLACE_LINK_SELECTOR, 'attr': 'aria-label'},
+        {'selector': "div.qBF1Pd", 'attr': 'text'},
+    ],
+    'link': [
+        {'selector': PLACE_LINK_SELECTOR, 'attr': 'href'},
+    ],
+    'rating': [
+        {'selector': "span.MW4etd", 'attr': 'text'},
+    ],
+    'reviews': [
+        {'selector': "span.UY7F9", 'attr': 'text', 'post': [['replace', '(', ''], ['replace', ')', ''], ['strip']]},
+    ],
+    'category': [
+        {'selector': "div.W4Efsd div.W4Efsd > span:first-child", 'attr': 'text', 'post': [['split', '·', 0], ['strip']]},
+    ],
+    'status': [
+        {'selector': "div.W4Efsd span[style*='color']", 'attr': 'text', 'post': [['split', '·', 0], ['strip']]},
+    ],
+    'address': [
+        {'selector': "div.W4Efsd div.W4Efsd > span:nth-child(2)", 'attr': 'text', 'post': [['split', '·', -1], ['strip']]},
+    ],
+}
+
+# Card fields whose absence means the place has no value at all (e.g. no reviews
+# yet), so a detail visit would not find them either
+CARD_AUTHORITATIVE_FIELDS = {'rating', 'reviews'}
+
+# Column order of a result row
+RESULT_FIELDS = ['name', 'link'] + [f for f in DETAIL_FIELD_SPECS if f != 'name'] + ['category']
+# Column order of exported results
+RESULT_COLUMNS = RESULT_FIELDS + ['keyword', 'location', 'scraped_at']
+
+# Typed result schema: rows carry rating as a float and reviews as an int (None when
+# missing), parsed once when the row is extracted; every other field is text.
+# RESULT_DTYPES are the matching pandas dtypes for result frames.
+SCRAPED_AT_FORMAT = "%Y-%m-%d %H:%M:%S"
+RESULT_DTYPES = {
+    'rating': 'float64',
+    'reviews': 'Int64',
+    'status': 'category',
+    'category': 'category',
+    'keyword': 'category',
+    'location': 'category',
+    'scraped_at': 'datetime64[ns]',
+}
+
+def parse_rating(value):
+    """'4.5' or '4,5' -> 4.5; None when there is no number"""
+    if value is None or isinstance(value, float):
+        return value
+    if isinstance(value, int):
+        return float(value)
+    match = re.search(r'\d+(?:[.,]\d+)?', value)
+    return float(match.group().replace(',', '.')) if match else None
+
+def parse_reviews(value):
+    """'(1,234)', '1.234' or '2.1K' -> int; None when there is no number"""
+    if value is None or isinstance(value, int):
+        return value
+    match = re.search(r'(\d[\d,.\s]*)([KkMm]?)', value.replace('\u202f', ' '))
+    if not match:
+        return None
+    number, suffix = match.group(1).strip(), match.group(2)
+    if suffix:
+        return int(round(float(number.replace(',', '.')) * (1000 if suffix in 'Kk' else 1000000)))
+    return int(re.sub(r'\D', '', number))
+
+def type_result(row):
+    """Convert a row's numeric fields in place (idempotent, so older text rows can pass through again)"""
+    row['rating'] = parse_rating(row.get('rating') or None)
+    row['reviews'] = parse_reviews(row.get('reviews') or None)
+    return row
+
+# In-page evaluator for the field specs: extractFields(root, specs) returns
+# {fields: {...}, errors: {...}}. Attributes are read like WebElement.get_attribute
+# (DOM property first, then the HTML attribute) so values such as href come back
+# absolute, as before.
+FIELD_SPEC_JS = """
+function readAttr(el, attr) {
+    if (attr === 'text') return el.innerText;
+    if (attr in el && typeof el[attr] === 'string') return el[attr];
+    return el.getAttribute(attr);
+}
+function applyStep(value, step) {
+    if (step[0] === 'split') {
+        const parts = step[1] === null ? value.trim().split(/\\s+/).filter(Boolean) : value.split(step[1]);
+        const index = step[2] < 0 ? parts.length + step[2] : step[2];
+        if (index < 0 || index >= parts.length) throw new Error('split index ' + step[2] + ' out of range');
+        return parts[index];
+    }
+    if (step[0] === 'replace') return value.split(step[1]).join(step[2]);
+    if (step[0] === 'strip') return value.trim();
+    throw new Error('unknown step ' + step[0]);
+}
+function extractFields(root, specs) {
+    const fields = {};
+    const errors = {};
+    for (const [name, candidates] of Object.entries(specs)) {
+        const failures = [];
+        for (const candidate of candidates) {
+            try {
+                const el = root.querySelector(candidate.selector);
+                if (!el) throw new Error('no element matches ' + candidate.selector);
+                let value = readAttr(el, candidate.attr);
+                if (value === null || value === undefined) throw new Error('no ' + candidate.attr + ' on ' + candidate.selector);
+                for (const step of (candidate.post || [])) value = applyStep(value, step);
+                fields[name] = value;
+                break;
+            } catch (e) {
+                failures.push(e.message);
+            }
+        }
+        if (!(name in fields)) {
+            fields[name] = '';
+            errors[name] = failures.join('; ');
+        }
+    }
+    return {fields: fields, errors: errors};
+}
+"""
+
+# Feed: reads the place URL of every card after the first `known` ones, reports
+# whether the end-of-list marker is showing and optionally scrolls the feed to
+# its bottom to trigger the next lazy load
+SCROLL_FEED_JS = """
+const [feedXPath, cardXPath, linkSelector, known, endSelector, endText, scroll] = arguments;
+const feed = document.evaluate(feedXPath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+const cards = document.evaluate(cardXPath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+const links = [];
+for (let i = known; i < cards.snapshotLength; i++) {
+    const link = cards.snapshotItem(i).querySelector(linkSelector);
+    links.push(link ? link.href : '');
+}
+let end = !!document.querySelector(endSelector);
+if (!end && feed && feed.lastElementChild) {
+    end = (feed.lastElementChild.innerText || '').includes(endText);
+}
+if (scroll && feed) {
+    feed.scrollTop = feed.scrollHeight;
+}
+return {count: cards.snapshotLength, links: links, end: end};
+"""
+
+# Detail pane: one call returns every field plus the page URL
+EXTRACT_FIELDS_JS = FIELD_SPEC_JS + """
+const result = extractFields(document, arguments[0]);
+result.fields.link = window.location.href;
+return result;
+"""
+
+# Feed: one call returns the fields of every result card
+EXTRACT_CARDS_JS = FIELD_SPEC_JS + """
+const cards = document.evaluate(arguments[1], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+const results = [];
+for (let i = 0; i < cards.snapshotLength; i++) {
+    results.push(extractFields(cards.snapshotItem(i), arguments[0]));
+}
+return results;
+"""
+
+def extract_details_js(driver, log):
+    """Extract every detail pane field in a single execute_script round trip"""
+    payload = driver.execute_script(EXTRACT_FIELDS_JS, DETAIL_FIELD_SPECS)
+    fields = payload['fields']
+    # Same column order as the per-field extractor
+    item = {'name': fields.pop('name'), 'link': fields.pop('link')}
+    item.update(fields)
+    if not log.isEnabledFor(logging.DEBUG):
+        return item
+    for name, value in item.items():
+        if name in payload['errors']:
+            log.debug("[DATA] ✗ %s extraction failed: %s", name, payload['errors'][name])
+        else:
+            log.debug("[DATA] ✓ %s: %s", name, value)
+    return item
+
+def extract_cards(driver, keyword, location, log):
+    """Parse every result card currently in the feed in a single execute_script round trip"""
+    payloads = driver.execute_script(EXTRACT_CARDS_JS, CARD_FIELD_SPECS, RESULTS_ITEM_XPATH)
+    scraped_at = datetime.now().strftime(SCRAPED_AT_FORMAT)
+    cards = []
+    for payload in payloads:
+        card = {field: "" for field in RESULT_FIELDS}
+        card.update(payload['fields'])
+        card['keyword'] = keyword
+        card['location'] = location
+        card['scraped_at'] = scraped_at
+        cards.append(card)
+    failed = sum(1 for payload in payloads if payload['errors'])
+    log(f"[CARDS] Parsed {len(cards)} cards ({failed} with missing fields)")
+    return cards
+
+def card_missing_fields(card, fields):
+    """Requested fields the card could not provide and a detail visit might"""
+    return [f for f in fields if not card.get(f) and f not in CARD_AUTHORITATIVE_FIELDS]
+
+def log_extraction_summary(latencies, extractor, log):
+    """Log mean and p95 per-item extraction latency for one keyword"""
+    if not latencies:
+        return
+    p95 = percentile(latencies, 0.95)
+    log(f"[DATA] Extraction latency ({extractor}): {len(latencies)} items, "
+        f"mean {sum(latencies) / len(latencies) * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms")
+
+def extract_details_webdriver(driver, log):
+    """Extract the detail pane field by field (one WebDriver round trip per lookup)"""
+    item = {}
+    
+    # Extract name
+    try:
+        item['name'] = driver.find_element(By.CSS_SELECTOR, DETAIL_NAME_SELECTOR).text
+        log.debug("[DATA] ✓ Name: '%s'", item['name'])
+    except Exception as e:
+        item['name'] = ""
+        log.debug("[DATA] ✗ Name extraction failed: %s", e)
+    
+    # Extract link
+    try:
+        item['link'] = driver.current_url
+        log.debug("[DATA] ✓ Link: %s", item['link'])
+    except Exception as e:
+        item['link'] = ""
+        log.debug("[DATA] ✗ Link extraction failed: %s", e)
+    
+    # Extract rating
+    try:
+        item['rating'] = driver.find_element(By.CSS_SELECTOR, "div[jsaction='pane.rating.moreReviews']").text.split('\n')[0]
+        log.debug("[DATA] ✓ Rating: %s", item['rating'])
+    except Exception as e:
+        item['rating'] = ""
+        log.debug("[DATA] ✗ Rating extraction failed: %s", e)
+    
+    # Extract reviews
+    try:
+        reviews_text = driver.find_element(By.CSS_SELECTOR, 'button[jsaction="pane.rating.moreReviews"]').text
+        item['reviews'] = reviews_text.split()[0].replace('(', '').replace(')', '')
+        log.debug("[DATA] ✓ Reviews: %s", item['reviews'])
+    except Exception as e:
+        item['reviews'] = ""
+        log.debug("[DATA] ✗ Reviews extraction failed: %s", e)
+    
+    # Extract status
+    try:
+        item['status'] = driver.find_element(By.CSS_SELECTOR, "span.ZDu9vd").text.split('·')[0].strip()
+        log.debug("[DATA] ✓ Status: %s", item['status'])
+    except Exception as e:
+        item['status'] = ""
+        log.debug("[DATA] ✗ Status extraction failed: %s", e)
+    
+    # Extract address
+    try:
+        address_elem = driver.find_element(By.CSS_SELECTOR, "button[data-item-id='address']")
+        item['address'] = address_elem.get_attribute("aria-label").split(":")[-1].strip()
+        log.debug("[DATA] ✓ Address: %s", item['address'])
+    except Exception as e:
+        item['address'] = ""
+        log.debug("[DATA] ✗ Address extraction failed: %s", e)
+    
+    # Extract website
+    try:
+        item['website'] = driver.find_element(By.CSS_SELECTOR, "a[data-tooltip='Open website']").get_attribute("href")
+        log.debug("[DATA] ✓ Website: %s", item['website'])
+    except Exception as e:
+        item['website'] = ""
+        log.debug("[DATA] ✗ Website extraction failed: %s", e)
+    
+    # Extract phone
+    try:
+        phone_elem = driver.find_element(By.CSS_SELECTOR, "button[data-item-id*='phone']")
+        item['phone'] = phone_elem.get_attribute("aria-label").split(":")[-1].strip()
+        log.debug("[DATA] ✓ Phone: %s", item['phone'])
+    except Exception as e1:
+        try:
+            item['phone'] = driver.find_element(By.CSS_SELECTOR, "button[data-tooltip='Copy phone number']").get_attribute("aria-label").split(":")[-1].strip()
+            log.debug("[DATA] ✓ Phone (fallback): %s", item['phone'])
+        except Exception as e2:
+            item['phone'] = ""
+            log.debug("[DATA] ✗ Phone extraction failed: %s, fallback also failed: %s", e1, e2)
+    
+    # Extract opening hours
+    try:
+        item['opening_hours'] = driver.find_element(By.CSS_SELECTOR, "div.t39EBf.GUrTXd").get_attribute("aria-label")
+        log.debug("[DATA] ✓ Opening hours: %s", item['opening_hours'])
+    except Exception as e:
+        item['opening_hours'] = ""
+        log.debug("[DATA] ✗ Opening hours extraction failed: %s", e)
+    
+    return item
+
+# Detail pane extractors selectable per job; 'webdriver' is the original per-field path
+DETAIL_EXTRACTORS = {
+    'js': extract_details_js,
+    'webdriver': extract_details_webdriver,
+}
+
+# Network capture: while the feed scrolls, Maps fetches each further page of
+# results as ")]}'"-guarded JSON from /search?tbm=map, and the search document
+# embeds the first page in APP_INITIALIZATION_STATE. Decoding those payloads
+# yields structured records without reading the DOM. Index paths into a
+# place array are tried in order, like the DOM field specs; they follow the
+# layout served to Maps' web client, and fields they miss fall back to the
+# card and detail-pane extractors. Decoded values are checked against
+# PAYLOAD_FIELD_CHECKS, so a value of the wrong type or range (the layout
+# shifted) is treated as missing rather than written into the row.
+SEARCH_PAYLOAD_URL_PATTERN = re.compile(r'/search\?(?:[^#]*&)?tbm=map')
+PAYLOAD_PREFIX = ")]}'"
+PAYLOAD_SUFFIX = '/*""*/'
+PAYLOAD_FIELD_PATHS = {
+    'name': [[11]],
+    'rating': [[4, 7]],
+    'reviews': [[4, 8]],
+    'status': [[34, 4, 4]],
+    'address': [[39], [2]],
+    'website': [[7, 0]],
+    'phone': [[178, 0, 0]],
+    'opening_hours': [[34, 1]],
+    'category': [[13, 0]],
+    'latitude': [[9, 2]],
+    'longitude': [[9, 3]],
+}
+# Feature id ("0x...:0x..."), the same id place_key() reads from DOM place links
+PAYLOAD_FEATURE_ID_PATH = [10]
+PAYLOAD_FEATURE_ID_PATTERN = re.compile(r'0x[0-9a-f]+:0x[0-9a-f]+$')
+# Result entries of a search payload hold their place array at this index
+PAYLOAD_PLACE_INDEX = 14
+APP_STATE_PATTERN = re.compile(r'window\.APP_INITIALIZATION_STATE\s*=\s*(\[.*?\]);\s*window\.APP_', re.S)
+
+def payload_value(node, path):
+    """Follow a list of indexes into nested lists; None where the path does not exist"""
+    for index in path:
+        if not isinstance(node, list) or index >= len(node):
+            return None
+        node = node[index]
+    return node
+
+def parse_payload(text):
+    """Parse a Maps JSON payload, dropping its ")]}'" guard and {"d": ...} wrapper; None if invalid"""
+    text = text.strip()
+    if text.endswith(PAYLOAD_SUFFIX):
+        text = text[:-len(PAYLOAD_SUFFIX)]
+    if text.startswith(PAYLOAD_PREFIX):
+        text = text[len(PAYLOAD_PREFIX):]
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    if isinstance(data, dict) and isinstance(data.get('d'), str):
+        return parse_payload(data['d'])
+    return data
+
+def iter_payload_places(data, depth=0):
+    """Yield every place array in a parsed search payload, in feed order"""
+    if not isinstance(data, list) or depth > 8:
+        return
+    for entry in data:
+        place = payload_value(entry, [PAYLOAD_PLACE_INDEX])
+        feature_id = payload_value(place, PAYLOAD_FEATURE_ID_PATH)
+        if (isinstance(place, list) and format_payload_field('name', payload_value(place, PAYLOAD_FIELD_PATHS['name'][0]))
+                and isinstance(feature_id, str) and PAYLOAD_FEATURE_ID_PATTERN.match(feature_id)):
+            yield place
+        elif isinstance(entry, list):
+            yield from iter_payload_places(entry, depth + 1)
+
+def payload_number(value, low, high):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and low <= value <= high
+
+# What a formatted payload value must look like; fields not listed must be text
+PAYLOAD_FIELD_CHECKS = {
+    'rating': lambda value: payload_number(value, 0, 5),
+    'reviews': lambda value: isinstance(value, int) and payload_number(value, 0, float('inf')),
+    'website': lambda value: isinstance(value, str) and value.startswith(('http://', 'https://')),
+    'latitude': lambda value: payload_number(value, -90, 90),
+    'longitude': lambda value: payload_number(value, -180, 180),
+}
+
+def format_payload_field(field, value):
+    """Turn a raw payload value into the text the DOM extractors would produce
+
+    Returns "" when the value is missing or fails the field's check.
+    """
+    if field == 'address' and isinstance(value, list):
+        value = ", ".join(part for part in value if isinstance(part, str))
+    elif field == 'opening_hours':
+        # A list of [day, [hours, ...]]; plain text here is some other field
+        days = value if isinstance(value, list) else []
+        days = [day for day in days if isinstance(day, list) and len(day) > 1 and isinstance(day[1], list)]
+        value = "; ".join(f"{day[0]}, {', '.join(str(hours) for hours in day[1])}" for day in days)
+    elif field == 'status' and isinstance(value, str):
+        value = re.split(r'[·⋅]', value)[0].strip()
+    elif field == 'website' and isinstance(value, str) and value.startswith('/url?'):
+        value = urllib.parse.parse_qs(urllib.parse.urlsplit(value).query).get('q', [value])[0]
+    check = PAYLOAD_FIELD_CHECKS.get(field, lambda value: isinstance(value, str))
+    return value if check(value) else ""
+
+def decode_place(place):
+    """Result fields of one payload place array; fields not found are empty"""
+    item = {}
+    for field, paths in PAYLOAD_FIELD_PATHS.items():
+        value = ""
+        for path in paths:
+            value = format_payload_field(field, payload_value(place, path))
+            if value != "":
+                break
+        item[field] = value
+    feature_id = payload_value(place, PAYLOAD_FEATURE_ID_PATH)
+    item['link'] = f"{MAPS_BASE_URL}/place/{urllib.parse.quote_plus(item['name'])}/data=!4m2!3m1!1s{feature_id}"
+    return item
+
+def decode_search_payload(text):
+    """Decode a /search?tbm=map response body into result field dicts, in feed order"""
+    data = parse_payload(text)
+    return [decode_place(place) for place in iter_payload_places(data)]
+
+def iter_guarded_strings(node, depth=0):
+    """Yield the ")]}'"-guarded JSON strings nested in a parsed structure"""
+    if isinstance(node, str):
+        if node.startswith(PAYLOAD_PREFIX):
+            yield node
+    elif isinstance(node, list) and depth <= 8:
+        for child in node:
+            yield from iter_guarded_strings(child, depth + 1)
+
+def decode_search_document(html):
+    """Decode the first page of results embedded in a search page's APP_INITIALIZATION_STATE"""
+    match = APP_STATE_PATTERN.search(html)
+    if not match:
+        return []
+    try:
+        state = json.loads(match.group(1))
+    except ValueError:
+        return []
+    items = []
+    for text in iter_guarded_strings(state):
+        items.extend(decode_search_payload(text))
+    return items
+
+class NetworkCapture:
+    """Collect decoded places from the search responses of a capture-enabled driver
+
+    The driver must come from setup_driver(capture=True). Each drain() reads
+    the performance log entries gathered since the previous call, fetches the
+    body of every finished search response (the search document and the
+    /search?tbm=map pages loaded while scrolling) over DevTools and decodes
+    it. Places accumulate in self.places, keyed by place_key() so they line up
+    with the DOM's place links.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.places = {}
+        self.responses = 0
+        self.errors = 0
+        self._pending = {}  # requestId -> 'document' or 'payload'
+
+    def _entries(self):
+        try:
+            return self.driver.get_log('performance')
+        except WebDriverException:
+            return []
+
+    def reset(self):
+        """Forget the log and places so far, e.g. before navigating to a new search"""
+        self._entries()
+        self._pending.clear()
+        self.places.clear()
+
+    def _decode(self, request_id, kind):
+        try:
+            response = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+        except WebDriverException:
+            self.errors += 1  # Body evicted, or the request belonged to another tab
+            return []
+        body = response.get('body', '')
+        if response.get('base64Encoded'):
+            body = base64.b64decode(body).decode('utf-8', 'replace')
+        self.responses += 1
+        return decode_search_document(body) if kind == 'document' else decode_search_payload(body)
+
+    def drain(self):
+        """Decode the search responses finished since the last call; returns the number of places"""
+        for entry in self._entries():
+            try:
+                message = json.loads(entry['message'])['message']
+            except (ValueError, KeyError, TypeError):
+                continue
+            method, params = message.get('method'), message.get('params', {})
+            if method == 'Network.responseReceived':
+                url = params.get('response', {}).get('url', '')
+                if params.get('type') == 'Document' and url.startswith(f"{MAPS_BASE_URL}/search/"):
+                    self._pending[params['requestId']] = 'document'
+                elif SEARCH_PAYLOAD_URL_PATTERN.search(url):
+                    self._pending[params['requestId']] = 'payload'
+            elif method == 'Network.loadingFinished' and params.get('requestId') in self._pending:
+                kind = self._pending.pop(params['requestId'])
+                for item in self._decode(params['requestId'], kind):
+                    self.places.setdefault(place_key(item['link']), item)
+        return len(self.places)
+
+class ScrollController:
+    """Scroll the results feed until the target count, the end-of-list marker or a stall
+
+    Each step scrolls the feed container itself, then waits for the feed to grow.
+    Only cards appended since the previous step are read back, so place links
+    accumulate in self.links without re-reading the whole list. A step ends in
+    one of three states: 'growth', 'stall' (no new cards within the feed_growth
+    timeout) or 'end' (Maps' "You've reached the end of the list" marker).
+    """
+
+    def __init__(self, driver, waits, target, log, stall_limit=2, max_scrolls=None, on_step=None):
+        self.driver = driver
+        self.waits = waits
+        self.target = target
+        self.log = log
+        self.stall_limit = stall_limit
+        self.max_scrolls = max_scrolls or max(10, target // 3)
+        self.links = []
+        self.steps = []  # (state, seconds, new cards) per scroll
+        self.end = False  # Whether the end-of-list marker was reached
+        self.on_step = on_step  # Called after every scroll, e.g. to drain a NetworkCapture
+
+    def _read(self, scroll):
+        """Read cards appended since the last call and optionally scroll the feed"""
+        state = self.driver.execute_script(
+            SCROLL_FEED_JS, RESULTS_CONTAINER_XPATH, RESULTS_ITEM_XPATH, PLACE_LINK_SELECTOR,
+            len(self.links), END_OF_LIST_SELECTOR, END_OF_LIST_TEXT, scroll
+        )
+        self.links.extend(state['links'])
+        return state
+
+    def step(self):
+        start = time.perf_counter()
+        known = len(self.links)
+        if self._read(scroll=True)['end']:
+            state = 'end'  # Nothing more will load, so there is no growth to wait for
+        else:
+            try:
+                feed = self.waits.feed_growth(len(self.links))
+                state = 'end' if feed['end'] and feed['count'] <= len(self.links) else 'growth'
+            except TimeoutException:
+                state = 'stall'
+        if self._read(scroll=False)['end']:
+            state = 'end'  # The cards this scroll loaded were the last ones
+        elif state == 'growth' and len(self.links) <= known:
+            state = 'stall'
+        self.steps.append((state, time.perf_counter() - start, len(self.links) - known))
+        if self.on_step is not None:
+            self.on_step()
+        return state
+
+    def run(self):
+        """Scroll until done and return the collected place links"""
+        state = self._read(scroll=False)
+        if state['end']:
+            self.end = True
+            self.log(f"[SCROLL] End of list already visible with {len(self.links)} cards")
+            return self.links
+        stalls = 0
+        while len(self.links) < self.target and len(self.steps) < self.max_scrolls:
+            state = self.step()
+            _, seconds, new_cards = self.steps[-1]
+            self.log.debug("[SCROLL] Scroll %s: %s, +%s cards in %.2fs (total %s)", len(self.steps), state, new_cards, seconds, len(self.links))
+            if state == 'end':
+                self.end = True
+                self.log(f"[SCROLL] ✓ Reached the end of the list")
+                break
+            stalls = stalls + 1 if state == 'stall' else 0
+            if stalls >= self.stall_limit:
+                self.log(f"[SCROLL] ✗ No growth for {stalls} scrolls in a row, stopping early")
+                break
+        return self.links
+
+    def stats(self):
+        """Scroll count, time spent, cards collected and cards per second"""
+        seconds = sum(step[1] for step in self.steps)
+        return {
+            'scrolls': len(self.steps),
+            'seconds': seconds,
+            'cards': len(self.links),
+            'cards_per_second': len(self.links) / seconds if seconds else 0.0,
+            'stalls': sum(1 for step in self.steps if step[0] == 'stall'),
+            'end': self.end,
+        }
+
+class JobCancelled(Exception):
+    """Raised in a scraping worker to stop a keyword once its job was cancelled
+
+    rows are the rows the keyword had already added to the job when it stopped.
+    """
+
+    def __init__(self, rows=None):
+        super().__init__("job cancelled")
+        self.rows = rows or []
+
+def save_snapshot(driver, snapshots, url, log, timer=None):
+    """Store the current tab's detail pane HTML; a failure only costs the snapshot"""
+    start = time.perf_counter()
+    try:
+        size = snapshots.add(url, driver.execute_script(SNAPSHOT_JS, DETAIL_NAME_SELECTOR))
+    except (WebDriverException, sqlite3.Error) as e:
+        log.warning("[SNAPSHOT] ✗ Could not save the page snapshot of %s: %s", url, e)
+        if timer is not None:
+            timer.count('snapshots_failed')
+        return
+    log.debug("[SNAPSHOT] Saved %s KB compressed", size // 1024)
+    if timer is not None:
+        timer.record('snapshot', time.perf_counter() - start)
+
+def fetch_place_details(driver, waits, work, extract, log, tabs=1, max_attempts=2, extract_latencies=None, on_item=None, pages=None, cancel=None, timer=None, pacer=None, snapshots=None):
+    """Open each (index, place_url) in work directly and extract its detail pane
+
+    With tabs > 1 the place pages of a batch start loading together in separate
+    tabs of the same browser and are then extracted one tab at a time. A failed
+    item is re-queued on its own, up to max_attempts. Returns {index: item}.
+    With a PhaseTimer, each item's 'item', 'detail_wait' and 'extract' times
+    are recorded along with retry, skip, stale element and missing field
+    counts. Once the cancel event is set, stops before the next batch and
+    returns what it has. With a Pacer, every batch waits for it and every
+    item's outcome is reported to it and to the driver's health; a failed
+    item that turns out to be an interstitial page raises InterstitialPage.
+    With a SnapshotArchive, the HTML of every extracted pane is stored in it.
+    """
+    pending = deque((index, url, 1) for index, url in work)
+    details = {}
+    tabs = max(1, min(tabs, len(pending)))
+    handles = [driver.current_window_handle]
+    while len(handles) < tabs:
+        driver.switch_to.new_window('tab')
+        if getattr(driver, 'lean', False):
+            apply_lean_profile(driver)
+        handles.append(driver.current_window_handle)
+    tab_headings = {}  # handle -> detail h1 element shown before the tab's latest navigation
+    tab_starts = {}    # handle -> when the tab's latest navigation was issued
+    
+    try:
+        while pending:
+            if cancel is not None and cancel.is_set():
+                break
+            batch = [pending.popleft() for _ in range(min(len(handles), len(pending)))]
+            pace(pacer, cancel, timer)
+            for handle, (index, url, attempt) in zip(handles, batch):
+                log.debug("\n[ITEM %s] Opening place URL (attempt %s/%s): %s", index+1, attempt, max_attempts, url)
+                driver.switch_to.window(handle)
+                headings = driver.find_elements(By.CSS_SELECTOR, DETAIL_NAME_SELECTOR)
+                tab_headings[handle] = headings[0] if headings else None
+                tab_starts[handle] = time.perf_counter()
+                if len(batch) == 1:
+                    navigate(driver, url)
+                else:
+                    # Non-blocking navigation so the whole batch loads in parallel
+                    driver.execute_script("window.location.href = arguments[0];", url)
+                    driver.page_loads = getattr(driver, 'page_loads', 0) + 1
+            
+            for handle, (index, url, attempt) in zip(handles, batch):
+                driver.switch_to.window(handle)
+                try:
+                    try:
+                        waits.detail_pane(tab_headings[handle])
+                        log.debug("[ITEM %s] Details loaded in %.2fs", index+1, waits.latencies['detail_pane'][-1])
+                    except TimeoutException:
+                        log.debug("[ITEM %s] Detail pane not ready within %ss, extracting anyway", index+1, waits.timeouts['detail_pane'])
+                    finally:
+                        if timer is not None:
+                            timer.record('detail_wait', waits.latencies['detail_pane'][-1])
+                    
+                    log.debug("[DATA] Extracting business data...")
+                    extract_start = time.perf_counter()
+                    item = extract(driver, log)
+                    extract_seconds = time.perf_counter() - extract_start
+                    if extract_latencies is not None:
+                        extract_latencies.append(extract_seconds)
+                    if timer is not None:
+                        timer.record('extract', extract_seconds)
+                    if not item['name']:
+                        raise ValueError("no name extracted")
+                    details[index] = item
+                    item_seconds = time.perf_counter() - tab_starts[handle]
+                    report_page(driver, pacer, True, item_seconds, timer)
+                    if timer is not None:
+                        timer.record('item', item_seconds)
+                        timer.count('items_extracted')
+                        timer.count('fields_missing', sum(1 for value in item.values() if not value))
+                    if pages is not None:
+                        pages.record(driver, 'detail')
+                    if snapshots is not None:
+                        save_snapshot(driver, snapshots, item['link'] or url, log, timer)
+                    log.debug("[ITEM %s] ✓ Extracted '%s'", index+1, item['name'])
+                    if on_item:
+                        on_item(len(details))
+                except Exception as e:
+                    if timer is not None and isinstance(e, StaleElementReferenceException):
+                        timer.count('stale_elements')
+                    kind = detect_interstitial(driver)
+                    if kind:
+                        report_interstitial(driver, pacer)
+                        log.warning("[ITEM %s] ✗ Got a %s page instead of the place, stopping this driver", index+1, kind)
+                        raise InterstitialPage(kind, driver.current_url)
+                    report_page(driver, pacer, False, timer=timer)
+                    if attempt < max_attempts:
+                        log.warning("[ITEM %s] ✗ Failed (%s), re-queued for retry", index+1, e)
+                        pending.append((index, url, attempt + 1))
+                        if timer is not None:
+                            timer.count('items_retried')
+                    else:
+                        log.warning("[ITEM %s] ✗ Failed after %s attempts, skipping: %s", index+1, attempt, e)
+                        if timer is not None:
+                            timer.count('items_skipped')
+    finally:
+        for handle in handles[1:]:
+            try:
+                driver.switch_to.window(handle)
+                driver.close()
+            except Exception:
+                pass
+        driver.switch_to.window(handles[0])
+    
+    return details
+
+# Separator used when one business row matched several keywords
+KEYWORD_SEPARATOR = "; "
+
+def normalize_text(text):
+    """Lowercase and collapse punctuation/whitespace for fuzzy name and address matching"""
+    return re.sub(r'[^0-9a-z]+', ' ', (text or "").lower()).strip()
+
+class DedupIndex:
+    """Job-wide index of the places already claimed by a keyword
+
+    Places are keyed by place ID (see place_key), falling back to normalized
+    name and address when a card has no link. A keyword claims a place before
+    its detail visit; a later keyword hitting the same place is attached to the
+    claiming row instead of visiting it again. Rows reached through different
+    URLs but with the same name and address are merged when added.
+    Per-keyword counts are kept up to date as rows are added or matched.
+
+    Only keys and keyword lists are held in memory: added rows are handed to
+    on_row(key, row, keywords) and later keyword matches to on_merge(key, keyword),
+    which the scraper points at its CheckpointStore.
+    """
+
+    def __init__(self, on_row=None, on_merge=None):
+        self._lock = threading.Lock()
+        self._keywords = {}     # key -> keywords that matched the place, claiming keyword first
+        self._claimed = set()   # keys a keyword is extracting right now
+        self._row_keys = set()  # keys whose row has been extracted
+        self._aliases = {}      # normalized name|address -> key
+        self._merged = {}       # key -> key of the row it was merged into
+        self.on_row = on_row
+        self.on_merge = on_merge
+        self.keyword_counts = Counter()
+        self.duplicates = 0
+
+    @staticmethod
+    def name_address_key(name, address):
+        if not name:
+            return None
+        return f"na:{normalize_text(name)}|{normalize_text(address)}"
+
+    @staticmethod
+    def key_for(link, name=None, address=None):
+        if link:
+            return f"id:{place_key(link)}"
+        return DedupIndex.name_address_key(name, address)
+
+    def claim(self, key, keyword):
+        """Return True if keyword is the first to reach this place and should extract it"""
+        if key is None:
+            return True
+        with self._lock:
+            key = self._merged.get(key, key)
+            keywords = self._keywords.get(key)
+            if keywords is None:
+                self._keywords[key] = [keyword]
+                self._claimed.add(key)
+                return True
+            if key not in self._claimed and key not in self._row_keys:
+                # A released claim: take it over, keeping the keywords merged into it so far
+                if keyword in keywords:
+                    keywords.remove(keyword)
+                keywords.insert(0, keyword)
+                self._claimed.add(key)
+                return True
+            if keyword not in keywords:
+                keywords.append(keyword)
+                if key in self._row_keys:
+                    self.keyword_counts[keyword] += 1
+                    if self.on_merge:
+                        self.on_merge(key, keyword)
+            self.duplicates += 1
+            return False
+
+    def release(self, key):
+        """Drop a claim whose extraction failed so the place is not silently lost
+
+        The next keyword to claim the place extracts it; keywords that matched
+        it meanwhile stay merged into its row. Keys that already have a row are
+        left alone.
+        """
+        with self._lock:
+            self._claimed.discard(key)
+
+    def has_row(self, key):
+        """Whether the place's row has been extracted"""
+        with self._lock:
+            return self._merged.get(key, key) in self._row_keys
+
+    def add(self, key, row):
+        """Record an extracted row; returns False if it merged into an existing row instead"""
+        alias = self.name_address_key(row.get('name'), row.get('address'))
+        with self._lock:
+            keywords = self._keywords.pop(key, None) if key else None
+            self._claimed.discard(key)
+            keywords = keywords or [row['keyword']]
+            existing = self._aliases.get(alias) if alias else None
+            if existing is not None and existing != key and existing in self._row_keys:
+                # Same business reached through a different URL
+                target = self._keywords[existing]
+                for keyword in keywords:
+                    if keyword not in target:
+                        target.append(keyword)
+                        self.keyword_counts[keyword] += 1
+                        if self.on_merge:
+                            self.on_merge(existing, keyword)
+                if key:
+                    self._merged[key] = existing
+                self.duplicates += 1
+                return False
+            key = key or alias or f"row:{len(self._row_keys)}"
+            self._index_row(key, keywords, alias)
+            if self.on_row:
+                self.on_row(key, row, list(keywords))
+            return True
+
+    def _index_row(self, key, keywords, alias):
+        self._keywords[key] = keywords
+        self._row_keys.add(key)
+        if alias:
+            self._aliases.setdefault(alias, key)
+        for keyword in keywords:
+            self.keyword_counts[keyword] += 1
+
+    def restore(self, store):
+        """Rebuild the index from a checkpoint store without re-emitting its records"""
+        with self._lock:
+            for record in store.iter_records():
+                if record['type'] == 'row':
+                    row = record['row']
+                    self._index_row(record['key'], list(record['keywords']),
+                                  self.name_address_key(row.get('name'), row.get('address')))
+                elif record['type'] == 'merge' and record['keyword'] not in self._keywords.get(record['key'], []):
+                    self._keywords.setdefault(record['key'], []).append(record['keyword'])
+                    self.keyword_counts[record['keyword']] += 1
+
+    def __len__(self):
+        return len(self._row_keys)
+
+# Result export formats and their file extensions; 'jsonl' is accepted for 'ndjson'
+EXPORT_FORMATS = {'csv': '.csv', 'ndjson': '.ndjson', 'parquet': '.parquet'}
+PARQUET_BATCH_ROWS = 5000
+
+def parquet_schema():
+    """Arrow schema of the typed results; low-cardinality text columns are dictionary encoded"""
+    types = {
+        'rating': pyarrow.float64(),
+        'reviews': pyarrow.int64(),
+        'scraped_at': pyarrow.timestamp('s'),
+    }
+    for column, dtype in RESULT_DTYPES.items():
+        if dtype == 'category':
+            types[column] = pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+    return pyarrow.schema([(column, types.get(column, pyarrow.string())) for column in RESULT_COLUMNS])
+
+class ResultWriter:
+    """Write typed result rows incrementally as CSV, NDJSON or Parquet
+
+    CSV and NDJSON go to a text handle and are flushed after every write();
+    Parquet needs a binary handle and pyarrow, and is written in row groups of
+    PARQUET_BATCH_ROWS, so memory stays bounded however many rows pass
+    through. close() finishes the file but leaves the handle open.
+    """
+
+    def __init__(self, handle, fmt='csv'):
+        fmt = 'ndjson' if fmt == 'jsonl' else fmt
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"unknown export format '{fmt}'")
+        if fmt == 'parquet' and pyarrow is None:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+        self.handle = handle
+        self.fmt = fmt
+        self.count = 0
+        self._csv = None
+        self._parquet = None
+        self._batch = []
+        if fmt == 'csv':
+            self._csv = csv.DictWriter(handle, fieldnames=RESULT_COLUMNS, restval="", extrasaction='ignore')
+            self._csv.writeheader()
+        elif fmt == 'parquet':
+            self._schema = parquet_schema()
+            self._parquet = pyarrow.parquet.ParquetWriter(handle, self._schema)
+
+    def write(self, rows):
+        for row in rows:
+            if self._csv is not None:
+                self._csv.writerow(row)
+            elif self._parquet is not None:
+                self._batch.append(row)
+                if len(self._batch) >= PARQUET_BATCH_ROWS:
+                    self._write_batch()
+            else:
+                self.handle.write(json.dumps({column: row.get(column) for column in RESULT_COLUMNS},
+                                             ensure_ascii=False) + "\n")
+            self.count += 1
+        if self._parquet is None:
+            self.handle.flush()
+
+    def _write_batch(self):
+        columns = {column: [row.get(column) for row in self._batch] for column in RESULT_COLUMNS}
+        columns['scraped_at'] = [datetime.strptime(value, SCRAPED_AT_FORMAT) if value else None
+                                 for value in columns['scraped_at']]
+        for column in RESULT_COLUMNS:
+            if column not in ('rating', 'reviews', 'scraped_at'):
+                columns[column] = [value if value is None else str(value) for value in columns[column]]
+        self._parquet.write_table(pyarrow.Table.from_pydict(columns, schema=self._schema))
+        self._batch = []
+
+    def close(self):
+        if self._parquet is not None:
+            if self._batch:
+                self._write_batch()
+            self._parquet.close()
+            self._parquet = None
+
+class ResultSummary:
+    """Headline numbers of a result set, accumulated row by row so they are computed once"""
+
+    def __init__(self):
+        self.total = 0
+        self.with_phone = 0
+        self.with_website = 0
+        self.rated = 0
+        self.rating_sum = 0.0
+        self.reviews = 0
+
+    def tally(self, rows):
+        """Yield rows unchanged, adding each one on the way, e.g. while they are exported"""
+        for row in rows:
+            self.add((row,))
+            yield row
+
+    def add(self, rows):
+        for row in rows:
+            self.total += 1
+            self.with_phone += bool(row.get('phone'))
+            self.with_website += bool(row.get('website'))
+            if row.get('rating') is not None:
+                self.rated += 1
+                self.rating_sum += row['rating']
+            self.reviews += row.get('reviews') or 0
+
+    def as_dict(self):
+        return {
+            'total': self.total,
+            'with_phone': self.with_phone,
+            'with_website': self.with_website,
+            'avg_rating': self.rating_sum / self.rated if self.rated else None,
+            'reviews': self.reviews,
+        }
+
+# Checkpoints: one directory per job under this root
+CHECKPOINT_DIR = os.environ.get("SCRAPER_CHECKPOINT_DIR", ".checkpoints")
+
+class CheckpointStore:
+    """Append-only on-disk record of a job's results and progress
+
+    records.jsonl gets one line per extracted business ('row') and one per
+    keyword later matched to an existing business ('merge'). manifest.jsonl
+    logs the job parameters, each finished keyword and job completion. Both are
+    only ever appended to and flushed line by line, so a crash or rerun loses
+    at most the line being written and a job can resume from the last one.
+    """
+
+    RECORDS_FILE = "records.jsonl"
+    MANIFEST_FILE = "manifest.jsonl"
+
+    def __init__(self, job_dir):
+        self.job_dir = job_dir
+        self.job_id = os.path.basename(os.path.normpath(job_dir))
+        os.makedirs(job_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._records = open(os.path.join(job_dir, self.RECORDS_FILE), 'a', encoding='utf-8')
+        self._manifest = open(os.path.join(job_dir, self.MANIFEST_FILE), 'a', encoding='utf-8')
+
+    @classmethod
+    def create(cls, params, root=CHECKPOINT_DIR):
+        """Start a new job directory recording params"""
+        job_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        store = cls(os.path.join(root, job_id))
+        store._append(store._manifest, {'event': 'start', 'params': params, 'at': time.time()})
+        return store
+
+    @classmethod
+    def open(cls, job_id, root=CHECKPOINT_DIR):
+        return cls(os.path.join(root, job_id))
+
+    @classmethod
+    def list_jobs(cls, root=CHECKPOINT_DIR, incomplete_only=True):
+        """Manifests of the jobs under root, newest first"""
+        jobs = []
+        if not os.path.isdir(root):
+            return jobs
+        for job_id in sorted(os.listdir(root), reverse=True):
+            path = os.path.join(root, job_id, cls.MANIFEST_FILE)
+            if not os.path.exists(path):
+                continue
+            manifest = read_manifest(path)
+            manifest['job_id'] = job_id
+            if manifest['params'] and not (incomplete_only and manifest['complete']):
+                jobs.append(manifest)
+        return jobs
+
+    def _append(self, handle, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            handle.write(line)
+            handle.flush()
+
+    def append_row(self, key, row, keywords):
+        self._append(self._records, {'type': 'row', 'key': key, 'keywords': keywords, 'row': row})
+
+    def append_merge(self, key, keyword):
+        self._append(self._records, {'type': 'merge', 'key': key, 'keyword': keyword})
+
+    def mark_keyword_done(self, keyword):
+        with self._lock:
+            os.fsync(self._records.fileno())
+        self._append(self._manifest, {'event': 'keyword_done', 'keyword': keyword, 'at': time.time()})
+
+    def mark_complete(self):
+        self._append(self._manifest, {'event': 'complete', 'at': time.time()})
+
+    def manifest(self):
+        return read_manifest(os.path.join(self.job_dir, self.MANIFEST_FILE))
+
+    def iter_records(self):
+        """Yield every record written so far, skipping a torn final line"""
+        with self._lock:
+            self._records.flush()
+        yield from read_records(self.job_dir)
+
+    def iter_results(self):
+        """Yield result rows in the order they were extracted, with every matching keyword"""
+        with self._lock:
+            self._records.flush()
+        yield from read_results(self.job_dir)
+
+    def export(self, fmt='csv', path=None, summary=None):
+        """Stream the results into a CSV, NDJSON or Parquet file (default: results.<ext> in the job directory)
+
+        Returns (path, row count). Exported rows are also added to summary, a ResultSummary.
+        """
+        fmt = 'ndjson' if fmt == 'jsonl' else fmt
+        path = path or os.path.join(self.job_dir, "results" + EXPORT_FORMATS[fmt])
+        if fmt == 'parquet':
+            handle = open(path, 'wb')
+        else:
+            handle = open(path, 'w', newline='', encoding='utf-8')
+        with handle:
+            writer = ResultWriter(handle, fmt)
+            rows = self.iter_results()
+            writer.write(rows if summary is None else summary.tally(rows))
+            writer.close()
+        return path, writer.count
+
+    def export_csv(self, path=None, summary=None):
+        return self.export('csv', path, summary)
+
+    def close(self):
+        with self._lock:
+            self._records.close()
+            self._manifest.close()
+
+def read_records(job_dir):
+    """Yield the records of a job directory's records.jsonl without opening it for writing"""
+    with open(os.path.join(job_dir, CheckpointStore.RECORDS_FILE), encoding='utf-8') as handle:
+        for line in handle:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Torn final line
+
+def read_results(job_dir):
+    """Yield a job directory's result rows in the order they were extracted, with every matching keyword"""
+    merges = {}
+    for record in read_records(job_dir):
+        if record['type'] == 'merge':
+            merges.setdefault(record['key'], []).append(record['keyword'])
+    for record in read_records(job_dir):
+        if record['type'] != 'row':
+            continue
+        keywords = list(record['keywords'])
+        for keyword in merges.get(record['key'], []):
+            if keyword not in keywords:
+                keywords.append(keyword)
+        row = type_result(record['row'])
+        row['keyword'] = KEYWORD_SEPARATOR.join(keywords)
+        yield row
+
+def read_manifest(path):
+    """Summarize a manifest.jsonl: params, finished keywords, completion and start time"""
+    manifest = {'params': None, 'done_keywords': [], 'complete': False, 'started_at': None}
+    with open(path, encoding='utf-8') as handle:
+        for line in handle:
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if event['event'] == 'start':
+                manifest['params'] = event['params']
+                manifest['started_at'] = event['at']
+            elif event['event'] == 'keyword_done' and event['keyword'] not in manifest['done_keywords']:
+                manifest['done_keywords'].append(event['keyword'])
+            elif event['event'] == 'complete':
+                manifest['complete'] = True
+    return manifest
+
+# Page snapshots: with snapshots on, the HTML of every extracted detail pane is
+# kept zlib-compressed in the job directory, so fields can be re-derived later
+# without a browser (see reextract_snapshots and reextract_cli.py)
+SNAPSHOT_FILE = "snapshots.sqlite3"
+SNAPSHOT_COMPRESSION = 6
+# Size of the id ranges handed to each re-extraction worker process
+REEXTRACT_CHUNK_SIZE = 500
+
+# The place pane containing the name heading, or the whole body if there is none
+SNAPSHOT_JS = """
+const heading = document.querySelector(arguments[0]);
+const pane = heading && heading.closest('div[role="main"]');
+return (pane || document.body).outerHTML;
+"""
+
+class SnapshotArchive:
+    """SQLite file of compressed detail pane snapshots: (id, url, place key, capture time, HTML)
+
+    Writers are serialized by a lock; any number of processes can read the
+    file at the same time, each through its own connection.
+    """
+
+    def __init__(self, path, readonly=False):
+        self.path = path
+        self._lock = threading.Lock()
+        if readonly:
+            self._conn = sqlite3.connect(f"file:{urllib.parse.quote(os.path.abspath(path))}?mode=ro", uri=True, check_same_thread=False)
+            return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                "id INTEGER PRIMARY KEY, url TEXT NOT NULL, key TEXT NOT NULL, captured_at REAL NOT NULL, "
+                "html BLOB NOT NULL)"
+            )
+
+    @classmethod
+    def for_job(cls, job_dir, readonly=False):
+        return cls(os.path.join(job_dir, SNAPSHOT_FILE), readonly)
+
+    def add(self, url, html):
+        data = zlib.compress(html.encode('utf-8'), SNAPSHOT_COMPRESSION)
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO snapshots (url, key, captured_at, html) VALUES (?, ?, ?, ?)",
+                               (url, place_key(url), time.time(), data))
+        return len(data)
+
+    def id_range(self):
+        """(first id, last id) of the stored snapshots, or (None, None) when empty"""
+        with self._lock:
+            return self._conn.execute("SELECT MIN(id), MAX(id) FROM snapshots").fetchone()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+
+    def iter_snapshots(self, first_id=None, last_id=None):
+        """Yield (id, url, captured_at, html) in capture order, optionally for an id range"""
+        query = "SELECT id, url, captured_at, html FROM snapshots WHERE id >= ? AND id <= ? ORDER BY id"
+        with self._lock:
+            rows = self._conn.execute(query, (first_id or 0, last_id if last_id is not None else 2 ** 63 - 1)).fetchall()
+        for snapshot_id, url, captured_at, data in rows:
+            yield snapshot_id, url, captured_at, zlib.decompress(data).decode('utf-8')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# Offline evaluation of the field specs on stored HTML, mirroring FIELD_SPEC_JS.
+# innerText is approximated by putting block-level elements on their own lines.
+HTML_BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'fieldset', 'figcaption',
+    'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav', 'ol',
+    'p', 'pre', 'section', 'table', 'tr', 'ul',
+}
+HTML_SKIPPED_TAGS = {'script', 'style', 'template', 'noscript'}
+# Attributes the browser reports as absolute URLs (DOM properties)
+HTML_URL_ATTRS = {'href', 'src', 'action'}
+
+def html_text(element):
+    """Approximate innerText of an lxml element"""
+    parts = []
+
+    def walk(node):
+        tag = node.tag.lower() if isinstance(node.tag, str) else None
+        if tag in HTML_SKIPPED_TAGS:
+            return
+        block = tag in HTML_BLOCK_TAGS
+        if block:
+            parts.append("\n")
+        if tag is not None and node.text:
+            parts.append(node.text)
+        for child in node:
+            walk(child)
+            if child.tail:
+                parts.append(child.tail)
+        if block:
+            parts.append("\n")
+
+    walk(element)
+    lines = (re.sub(r'[ \t\r\f\v]+', ' ', line).strip() for line in "".join(parts).split("\n"))
+    return "\n".join(line for line in lines if line)
+
+def read_html_attr(element, attr, base_url):
+    if attr == 'text':
+        return html_text(element)
+    value = element.get(attr)
+    if value is not None and attr in HTML_URL_ATTRS:
+        return urllib.parse.urljoin(base_url, value)
+    return value
+
+def apply_post_step(value, step):
+    """Python twin of applyStep in FIELD_SPEC_JS"""
+    if step[0] == 'split':
+        parts = value.split() if step[1] is None else value.split(step[1])
+        index = step[2] + len(parts) if step[2] < 0 else step[2]
+        if not 0 <= index < len(parts):
+            raise ValueError(f"split index {step[2]} out of range")
+        return parts[index]
+    if step[0] == 'replace':
+        return value.replace(step[1], step[2])
+    if step[0] == 'strip':
+        return value.strip()
+    raise ValueError(f"unknown step {step[0]}")
+
+_compiled_specs = {}
+
+def compile_field_specs(specs):
+    """Field specs with CSS selectors compiled for lxml, cached per process"""
+    cache_key = json.dumps(specs, sort_keys=True)
+    compiled = _compiled_specs.get(cache_key)
+    if compiled is None:
+        compiled = [
+            (name, [(CSSSelector(candidate['selector']), candidate) for candidate in candidates])
+            for name, candidates in specs.items()
+        ]
+        _compiled_specs[cache_key] = compiled
+    return compiled
+
+def extract_fields_html(html, specs, base_url=""):
+    """Evaluate field specs on an HTML document; returns (fields, errors) like extractFields()"""
+    if lxml is None:
+        raise RuntimeError("Offline extraction needs lxml and cssselect (pip install lxml cssselect)")
+    root = lxml.html.fromstring(html)
+    fields, errors = {}, {}
+    for name, candidates in compile_field_specs(specs):
+        failures = []
+        for selector, candidate in candidates:
+            matches = selector(root)
+            if not matches:
+                failures.append(f"no element matches {candidate['selector']}")
+                continue
+            value = read_html_attr(matches[0], candidate['attr'], base_url)
+            if value is None:
+                failures.append(f"no {candidate['attr']} on {candidate['selector']}")
+                continue
+            try:
+                for step in candidate.get('post', []):
+                    value = apply_post_step(value, step)
+            except ValueError as e:
+                failures.append(str(e))
+                continue
+            fields[name] = value
+            break
+        if name not in fields:
+            fields[name] = ""
+            errors[name] = "; ".join(failures)
+    return fields, errors
+
+def extract_snapshot(url, html, specs=None):
+    """A result item from a stored detail pane, with the same columns as extract_details_js"""
+    fields, _ = extract_fields_html(html, specs or DETAIL_FIELD_SPECS, url)
+    item = {'name': fields.pop('name', ""), 'link': url}
+    item.update(fields)
+    return item
+
+def reextract_chunk(path, first_id, last_id, specs):
+    """Re-extract one id range of an archive; runs in a worker process"""
+    archive = SnapshotArchive(path, readonly=True)
+    try:
+        items = []
+        for _, url, captured_at, html in archive.iter_snapshots(first_id, last_id):
+            item = extract_snapshot(url, html, specs)
+            item['scraped_at'] = datetime.fromtimestamp(captured_at).strftime(SCRAPED_AT_FORMAT)
+            items.append(type_result(item))
+        return items
+    finally:
+        archive.close()
+
+def reextract_snapshots(paths, specs=None, workers=None, chunk_size=REEXTRACT_CHUNK_SIZE):
+    """Yield a typed result item for every snapshot in the archives at paths, in capture order
+
+    Archives are split into id ranges of chunk_size that a process pool of
+    `workers` processes (default: one per CPU) parses in parallel; only a
+    few chunks per worker are in flight, so memory stays bounded.
+    """
+    if lxml is None:
+        raise RuntimeError("Offline extraction needs lxml and cssselect (pip install lxml cssselect)")
+    specs = specs or DETAIL_FIELD_SPECS
+    chunks = []
+    for path in paths:
+        archive = SnapshotArchive(path, readonly=True)
+        first, last = archive.id_range()
+        archive.close()
+        if first is not None:
+            chunks += [(path, start, min(start + chunk_size - 1, last)) for start in range(first, last + 1, chunk_size)]
+    workers = max(1, workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(executor.submit(reextract_chunk, *chunk, specs))
+            if len(in_flight) >= workers * 4:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+# Geographic tiling: Maps stops at about TILE_RESULT_CAP results per search, so a
+# location's bounding box is searched as a grid of viewports and tiles returning at
+# least TILE_SATURATED_RESULTS are split in four, up to TILE_MAX_DEPTH times
+TILE_RESULT_CAP = int(os.environ.get("SCRAPER_TILE_RESULT_CAP", "120"))
+TILE_SATURATED_RESULTS = int(os.environ.get("SCRAPER_TILE_SATURATED_RESULTS", "100"))
+TILE_MAX_DEPTH = int(os.environ.get("SCRAPER_TILE_MAX_DEPTH", "3"))
+DEFAULT_TILE_KM = float(os.environ.get("SCRAPER_TILE_KM", "3"))
+# Map area of the browser window; the results panel covers its left side.
+# TILE_VIEWPORT_PX is the lean window's, used when the driver's cannot be read
+TILE_RESULTS_PANEL_PX = 400
+TILE_VIEWPORT_PX = (LEAN_WINDOW_SIZE[0] - TILE_RESULTS_PANEL_PX, LEAN_WINDOW_SIZE[1])
+KM_PER_DEGREE = 111.32
+
+# Built-in bounding boxes (south, west, north, east) for tiling a location by name
+LOCATION_BBOXES = {
+    'taipei': (24.960, 121.457, 25.210, 121.666),
+    'new taipei': (24.670, 121.280, 25.300, 122.010),
+    'tokyo': (35.530, 139.560, 35.820, 139.920),
+    'seoul': (37.413, 126.734, 37.715, 127.269),
+    'hong kong': (22.153, 113.835, 22.562, 114.441),
+    'singapore': (1.230, 103.605, 1.470, 104.030),
+    'sydney': (-34.118, 150.521, -33.578, 151.343),
+    'london': (51.287, -0.510, 51.692, 0.334),
+    'paris': (48.816, 2.224, 48.902, 2.470),
+    'berlin': (52.338, 13.088, 52.676, 13.761),
+    'new york': (40.477, -74.259, 40.918, -73.700),
+    'san francisco': (37.708, -122.515, 37.832, -122.357),
+    'los angeles': (33.704, -118.668, 34.337, -118.155),
+    'chicago': (41.645, -87.940, 42.023, -87.524),
+}
+
+def map_viewport(driver):
+    """(width, height) in pixels of the map area of the driver's window
+
+    Non-lean drivers are maximized, so their window is whatever the screen
+    allows; the zoom of a tile is computed from the size actually in use.
+    """
+    try:
+        width, height = driver.execute_script("return [window.innerWidth, window.innerHeight];")
+        return max(1, int(width) - TILE_RESULTS_PANEL_PX), max(1, int(height))
+    except (WebDriverException, TypeError, ValueError):
+        return TILE_VIEWPORT_PX
+
+def resolve_bbox(location):
+    """(south, west, north, east) from "south,west,north,east" or a LOCATION_BBOXES name, else None"""
+    parts = [part.strip() for part in (location or "").split(',')]
+    if len(parts) == 4:
+        try:
+            south, west, north, east = (float(part) for part in parts)
+        except ValueError:
+            pass
+        else:
+            if not (-90 <= south < north <= 90 and -180 <= west < east <= 180):
+                raise ValueError(f"invalid bounding box {location!r}: expected south,west,north,east")
+            return south, west, north, east
+    return LOCATION_BBOXES.get(normalize_text(location))
+
+class Tile:
+    """A rectangular search area, searched as the viewport centered on it at the
+    highest zoom that still shows all of it"""
+
+    def __init__(self, south, west, north, east, depth=0):
+        self.south = south
+        self.west = west
+        self.north = north
+        self.east = east
+        self.depth = depth
+
+    @property
+    def center(self):
+        return (self.south + self.north) / 2, (self.west + self.east) / 2
+
+    def zoom(self, viewport=TILE_VIEWPORT_PX):
+        lat, _ = self.center
+        width, height = viewport
+        # At zoom z the viewport spans 360 * px / (256 * 2**z) degrees of longitude
+        lng_zoom = math.log2(360 * width / (256 * max(self.east - self.west, 1e-6)))
+        lat_zoom = math.log2(360 * height * math.cos(math.radians(lat)) / (256 * max(self.north - self.south, 1e-6)))
+        return max(3, min(21, math.floor(min(lng_zoom, lat_zoom))))
+
+    def url(self, keyword, viewport=TILE_VIEWPORT_PX):
+        lat, lng = self.center
+        return f"{MAPS_BASE_URL}/search/{keyword.replace(' ', '+')}/@{lat:.6f},{lng:.6f},{self.zoom(viewport)}z"
+
+    def split(self):
+        """The four quarter tiles, one level deeper"""
+        lat, lng = self.center
+        return [Tile(south, west, north, east, self.depth + 1)
+                for south, north in ((self.south, lat), (lat, self.north))
+                for west, east in ((self.west, lng), (lng, self.east))]
+
+    def __str__(self):
+        lat, lng = self.center
+        return f"{lat:.4f},{lng:.4f} z{self.zoom()}"
+
+def grid_tiles(bbox, tile_km=DEFAULT_TILE_KM):
+    """Split a bounding box into a grid of tiles about tile_km on a side"""
+    south, west, north, east = bbox
+    lat_km = (north - south) * KM_PER_DEGREE
+    lng_km = (east - west) * KM_PER_DEGREE * math.cos(math.radians((south + north) / 2))
+    rows = max(1, math.ceil(lat_km / tile_km))
+    cols = max(1, math.ceil(lng_km / tile_km))
+    lat_step = (north - south) / rows
+    lng_step = (east - west) / cols
+    return [Tile(south + r * lat_step, west + c * lng_step, south + (r + 1) * lat_step, west + (c + 1) * lng_step)
+            for r in range(rows) for c in range(cols)]
+
+# 'full' opens every listing; 'fast' reads result cards; 'network' also decodes search payloads
+EXTRACTION_MODES = ['full', 'fast', 'network']
+
+def merge_payload_places(cards, capture, log, timer):
+    """Fill the cards' fields from the places a NetworkCapture decoded
+
+    Payload values are structured, so they replace the card's text where the
+    payload has one; the card keeps anything the payload lacks or failed its
+    check. Decoded values without a result column (coordinates) are not copied.
+    """
+    matched = 0
+    for card in cards:
+        place = capture.places.get(place_key(card['link'])) if card['link'] else None
+        if place is None:
+            continue
+        matched += 1
+        card.update({name: value for name, value in place.items()
+                     if name in RESULT_FIELDS and name != 'link' and value != ""})
+    timer.count('payload_places', matched)
+    timer.count('payload_misses', len(cards) - matched)
+    log(f"[NETWORK] {matched} of {len(cards)} cards matched a decoded place "
+        f"({capture.responses} search responses, {len(capture.places)} places, {capture.errors} unreadable)")
+
+def scrape_keyword(driver, waits, keyword, location, max_results_per_keyword, log, set_status, extractor='js', mode='full', fields=None, detail_tabs=1, cache=None, force_refresh=False, index=None, pages=None, cancel=None, timer=None, tile=None, feed=None, pacer=None, snapshots=None):
+    """Scrape the results of one keyword search with an already running driver
+
+    In 'full' mode every listing's place page is opened and read from the detail
+    pane. In 'fast' mode the result cards are parsed in one pass and only cards
+    missing one of the requested fields get a detail visit. 'network' mode is
+    'fast' mode with the cards completed from Maps' own search payloads, read
+    by a NetworkCapture (the driver needs capture enabled), so that detail
+    visits are left for fields neither source had. Places found in the
+    cache's place layer are not visited at all unless force_refresh is set.
+    With a DedupIndex, places already claimed by another keyword are skipped
+    and only rows this keyword claimed are returned. With a PageStats, bytes and
+    load time of the search page and every detail page are recorded. Setting
+    the cancel event stops the keyword early with JobCancelled. Phase durations
+    and event counts go to `timer`, a PhaseTimer.
+    
+    With a Tile, the keyword is searched in that tile's viewport instead of
+    "keyword in location"; rows still record `location`. The feed is then
+    scrolled to TILE_RESULT_CAP so saturation can be seen, while
+    max_results_per_keyword still caps the keyword's rows across all of its
+    tiles: only the places still missing are extracted. The scroll outcome
+    (ScrollController.stats()) is copied into the `feed` dict, so callers can
+    tell a saturated search from a complete one.
+    
+    Page loads wait for `pacer` (a Pacer) and report their outcome to it. If
+    Maps answers with a consent, captcha or block page, InterstitialPage is
+    raised and this keyword's claims are released, so the search can be
+    retried on another driver. With a SnapshotArchive, every visited detail
+    pane is also stored as HTML; cards and cached places have no snapshot.
+    """
+    timer = timer or PhaseTimer()
+    results = []
+    extract = DETAIL_EXTRACTORS[extractor]
+    extract_latencies = []
+    
+    log(f"\n{'='*80}")
+    log(f"[KEYWORD] Processing: '{keyword}'")
+    log(f"{'='*80}")
+    
+    set_status(f"🔍 Scraping: {keyword} in {location}" + (f" (tile {tile})" if tile is not None else "") + "...")
+    
+    # Build search URL
+    if tile is not None:
+        url = tile.url(keyword, map_viewport(driver))
+    else:
+        search_query = f"{keyword} in {location}"
+        url = f"{MAPS_BASE_URL}/search/{search_query.replace(' ', '+')}"
+    log(f"[URL] Constructed search URL: {url}")
+    
+    capture = None
+    if mode == 'network':
+        capture = NetworkCapture(driver)
+        capture.reset()  # Drop traffic of the driver's previous pages
+    
+    pace(pacer, cancel, timer)
+    log(f"[NAV] Navigating to URL...")
+    search_start = time.perf_counter()
+    with timer.span('navigate'):
+        navigate(driver, url)
+    log(f"[NAV] Page loaded, current URL: {driver.current_url}")
+    
+    # Wait for the results container to appear instead of sleeping a fixed 15 seconds
+    # This XPath matches the working code pattern (main_scraper.py line 42)
+    log(f"[WAIT] Waiting up to {waits.timeouts['results_feed']}s for results container: '{RESULTS_CONTAINER_XPATH}'")
+    try:
+        try:
+            results_container = waits.results_feed()
+        finally:
+            timer.record('feed_wait', waits.latencies['results_feed'][-1])
+        search_seconds = time.perf_counter() - search_start
+        timer.record('search', search_seconds)
+        report_page(driver, pacer, True, search_seconds, timer)
+        aria_label = results_container.get_attribute("aria-label")
+        log(f"[WAIT] Wait complete in {waits.latencies['results_feed'][-1]:.2f}s")
+        log(f"[CONTAINER] ✓ Results container found! aria-label: '{aria_label}'")
+    except Exception as e:
+        kind = detect_interstitial(driver)
+        if kind:
+            report_interstitial(driver, pacer)
+            log.warning("[CONTAINER] ✗ Got a %s page instead of the results", kind)
+            raise InterstitialPage(kind, driver.current_url)
+        # If results container doesn't load, skip this keyword
+        log.warning("[CONTAINER] ✗ FAILED to find results container")
+        log.warning("[CONTAINER] Exception: %s", e)
+        log.warning("[CONTAINER] Page source length: %s characters", len(driver.page_source))
+        log.warning("[CONTAINER] Skipping keyword '%s'", keyword)
+        set_status(f"⚠️ Could not find results for: {keyword} in {location}")
+        return results
+    
+    # A tile scrolls to the search cap to tell whether it is saturated, but only
+    # extracts what the keyword still lacks
+    target = max_results_per_keyword
+    budget = max_results_per_keyword
+    if tile is not None:
+        target = TILE_RESULT_CAP
+        claimed = index.keyword_counts[keyword] if index is not None else 0
+        budget = max(0, min(TILE_RESULT_CAP, max_results_per_keyword - claimed))
+        log(f"[TILE] Extraction budget: {budget} of {max_results_per_keyword} results left for '{keyword}'")
+    
+    # Scroll the feed until the target, the end-of-list marker or a stall, collecting
+    # the place URL of each newly appended card as it goes
+    log(f"\n[SCROLL] Starting scroll phase - target results: {target}")
+    scroller = ScrollController(driver, waits, target, log,
+                                on_step=capture.drain if capture is not None else None)
+    try:
+        with timer.span('scroll'):
+            scroller.run()
+    except Exception as e:
+        log.warning("[SCROLL] ✗ Exception during scroll: %s", e)
+        if isinstance(e, StaleElementReferenceException):
+            timer.count('stale_elements')
+    scroll_stats = scroller.stats()
+    for _, seconds, _ in scroller.steps:
+        timer.record('scroll_step', seconds)
+    timer.count('scroll_stalls', scroll_stats['stalls'])
+    if feed is not None:
+        feed.update(scroll_stats)
+    log(f"[SCROLL] Scroll phase complete - {scroll_stats['cards']} cards in {scroll_stats['scrolls']} scrolls, "
+        f"{scroll_stats['seconds']:.1f}s ({scroll_stats['cards_per_second']:.1f} cards/s, {scroll_stats['stalls']} stalls)")
+    if pages is not None:
+        pages.record(driver, 'search')
+    if cancel is not None and cancel.is_set():
+        raise JobCancelled()
+    
+    # Details are fetched by opening each place URL directly instead of clicking
+    # the card and going Back
+    if mode != 'full':
+        fields = fields or RESULT_FIELDS
+        with timer.span('cards'):
+            cards = extract_cards(driver, keyword, location, log)[:budget]
+        if capture is not None:
+            with timer.span('payloads'):
+                capture.drain()
+            merge_payload_places(cards, capture, log, timer)
+        links = [card['link'] for card in cards]
+    else:
+        links = scroller.links[:budget]
+        cards = [None] * len(links)
+    
+    # Claim each place in the job-wide index before spending browser time on it;
+    # places another keyword already claimed are merged into that row instead
+    keys = {}
+    duplicates = set()
+    if index is not None:
+        for i, link in enumerate(links):
+            card = cards[i] or {}
+            key = DedupIndex.key_for(link, card.get('name'), card.get('address'))
+            if index.claim(key, keyword):
+                keys[i] = key
+            else:
+                duplicates.add(i)
+        if duplicates:
+            log(f"[DEDUP] ✓ {len(duplicates)} places already scraped for another keyword or tile, skipping them")
+    
+    if mode != 'full':
+        work = [(i, card['link']) for i, card in enumerate(cards) if i not in duplicates and card_missing_fields(card, fields)]
+        log(f"[FAST] {len(cards) - len(duplicates) - len(work)} cards complete, {len(work)} need a detail visit")
+    else:
+        work = [(i, link) for i, link in enumerate(links) if i not in duplicates]
+        log(f"[EXTRACT] Queued {len(work)} place URLs")
+    
+    skipped = [i for i, link in work if not link]
+    if skipped:
+        log.warning("[EXTRACT] ✗ %s cards have no place URL and cannot be opened", len(skipped))
+        timer.count('items_skipped', len(skipped))
+    work = [(i, link) for i, link in work if link]
+    
+    cached = {}
+    if cache is not None and not force_refresh:
+        for i, link in work:
+            record = cache.get_place(link)
+            if record is not None:
+                cached[i] = record
+        if cached:
+            log(f"[CACHE] ✓ {len(cached)} of {len(work)} places served from cache")
+            work = [(i, link) for i, link in work if i not in cached]
+    
+    def on_item(done):
+        set_status(f"🔍 Scraping: {keyword} in {location} - {done}/{len(work)} listings fetched")
+    
+    try:
+        with timer.span('details'):
+            details = fetch_place_details(driver, waits, work, extract, log, tabs=detail_tabs,
+                                          extract_latencies=extract_latencies, on_item=on_item, pages=pages,
+                                          cancel=cancel, timer=timer, pacer=pacer, snapshots=snapshots)
+    except (InterstitialPage, WebDriverException):
+        # The search will be retried on another driver, which must be able to claim the
+        # places still without a row again; other keywords' matches stay merged
+        for key in keys.values():
+            if not index.has_row(key):
+                index.release(key)
+        raise
+    if cache is not None:
+        work_links = dict(work)
+        for i, item in details.items():
+            cache.put_place(work_links[i], item)
+    details.update(cached)
+    
+    for i, item in details.items():
+        if cards[i] is None:
+            item['keyword'] = keyword
+            item['location'] = location
+            item['scraped_at'] = datetime.now().strftime(SCRAPED_AT_FORMAT)
+            cards[i] = item
+        else:
+            # Fill in what the card lacked; card values win where the detail pane came up empty
+            cards[i].update({name: value for name, value in item.items() if value})
+    
+    for i, card in enumerate(cards):
+        if i in duplicates:
+            continue
+        if tile is not None and index is not None and index.keyword_counts[keyword] >= max_results_per_keyword:
+            # Tiles running in parallel filled the keyword meanwhile
+            if i in keys:
+                index.release(keys[i])
+            continue
+        if card and card['name']:
+            type_result(card)
+            if index is None or index.add(keys.get(i), card):
+                results.append(card)
+        elif i in keys:
+            index.release(keys[i])
+    log(f"[EXTRACT] ✓ {len(results)} new businesses collected for '{keyword}'")
+    if cancel is not None and cancel.is_set():
+        # Rows collected so far are already in the index; the keyword itself stays unfinished
+        raise JobCancelled(results)
+    
+    log_extraction_summary(extract_latencies, extractor, log)
+    log_wait_summary(waits, log)
+    return results
+
+class ProgressReporter:
+    """Receives a job's progress from scrape_google_maps; every hook is optional
+
+    Hooks are called on the thread that called scrape_google_maps, never on a
+    scraping worker, so they may update UI elements directly.
+    """
+
+    def job_started(self, store, log_buffer):
+        """The job's checkpoint store and log ring buffer are ready"""
+
+    def progress(self, completed, total, status):
+        """Called about twice a second; status is the latest worker status message or None"""
+
+    def rows_added(self, keyword, rows):
+        """New rows one of the keyword's searches (a tile, with tiling) added, as soon as it finishes"""
+
+    def keyword_done(self, keyword, count, error=None):
+        """A keyword finished, having added count new rows, or failed with error"""
+
+    def job_finished(self, store, failed_keywords):
+        """The job's final summary has been logged"""
+
+def scrape_google_maps(keywords, location, max_results_per_keyword, reporter=None, wait_timeouts=None, pool_size=None, pool=None, extractor='js', mode='full', fields=None, detail_tabs=1, cache=None, force_refresh=False, store=None, log_level=logging.INFO, log_jsonl=False, lean=DEFAULT_LEAN_PROFILE, pages=None, cancel=None, timer=None, tiling=False, bbox=None, tile_km=None, pacer=None, snapshots=False):
+    """Scrape Google Maps for business information
+
+    With a shared pool the drivers stay warm for the next job; otherwise a
+    temporary pool is created and its drivers are quit when the job ends.
+    Keywords found in the cache's query layer never touch a browser unless
+    force_refresh is set; fresh results are written back to the cache.
+
+    Every extracted business is streamed to a CheckpointStore as soon as it is
+    added, and the store is returned. Passing the store of an interrupted job
+    resumes it: finished keywords are skipped and places already in the store
+    are not visited again.
+
+    Browsers use the lean profile (no images, media, fonts or map tiles) unless
+    lean is False. In 'network' mode the drivers also capture network
+    traffic, so drivers pooled without it are replaced. Per-page bytes and load times are collected into `pages`
+    and phase durations and event counts into `timer` (a PhaseTimer). Progress is reported to
+    `reporter`, a ProgressReporter. Setting `cancel` (a threading.Event) stops
+    the job early; its checkpoint stays resumable.
+
+    With tiling, each keyword is searched over a grid of viewports covering
+    `bbox` (south, west, north, east), by default the location's built-in
+    bounding box (see resolve_bbox). Tiles are scheduled as independent
+    searches across the pool; saturated tiles are split and searched again,
+    and overlapping tiles share places through the job's dedup index.
+    max_results_per_keyword then caps the whole keyword rather than a search.
+    
+    Page loads of all workers are spaced by `pacer` (a Pacer, one per job by
+    default). A search that hits an interstitial page or a browser failure is
+    retried on a fresh driver, up to SEARCH_MAX_ATTEMPTS times.
+    
+    With snapshots, the HTML of every visited detail pane is saved to
+    snapshots.sqlite3 in the job directory for offline re-extraction.
+    """
+    reporter = reporter or ProgressReporter()
+    total_keywords = len(keywords)
+    initial_tiles = []
+    if tiling:
+        bbox = tuple(bbox) if bbox else resolve_bbox(location)
+        if bbox is None:
+            raise ValueError(f"no bounding box for '{location}'; pass south,west,north,east "
+                             f"or one of: {', '.join(sorted(LOCATION_BBOXES))}")
+        initial_tiles = grid_tiles(bbox, tile_km or DEFAULT_TILE_KM)
+    # Tiles of one keyword can run in parallel, so tiling is not capped by the keyword count
+    pool_size = max(1, min(pool_size or DEFAULT_POOL_SIZE, total_keywords * max(1, len(initial_tiles))))
+    latest_status = [None]
+    profile = 'lean' if lean else 'full'
+    if pages is None:
+        pages = PageStats(profile)
+    timer = timer or PhaseTimer()
+    pacer = pacer or Pacer()
+    cancel = cancel or threading.Event()  # Also set when the scheduling loop is interrupted
+    
+    owns_store = store is None
+    if owns_store:
+        store = CheckpointStore.create({
+            'keywords': keywords, 'location': location, 'max_results': max_results_per_keyword,
+            'mode': mode, 'fields': fields, 'extractor': extractor, 'detail_tabs': detail_tabs,
+            'lean': lean, 'tiling': tiling, 'bbox': list(bbox) if tiling else None, 'tile_km': tile_km,
+        })
+        done_keywords = set()
+    else:
+        done_keywords = set(store.manifest()['done_keywords']) & set(keywords)
+    
+    log, log_buffer = create_job_logger(store.job_id, log_level,
+                                        os.path.join(store.job_dir, LOG_JSONL_FILE) if log_jsonl else None)
+    try:
+        def set_status(message):
+            latest_status[0] = message
+    
+        # Log: Driver initialization
+        log(f"\n{'='*80}")
+        log(f"[INIT] Starting scraper with {total_keywords} keywords")
+        log(f"[INIT] Location: {location}")
+        log(f"[INIT] Max results per keyword: {max_results_per_keyword}")
+        log(f"[INIT] Wait timeouts: {wait_timeouts or DEFAULT_WAIT_TIMEOUTS}")
+        log(f"[INIT] Driver pool size: {pool_size}")
+        log(f"[INIT] Field extractor: {extractor}")
+        log(f"[INIT] Detail tabs per browser: {detail_tabs}")
+        log(f"[INIT] Browsing profile: {profile}")
+        if tiling:
+            log(f"[INIT] Tiling: {len(initial_tiles)} tiles over {bbox}, split when a search returns "
+                f"{TILE_SATURATED_RESULTS}+ results (max depth {TILE_MAX_DEPTH})")
+        log(f"[INIT] Result cache: {'off' if cache is None else cache.path}" + (" (force refresh)" if cache is not None and force_refresh else ""))
+        log(f"[INIT] Extraction mode: {mode}" + (f" (fields: {', '.join(fields)})" if mode != 'full' and fields else ""))
+        log(f"{'='*80}\n")
+    
+        owns_pool = pool is None
+        if owns_pool:
+            pool = DriverPool(pool_size)
+        else:
+            log(f"[DRIVER] Using warm session pool: {pool.stats()}")
+        job_id = uuid.uuid4().hex
+        job_waits = WaitEngine(None, wait_timeouts)
+    
+        log(f"[CHECKPOINT] Streaming results to {store.job_dir}")
+        if log_jsonl:
+            log(f"[CHECKPOINT] Writing JSONL log to {os.path.join(store.job_dir, LOG_JSONL_FILE)}")
+        archive = SnapshotArchive.for_job(store.job_dir) if snapshots else None
+        if archive is not None:
+            log(f"[CHECKPOINT] Saving detail page snapshots to {archive.path}")
+        index = DedupIndex(store.append_row, store.append_merge)
+        if done_keywords or os.path.getsize(os.path.join(store.job_dir, store.RECORDS_FILE)):
+            index.restore(store)
+            log(f"[RESUME] Restored {len(index)} businesses; skipping {len(done_keywords)} finished keywords")
+        browser_keywords = set()
+    
+        # The query layer caches a keyword's complete result list, so tiled and
+        # single-search results are cached under different locations
+        cache_location = f"{location} [tiled]" if tiling else location
+    
+        def run_search(keyword, tile=None):
+            """One search: the keyword in the location, or in one tile's viewport"""
+            keyword_log = log.for_keyword(keyword if tile is None else f"{keyword} @ {tile}", pool_size > 1)
+            if tile is not None and index.keyword_counts[keyword] >= max_results_per_keyword:
+                keyword_log(f"[TILE] Keyword already has {max_results_per_keyword} results, skipping tile")
+                return [], WaitEngine(None, wait_timeouts), PageStats(profile), PhaseTimer(), {}
+            keyword_timer = PhaseTimer()
+            feed = {}
+            acquire_start = time.perf_counter()
+            with pool.driver(job_id, lean, mode == 'network', cancel) as driver:
+                keyword_timer.record('driver', time.perf_counter() - acquire_start)
+                keyword_log(f"[DRIVER] Chrome driver ready")
+                waits = WaitEngine(driver, wait_timeouts)
+                keyword_pages = PageStats(profile)
+                with keyword_timer.span('keyword' if tile is None else 'tile'):
+                    results = scrape_keyword(driver, waits, keyword, location, max_results_per_keyword, keyword_log,
+                                             set_status, extractor, mode, fields, detail_tabs, cache, force_refresh,
+                                             index, keyword_pages, cancel, keyword_timer, tile, feed, pacer,
+                                             archive)
+            keyword_timer.count('wait_timeouts', sum(waits.timeouts_hit.values()))
+            return results, waits, keyword_pages, keyword_timer, feed
+    
+        def cached_results(keyword):
+            """The keyword's rows from the cache's query layer, or None on a miss"""
+            if cache is None or force_refresh:
+                return None
+            cached = cache.get_query(ResultCache.query_key(keyword, cache_location, max_results_per_keyword, mode, fields))
+            if cached is None:
+                return None
+            log.for_keyword(keyword, pool_size > 1)(f"[CACHE] ✓ {len(cached)} cached results for '{keyword}', skipping browser")
+            results = []
+            for row in cached:
+                type_result(row)
+                key = DedupIndex.key_for(row.get('link'), row.get('name'), row.get('address'))
+                if index.claim(key, keyword) and index.add(key, row):
+                    results.append(row)
+            return results
+    
+        completed = len(done_keywords)
+        failed_keywords = []
+        cancelled = False
+        outstanding = Counter()  # keyword -> searches queued or running
+        keyword_added = Counter()  # keyword -> new rows its searches added so far
+        keyword_errors = {}      # keyword -> first error of one of its searches
+        reporter.job_started(store, log_buffer)
+        reporter.progress(completed, total_keywords, None)
+    
+        def finish_keyword(keyword):
+            nonlocal completed
+            completed += 1
+            count = keyword_added.pop(keyword, 0)
+            error = keyword_errors.get(keyword)
+            if error is not None:
+                log.error("[KEYWORD] ✗ '%s' failed: %s", keyword, error)
+                failed_keywords.append(keyword)
+                timer.count('keywords_failed')
+                reporter.keyword_done(keyword, count, error)
+            else:
+                timer.count('keywords_done')
+                store.mark_keyword_done(keyword)
+                reporter.keyword_done(keyword, count)
+            log(f"\n[KEYWORD {completed}/{total_keywords}] Complete - Collected {index.keyword_counts[keyword]} results "
+                f"for '{keyword}' ({count} new)")
+            log(f"[SUMMARY] Total results so far: {len(index)}")
+    
+        try:
+            with ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="scraper") as executor:
+                pending = {}
+                try:
+                    def submit(keyword, tile=None, attempt=1):
+                        outstanding[keyword] += 1
+                        pending[executor.submit(run_search, keyword, tile)] = (keyword, tile, attempt)
+            
+                    for keyword in keywords:
+                        if keyword in done_keywords:
+                            continue
+                        cached = cached_results(keyword)
+                        if cached is not None:
+                            keyword_added[keyword] = len(cached)
+                            reporter.rows_added(keyword, cached)
+                            finish_keyword(keyword)
+                            continue
+                        browser_keywords.add(keyword)
+                        for tile in initial_tiles or [None]:
+                            submit(keyword, tile)
+            
+                    while pending:
+                        if cancel is not None and cancel.is_set() and not cancelled:
+                            cancelled = True
+                            log.warning("[CANCEL] Job cancelled; stopping running keywords after their current page")
+                            for future in list(pending):
+                                if future.cancel():  # Not started yet
+                                    pending.pop(future)
+                            if not pending:
+                                break
+                        done, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            keyword, tile, attempt = pending.pop(future)
+                            outstanding[keyword] -= 1
+                            try:
+                                results, waits, search_pages, search_timer, feed = future.result()
+                            except JobCancelled as e:
+                                cancelled = True
+                                log.warning("[CANCEL] '%s' stopped before finishing", keyword)
+                                # Its rows are in the checkpoint already, so they are reported and exported
+                                keyword_added[keyword] += len(e.rows)
+                                reporter.rows_added(keyword, e.rows)
+                                if not outstanding[keyword]:
+                                    reporter.keyword_done(keyword, keyword_added.pop(keyword, 0), e)
+                                continue
+                            except (InterstitialPage, WebDriverException) as e:
+                                if isinstance(e, InterstitialPage):
+                                    timer.count('interstitials')
+                                    timer.count('pacing_backoffs')
+                                if attempt < SEARCH_MAX_ATTEMPTS and not cancelled:
+                                    # The driver was retired; the pacer decides when the retry loads its page
+                                    timer.count('searches_retried')
+                                    log.warning("[RETRY] '%s'%s failed on attempt %s/%s (%s), retrying on another driver",
+                                                keyword, f" @ {tile}" if tile is not None else "", attempt,
+                                                SEARCH_MAX_ATTEMPTS, type(e).__name__)
+                                    submit(keyword, tile, attempt + 1)
+                                else:
+                                    if tile is not None:
+                                        log.error("[TILE] ✗ '%s' @ %s failed: %s", keyword, tile, e)
+                                    keyword_errors.setdefault(keyword, e)
+                            except Exception as e:
+                                if tile is not None:
+                                    log.error("[TILE] ✗ '%s' @ %s failed: %s", keyword, tile, e)
+                                keyword_errors.setdefault(keyword, e)
+                            else:
+                                job_waits.merge(waits)
+                                pages.merge(search_pages)
+                                timer.merge(search_timer)
+                                # Rows are handed on per search, so a tiled keyword is never held in memory
+                                keyword_added[keyword] += len(results)
+                                reporter.rows_added(keyword, results)
+                                if tile is not None and feed:
+                                    timer.count('tiles_searched')
+                                    if index.keyword_counts[keyword] >= max_results_per_keyword:
+                                        # The keyword is full; its queued tiles would only be skipped
+                                        for queued, (other, _, _) in list(pending.items()):
+                                            if other == keyword and queued.cancel():
+                                                pending.pop(queued)
+                                                outstanding[keyword] -= 1
+                                                timer.count('tiles_skipped')
+                                    elif feed['cards'] >= TILE_SATURATED_RESULTS:
+                                        if tile.depth < TILE_MAX_DEPTH and not cancelled:
+                                            timer.count('tiles_split')
+                                            log(f"[TILE] '{keyword}' @ {tile} saturated with {feed['cards']} results, "
+                                                f"splitting into 4 tiles")
+                                            for child in tile.split():
+                                                submit(keyword, child)
+                                        else:
+                                            timer.count('tiles_saturated')
+                                            log.warning("[TILE] '%s' @ %s still saturated at depth %s; some places may be missing",
+                                                        keyword, tile, tile.depth)
+                            # After a cancel, tiled keywords may be missing splits and stay unfinished
+                            if not outstanding[keyword] and not (cancelled and tiling):
+                                finish_keyword(keyword)
+                        # Progress counts finished keywords, so it stays monotonic when workers finish out of order
+                        reporter.progress(completed, total_keywords, latest_status[0])
+                except BaseException:
+                    # Interrupted (e.g. KeyboardInterrupt): running searches stop after their current
+                    # page, and queued ones are dropped instead of being run by the executor on exit
+                    cancel.set()
+                    for future in pending:
+                        future.cancel()
+                    raise
+        finally:
+            log(f"\n{'='*80}")
+            if owns_pool:
+                log(f"[CLEANUP] Closing Chrome drivers...")
+                closed = pool.close()
+                log(f"[CLEANUP] {closed} driver(s) closed")
+            else:
+                log(f"[CLEANUP] Drivers returned to the session pool: {pool.stats()}")
+            if archive is not None:
+                archive.close()
+            log(f"{'='*80}\n")
+    
+        # Cache each scraped keyword's complete result list, including rows first claimed
+        # by another keyword, so a later job running it alone gets everything back
+        if cache is not None and browser_keywords:
+            rows_by_keyword = {keyword: [] for keyword in browser_keywords}
+            for row in store.iter_results():
+                for keyword in row['keyword'].split(KEYWORD_SEPARATOR):
+                    if keyword in rows_by_keyword:
+                        rows_by_keyword[keyword].append(dict(row, keyword=keyword))
+            for keyword, rows in rows_by_keyword.items():
+                if rows:
+                    cache.put_query(ResultCache.query_key(keyword, cache_location, max_results_per_keyword, mode, fields), rows)
+    
+        if failed_keywords:
+            log.warning("[CHECKPOINT] %s keyword(s) failed; job %s can be resumed", len(failed_keywords), store.job_id)
+        elif cancelled:
+            log.warning("[CHECKPOINT] Job %s was cancelled and can be resumed", store.job_id)
+        else:
+            store.mark_complete()
+    
+        log(f"\n{'='*80}")
+        log(f"[FINAL] Scraping {'cancelled' if cancelled else 'complete'}!")
+        log(f"[FINAL] Total results collected: {len(index)}")
+        log(f"[FINAL] Keywords processed: {total_keywords}")
+        if len(index):
+            log(f"[FINAL] Results breakdown by keyword:")
+            for kw in keywords:
+                log(f"[FINAL]   - '{kw}': {index.keyword_counts[kw]} results")
+            log(f"[FINAL] Duplicates merged across keywords{' and tiles' if tiling else ''}: {index.duplicates}")
+        else:
+            log.warning("[FINAL] ⚠️ WARNING: No results collected!")
+        log_wait_summary(job_waits, log, prefix="[FINAL]")
+        log_page_summary(pages, log, prefix="[FINAL]")
+        log_phase_summary(timer, log, prefix="[FINAL]")
+        log_pacing_summary(pacer, log, prefix="[FINAL]")
+        log(f"{'='*80}\n")
+        reporter.job_finished(store, failed_keywords)
+    except BaseException:
+        if owns_store:
+            store.close()  # Never handed to the caller
+        raise
+    finally:
+        # Also on errors, so a failed job does not leave its JSONL log open
+        close_job_logger(log)
+    
+    return store
+
+
+# Background jobs: how many run at once across the whole process (each also
+# needs free drivers from the shared pool), and how many finished jobs stay listed
+DEFAULT_MAX_CONCURRENT_JOBS = int(os.environ.get("SCRAPER_MAX_CONCURRENT_JOBS", "2"))
+JOB_HISTORY = int(os.environ.get("SCRAPER_JOB_HISTORY", "50"))
+JOB_RECENT_ROWS = 200
+
+class ScrapeJob(ProgressReporter):
+    """A job submitted to a JobManager, and the ProgressReporter of its own run
+
+    The runner thread updates the plain attributes below; front ends only read
+    them, so polling a job never blocks it. `state` moves from 'queued' to
+    'running' and ends as 'complete', 'partial' (some keywords failed),
+    'cancelled' or 'failed' (the job itself raised).
+    """
+
+    FINISHED_STATES = ('complete', 'partial', 'cancelled', 'failed')
+
+    def __init__(self, job_id, params):
+        self.id = job_id
+        self.params = params  # scrape_google_maps keyword arguments
+        self.state = 'queued'
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.completed = 0
+        self.total = len(params['keywords'])
+        self.status = None
+        self.error = None
+        self.store = params.get('store')
+        self.log_buffer = None
+        self.result_count = 0
+        self.summary = ResultSummary()  # Kept up to date as rows arrive
+        self.recent_rows = deque(maxlen=JOB_RECENT_ROWS)
+        self.failed_keywords = []
+        self.csv_path = None
+        self.cache_stats = None
+        self.pages = PageStats('lean' if params.get('lean', DEFAULT_LEAN_PROFILE) else 'full')
+        self.timer = PhaseTimer()
+        self.in_totals = False  # Set once the manager folded this job's timer into its totals
+        self.cancel_event = threading.Event()
+
+    @property
+    def finished(self):
+        return self.state in self.FINISHED_STATES
+
+    def cancel(self):
+        """Ask the job to stop; a queued job never starts, a running one stops after its current pages"""
+        self.cancel_event.set()
+
+    def job_started(self, store, log_buffer):
+        self.store = store
+        self.log_buffer = log_buffer
+        # A resumed job already has rows in its checkpoint
+        self.summary.add(store.iter_results())
+        self.result_count = self.summary.total
+
+    def progress(self, completed, total, status):
+        self.completed = completed
+        self.total = total
+        if status:
+            self.status = status
+
+    def rows_added(self, keyword, rows):
+        self.recent_rows.extend(rows)
+        self.summary.add(rows)
+        self.result_count = self.summary.total
+
+    def job_finished(self, store, failed_keywords):
+        self.failed_keywords = list(failed_keywords)
+
+class JobManager:
+    """Runs submitted scrape jobs in background threads, at most max_concurrent at a time
+
+    Jobs start in submission order. Keyword arguments given to the manager
+    (e.g. a shared driver pool and result cache) are passed to every job.
+    Finished jobs stay listed, up to keep_finished, so a front end can
+    reattach to them and collect their results. Phase timings and counters of
+    every job the manager ran are kept in process-wide totals for metrics().
+    """
+
+    def __init__(self, max_concurrent=None, keep_finished=JOB_HISTORY, **scrape_kwargs):
+        self.max_concurrent = max(1, max_concurrent or DEFAULT_MAX_CONCURRENT_JOBS)
+        self.keep_finished = keep_finished
+        self.defaults = scrape_kwargs
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.totals = PhaseTimer()
+        self.finished_counts = Counter()
+
+    def submit(self, keywords, location, max_results_per_keyword, **params):
+        """Queue a job and return its ScrapeJob; params are scrape_google_maps keyword arguments"""
+        params = dict(self.defaults, keywords=list(keywords), location=location,
+                      max_results_per_keyword=max_results_per_keyword, **params)
+        job = ScrapeJob(uuid.uuid4().hex[:12], params)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._trim()
+        self._executor.submit(self._run, job)
+        return job
+
+    def _trim(self):
+        finished = [job for job in self._jobs.values() if job.finished]
+        for job in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job.id]
+
+    def _run(self, job):
+        if job.cancel_event.is_set():
+            if job.store is not None:
+                job.store.close()
+            job.state = 'cancelled'
+            job.finished_at = time.time()
+            with self._lock:
+                job.in_totals = True
+                self.finished_counts[job.state] += 1
+            return
+        job.state = 'running'
+        job.started_at = time.time()
+        cache = job.params.get('cache')
+        # The cache is shared, so these counts include overlapping jobs' lookups
+        cache_before = cache.stats() if cache is not None else None
+        try:
+            store = scrape_google_maps(reporter=job, pages=job.pages, cancel=job.cancel_event, timer=job.timer,
+                                       **job.params)
+            # The headline numbers describe exactly the exported rows, also for a cancelled job
+            summary = ResultSummary()
+            job.csv_path, job.result_count = store.export_csv(summary=summary)
+            job.summary = summary
+            if job.failed_keywords:
+                job.state = 'partial'
+            elif job.cancel_event.is_set() and not store.manifest()['complete']:
+                job.state = 'cancelled'
+            else:
+                job.state = 'complete'
+        except Exception as e:
+            logger.exception("Job %s failed", job.id)
+            job.error = str(e)
+            job.state = 'failed'
+        finally:
+            if job.store is not None:
+                job.store.close()  # Also when the scrape or the export raised
+            if cache is not None:
+                cache_after = cache.stats()
+                job.cache_stats = {name: cache_after[name] - cache_before[name] for name in cache_after}
+            job.finished_at = time.time()
+            with self._lock:
+                self.totals.merge(job.timer)
+                job.in_totals = True
+                self.finished_counts[job.state] += 1
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        """Every listed job, newest first"""
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.submitted_at, reverse=True)
+
+    def metrics(self):
+        """JSON-ready process metrics: phases and counters of every job (running ones so far),
+        jobs by state, and the shared pool, cache and pacer statistics when the manager has them"""
+        combined = PhaseTimer()
+        with self._lock:
+            combined.merge(self.totals)
+            active = [job for job in self._jobs.values() if not job.in_totals]
+            finished = dict(self.finished_counts)
+        for job in active:
+            combined.merge(job.timer)
+        snapshot = combined.snapshot()
+        snapshot['jobs'] = {state: sum(1 for job in active if job.state == state) for state in ('queued', 'running')}
+        snapshot['jobs_finished'] = finished
+        for name in ('pool', 'cache', 'pacer'):
+            if self.defaults.get(name) is not None:
+                snapshot[name] = self.defaults[name].stats()
+        return snapshot
+
+    def active_checkpoints(self):
+        """Checkpoint job IDs of queued and running jobs, so they are not resumed twice"""
+        return {job.store.job_id for job in self.jobs() if not job.finished and job.store is not None}
+
+    def shutdown(self):
+        """Cancel every job and wait for the running ones to stop"""
+        for job in self.jobs():
+            job.cancel()
+        self._executor.shutdown(wait=True)
+
+# Metrics export: Prometheus text exposition format and JSON, served over HTTP
+# when SCRAPER_METRICS_PORT is set
+METRICS_PORT = int(os.environ.get("SCRAPER_METRICS_PORT", "0"))
+METRICS_PREFIX = "scraper"
+
+def render_prometheus(snapshot, prefix=METRICS_PREFIX):
+    """Format a metrics snapshot (PhaseTimer.snapshot() or JobManager.metrics()) as Prometheus text"""
+    lines = []
+    
+    def metric(name, kind, help_text, samples):
+        if not samples:
+            return
+        lines.append(f"# HELP {prefix}_{name} {help_text}")
+        lines.append(f"# TYPE {prefix}_{name} {kind}")
+        for suffix, labels, value in samples:
+            label_text = ",".join(f'{key}="{label}"' for key, label in labels.items())
+            value = value if isinstance(value, int) else round(value, 6)
+            lines.append(f"{prefix}_{name}{suffix}{{{label_text}}} {value}" if label_text
+                         else f"{prefix}_{name}{suffix} {value}")
+    
+    phases = snapshot.get('phases', {})
+    samples = []
+    for phase, s in phases.items():
+        samples += [('', {'phase': phase, 'quantile': '0.5'}, s['p50']),
+                    ('', {'phase': phase, 'quantile': '0.95'}, s['p95']),
+                    ('_sum', {'phase': phase}, s['total']),
+                    ('_count', {'phase': phase}, s['count'])]
+    metric('phase_seconds', 'summary', "Duration of scrape phases", samples)
+    metric('phase_max_seconds', 'gauge', "Longest duration seen per scrape phase",
+           [('', {'phase': phase}, s['max']) for phase, s in phases.items()])
+    metric('events_total', 'counter', "Scrape events (retries, skips, stale elements, missing fields...)",
+           [('', {'event': name}, n) for name, n in sorted(snapshot.get('counters', {}).items())])
+    metric('jobs', 'gauge', "Jobs currently queued or running",
+           [('', {'state': state}, n) for state, n in snapshot.get('jobs', {}).items()])
+    metric('jobs_finished_total', 'counter', "Jobs finished, by final state",
+           [('', {'state': state}, n) for state, n in sorted(snapshot.get('jobs_finished', {}).items())])
+    pool = snapshot.get('pool')
+    if pool:
+        metric('pool_drivers', 'gauge', "Pooled Chrome drivers",
+               [('', {'state': state}, pool[state]) for state in ('size', 'running', 'idle')])
+        metric('pool_drivers_started_total', 'counter', "Chrome drivers started", [('', {}, pool['started'])])
+        metric('pool_drivers_recycled_total', 'counter', "Chrome drivers recycled", [('', {}, pool['recycled'])])
+    cache = snapshot.get('cache')
+    if cache:
+        metric('cache_lookups_total', 'counter', "Result cache lookups",
+               [('', {'layer': layer, 'result': result}, cache[f"{layer}_{result}"])
+                for layer in ('query', 'place') for result in ('hits', 'misses')])
+    pacer = snapshot.get('pacer')
+    if pacer:
+        metric('pacing_delay_seconds', 'gauge', "Current delay between page loads", [('', {}, pacer['delay'])])
+        metric('pacing_wait_seconds_total', 'counter', "Time spent waiting for the pacer", [('', {}, pacer['slept'])])
+    return "\n".join(lines) + "\n"
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """GET /metrics returns Prometheus text, GET /metrics.json the snapshot as JSON"""
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path == '/metrics':
+            body, content_type = render_prometheus(self.server.source()), "text/plain; version=0.0.4; charset=utf-8"
+        elif path == '/metrics.json':
+            body, content_type = json.dumps(self.server.source()), "application/json"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug("[METRICS] " + format, *args)
+
+class MetricsServer:
+    """Serve metrics from `source` (a callable returning a snapshot) in a background thread"""
+
+    def __init__(self, source, port=None, host="0.0.0.0"):
+        self.httpd = ThreadingHTTPServer((host, port if port is not None else METRICS_PORT), MetricsHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.source = source
+        self.port = self.httpd.server_address[1]
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="metrics", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        logger.info("[METRICS] Serving /metrics and /metrics.json on port %s", self.port)
+        return self
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,175 @@
+"""Re-extract result fields from saved detail page snapshots, without a browser
+
+Jobs run with --snapshots (or "Save page snapshots" in the UI) keep every
+detail pane they visited, compressed, in snapshots.sqlite3 in their
+checkpoint directory. This command parses those pages again with the live
+scraper's DETAIL_FIELD_SPECS, e.g. after Google renamed a class or a field
+was added to the specs:
+
+    python reextract_cli.py 20240101_120000_ab12cd -o fixed.csv
+    python reextract_cli.py .checkpoints/* --merge -o all.parquet
+    python reextract_cli.py 20240101_120000_ab12cd --specs specs.json --fields status,opening_hours
+
+Sources are job IDs (under the checkpoint directory), job directories or
+snapshot files. By default one row is written per snapshot. With --merge,
+the jobs' result rows are written instead, with re-extracted values
+replacing the stored ones wherever the page yields a value; keyword,
+location and category are kept. --specs loads a JSON object in the
+DETAIL_FIELD_SPECS format whose entries replace the built-in specs of those
+fields, so a fix can be tried before it goes into the scraper.
+
+Pages are parsed by a process pool (-j, default one worker per CPU) with
+lxml and cssselect.
+
+Exit codes: 0 ok, 1 unexpected error, 2 bad arguments, 4 no snapshots
+found, 130 interrupted.
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+
+from maps_scraper import (
+    CHECKPOINT_DIR, DETAIL_FIELD_SPECS, SNAPSHOT_FILE, ResultWriter, lxml, place_key, pyarrow, read_results,
+    reextract_snapshots,
+)
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2
+EXIT_EMPTY = 4
+EXIT_INTERRUPTED = 130
+
+class SourceError(ValueError):
+    """A snapshot source or spec file that cannot be used"""
+
+def resolve_source(source, root=CHECKPOINT_DIR):
+    """(snapshot file, job directory or None) for a job ID, job directory or snapshot file"""
+    if os.path.isfile(source):
+        return source, None
+    job_dir = source if os.path.isdir(source) else os.path.join(root, source)
+    path = os.path.join(job_dir, SNAPSHOT_FILE)
+    if not os.path.exists(path):
+        raise SourceError(f"no {SNAPSHOT_FILE} for '{source}' (was the job run with snapshots?)")
+    return path, job_dir
+
+def load_specs(path, fields):
+    """DETAIL_FIELD_SPECS with a spec file's overrides, limited to name plus fields"""
+    specs = dict(DETAIL_FIELD_SPECS)
+    if path:
+        try:
+            with open(path, encoding='utf-8') as handle:
+                overrides = json.load(handle)
+        except (OSError, ValueError) as e:
+            raise SourceError(f"cannot read spec file {path}: {e}")
+        if not isinstance(overrides, dict):
+            raise SourceError(f"{path} must hold a JSON object of field specs")
+        for name, candidates in overrides.items():
+            if name not in DETAIL_FIELD_SPECS:
+                raise SourceError(f"unknown field '{name}' in {path}; new fields go into DETAIL_FIELD_SPECS")
+            if not isinstance(candidates, list) or not all(
+                    isinstance(c, dict) and 'selector' in c and 'attr' in c for c in candidates):
+                raise SourceError(f"spec of '{name}' in {path} must be a list of {{selector, attr, post}} objects")
+            specs[name] = candidates
+    if fields:
+        unknown = set(fields) - set(DETAIL_FIELD_SPECS)
+        if unknown:
+            raise SourceError(f"unknown field(s) {', '.join(sorted(unknown))}")
+        specs = {name: spec for name, spec in specs.items() if name == 'name' or name in fields}
+    return specs
+
+def merged_rows(job_dirs, items, fields):
+    """The jobs' result rows with re-extracted values of fields replacing the stored ones
+
+    Re-extracted values are staged in a temporary on-disk SQLite table keyed
+    by place, and job rows are read straight from records.jsonl, so memory
+    stays flat however large the archives and jobs are.
+    """
+    staging = sqlite3.connect("")  # Private temporary database, deleted on close
+    try:
+        staging.execute("CREATE TABLE items (key TEXT PRIMARY KEY, item TEXT NOT NULL)")
+        with staging:
+            # Later snapshots of a place win
+            staging.executemany("INSERT OR REPLACE INTO items (key, item) VALUES (?, ?)", (
+                (place_key(item['link']),
+                 json.dumps({name: item[name] for name in fields if item.get(name) not in ("", None)}))
+                for item in items))
+        for job_dir in job_dirs:
+            for row in read_results(job_dir):
+                found = staging.execute("SELECT item FROM items WHERE key = ?",
+                                        (place_key(row['link']),)).fetchone() if row.get('link') else None
+                if found is not None:
+                    row.update(json.loads(found[0]))
+                yield row
+    finally:
+        staging.close()
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Re-extract fields from saved detail page snapshots with a process pool, without a browser.",
+        epilog="Exit codes: 0 ok, 1 error, 2 bad arguments, 4 no snapshots found, 130 interrupted.",
+    )
+    parser.add_argument('sources', nargs='+', help="job IDs, job directories or snapshot files")
+    parser.add_argument('-o', '--output', default='-', help="output file, '-' for stdout (default)")
+    parser.add_argument('-f', '--format', choices=['csv', 'ndjson', 'jsonl', 'parquet'],
+                        help="output format (default: from the output extension, else csv)")
+    parser.add_argument('--merge', action='store_true',
+                        help="write the jobs' result rows with the re-extracted fields replaced")
+    parser.add_argument('--fields', help="comma-separated fields to re-extract (default: every detail field)")
+    parser.add_argument('--specs', help="JSON file of field specs replacing the built-in ones")
+    parser.add_argument('-j', '--workers', type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument('--checkpoint-dir', default=CHECKPOINT_DIR, help="where job IDs are looked up")
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    fmt = args.format or ('ndjson' if args.output.endswith(('.ndjson', '.jsonl'))
+                          else 'parquet' if args.output.endswith('.parquet') else 'csv')
+    fields = [f.strip() for f in args.fields.split(',') if f.strip()] if args.fields else None
+    try:
+        if lxml is None:
+            raise SourceError("re-extraction needs lxml and cssselect (pip install lxml cssselect)")
+        if fmt == 'parquet' and (args.output == '-' or pyarrow is None):
+            raise SourceError("Parquet output needs pyarrow and an --output file")
+        sources = [resolve_source(source, args.checkpoint_dir) for source in args.sources]
+        if args.merge and any(job_dir is None for _, job_dir in sources):
+            raise SourceError("--merge needs job IDs or job directories, not bare snapshot files")
+        specs = load_specs(args.specs, fields)
+    except SourceError as e:
+        parser.print_usage(sys.stderr)
+        print(f"{parser.prog}: error: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    if args.output == '-':
+        handle = sys.stdout
+    elif fmt == 'parquet':
+        handle = open(args.output, 'wb')
+    else:
+        handle = open(args.output, 'w', newline='', encoding='utf-8')
+    writer = ResultWriter(handle, fmt)
+    try:
+        items = reextract_snapshots([path for path, _ in sources], specs, args.workers)
+        if args.merge:
+            writer.write(merged_rows([job_dir for _, job_dir in sources], items,
+                                     [name for name in specs if name != 'name']))
+        else:
+            writer.write(items)
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+    except Exception as e:
+        logging.getLogger("maps_scraper").exception("Re-extraction failed: %s", e)
+        return EXIT_ERROR
+    finally:
+        writer.close()
+        if handle is not sys.stdout:
+            handle.close()
+
+    print(f"{writer.count} rows written", file=sys.stderr)
+    return EXIT_OK if writer.count else EXIT_EMPTY
+
+if __name__ == "__main__":
+    sys.exit(main())
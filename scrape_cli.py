@@ -0,0 +1,304 @@
+"""Batch command-line runner for the Google Maps scraper
+
+Runs scraping jobs without Streamlit, e.g. from cron or a queue worker:
+
+    python scrape_cli.py jobs.json -o results.jsonl
+    python scrape_cli.py -k "coffee shop" -k bakery -l Taipei > results.csv
+
+A job file is JSON (one job object or a list of them), JSON Lines (one job per
+line) or CSV with a 'keyword' column and optional 'location' and
+'max_results' columns; CSV rows sharing a location and max_results form one
+job. A job has 'keywords' (a list) and 'location', plus optional
+'max_results', 'mode', 'fields', 'extractor', 'detail_tabs', 'lean',
+'tiling', 'bbox' and 'tile_km' overriding the command-line defaults.
+
+With --tile (or "tiling": true), each keyword is searched over a grid of map
+viewports covering the location's bounding box ('bbox' as "south,west,
+north,east" or a list; by default the built-in box of a known city), and
+max_results caps the whole keyword instead of one search.
+
+Rows are written to the output as each search finishes, as CSV, NDJSON or
+Parquet (a file only; needs pyarrow). Ratings are numbers, review counts
+integers and missing values empty (CSV) or null. The keyword column
+holds the keyword that found a place first. The job's checkpoint directory
+keeps the full record and is used by --resume.
+
+--snapshots keeps a compressed copy of every visited detail page in the
+job's checkpoint directory, so fields can be re-derived later with
+reextract_cli.py instead of scraping again.
+
+--metrics-file writes the run's phase timings and event counters when it
+ends: JSON for a .json path, otherwise Prometheus text (e.g. for the node
+exporter's textfile collector).
+
+Ctrl-C cancels the run: searches stop after their current page, the rows
+found so far are written out and the job stays resumable. A second Ctrl-C
+stops without waiting for those pages.
+
+Exit codes: 0 every job completed, 1 unexpected error, 2 bad arguments or
+job file, 3 some keywords failed (their jobs can be resumed), 4 every job
+completed but found nothing, 130 interrupted.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+
+from maps_scraper import (
+    CHECKPOINT_DIR, DEFAULT_LEAN_PROFILE, DEFAULT_POOL_SIZE, DETAIL_EXTRACTORS, EXTRACTION_MODES, RESULT_FIELDS,
+    CheckpointStore, DriverPool, Pacer, PhaseTimer, ProgressReporter, ResultCache, ResultWriter, pyarrow,
+    render_prometheus, resolve_bbox, scrape_google_maps,
+)
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2
+EXIT_PARTIAL = 3
+EXIT_EMPTY = 4
+EXIT_INTERRUPTED = 130
+
+# Fields a job may set; anything missing comes from the command line
+JOB_FIELDS = {'keywords', 'location', 'max_results', 'mode', 'fields', 'extractor', 'detail_tabs', 'lean',
+              'tiling', 'bbox', 'tile_km'}
+
+class JobFileError(ValueError):
+    """A job file or job definition that cannot be run"""
+
+def read_job_file(path):
+    """Parse a .json, .jsonl or .csv job file into a list of raw job dicts"""
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline='', encoding='utf-8') as handle:
+        if extension == '.csv':
+            jobs = {}
+            for line, row in enumerate(csv.DictReader(handle), start=2):
+                keyword = (row.get('keyword') or "").strip()
+                if not keyword:
+                    raise JobFileError(f"{path}:{line}: 'keyword' is required")
+                # Empty location or max_results cells fall back to the command-line defaults
+                job = {'keywords': []}
+                for name in ('location', 'max_results'):
+                    if (row.get(name) or "").strip():
+                        job[name] = row[name].strip()
+                jobs.setdefault((job.get('location'), job.get('max_results')), job)['keywords'].append(keyword)
+            return list(jobs.values())
+        try:
+            if extension == '.jsonl':
+                return [json.loads(line) for line in handle if line.strip()]
+            data = json.load(handle)
+        except json.JSONDecodeError as e:
+            raise JobFileError(f"{path}: invalid JSON ({e})")
+    return data if isinstance(data, list) else [data]
+
+def normalize_job(job, defaults):
+    """Validate a raw job dict and fill in defaults"""
+    if not isinstance(job, dict):
+        raise JobFileError(f"a job must be an object, got {type(job).__name__}")
+    unknown = set(job) - JOB_FIELDS
+    if unknown:
+        raise JobFileError(f"unknown job field(s): {', '.join(sorted(unknown))}")
+    job = dict(defaults, **job)
+    if isinstance(job.get('keywords'), str):
+        job['keywords'] = [job['keywords']]
+    job['keywords'] = [k.strip() for k in job.get('keywords') or [] if k and k.strip()]
+    if not job['keywords']:
+        raise JobFileError("a job needs at least one keyword")
+    if not (job.get('location') or "").strip():
+        raise JobFileError(f"job {job['keywords']} has no location")
+    try:
+        job['max_results'] = int(job['max_results'])
+        job['detail_tabs'] = int(job['detail_tabs'])
+    except (TypeError, ValueError):
+        raise JobFileError(f"job {job['keywords']}: max_results and detail_tabs must be integers")
+    if job['mode'] not in EXTRACTION_MODES:
+        raise JobFileError(f"job {job['keywords']}: unknown mode '{job['mode']}'")
+    if job['extractor'] not in DETAIL_EXTRACTORS:
+        raise JobFileError(f"job {job['keywords']}: unknown extractor '{job['extractor']}'")
+    unknown_fields = set(job['fields'] or []) - set(RESULT_FIELDS)
+    if unknown_fields:
+        raise JobFileError(f"job {job['keywords']}: unknown field(s) {', '.join(sorted(unknown_fields))}")
+    if job['tiling']:
+        bbox = job['bbox']
+        try:
+            if isinstance(bbox, (list, tuple)):
+                bbox = resolve_bbox(",".join(str(value) for value in bbox))
+            else:
+                bbox = resolve_bbox(bbox or job['location'])
+        except ValueError as e:
+            raise JobFileError(f"job {job['keywords']}: {e}")
+        if bbox is None:
+            raise JobFileError(f"job {job['keywords']}: no built-in bounding box for '{job['location']}'; give 'bbox'")
+        job['bbox'] = list(bbox)
+    return job
+
+class CliProgress(ProgressReporter):
+    """Streams the rows of each finished search to a ResultWriter
+
+    With resumed=True, the rows already in the job's checkpoint are written
+    first, so the output covers the whole job.
+    """
+
+    def __init__(self, writer, resumed=False):
+        self.writer = writer
+        self.resumed = resumed
+
+    def job_started(self, store, log_buffer):
+        if self.resumed:
+            self.writer.write(store.iter_results())
+
+    def rows_added(self, keyword, rows):
+        self.writer.write(rows)
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Scrape Google Maps listings in batch, without the Streamlit UI.",
+        epilog="Exit codes: 0 complete, 1 error, 2 bad arguments or job file, "
+               "3 some keywords failed (resumable), 4 nothing found, 130 interrupted.",
+    )
+    parser.add_argument('job_file', nargs='?', help="JSON, JSON Lines or CSV job file")
+    parser.add_argument('-k', '--keyword', action='append', default=[], help="keyword to search (repeatable)")
+    parser.add_argument('-l', '--location', help="location for --keyword jobs")
+    parser.add_argument('--resume', action='append', default=[], metavar='JOB_ID',
+                        help="resume an interrupted job from its checkpoint (repeatable)")
+    parser.add_argument('-o', '--output', default='-', help="output file, '-' for stdout (default)")
+    parser.add_argument('-f', '--format', choices=['csv', 'ndjson', 'jsonl', 'parquet'],
+                        help="output format (default: from the output extension, else csv)")
+    parser.add_argument('-n', '--max-results', type=int, default=20, help="max results per keyword (default 20)")
+    parser.add_argument('--mode', choices=EXTRACTION_MODES, default='full', help="extraction mode (default full)")
+    parser.add_argument('--fields', help="comma-separated fields to collect in fast and network mode")
+    parser.add_argument('--extractor', choices=list(DETAIL_EXTRACTORS), default='js', help="detail pane extractor")
+    parser.add_argument('--detail-tabs', type=int, default=1, help="place pages loaded in parallel per browser")
+    parser.add_argument('--full-profile', action='store_true',
+                        default=not DEFAULT_LEAN_PROFILE, help="load images, fonts and map tiles")
+    parser.add_argument('--tile', action='store_true', dest='tiling',
+                        help="search a grid of map viewports to get past the ~120 results per search")
+    parser.add_argument('--bbox', help="bounding box to tile as south,west,north,east (default: built-in city box)")
+    parser.add_argument('--tile-km', type=float, help="starting tile size in km (default 3)")
+    parser.add_argument('-p', '--pool-size', type=int, default=DEFAULT_POOL_SIZE, help="parallel browsers")
+    parser.add_argument('--no-cache', action='store_true', help="do not read or write the result cache")
+    parser.add_argument('--force-refresh', action='store_true', help="ignore cached results")
+    parser.add_argument('--log-jsonl', action='store_true', help="write log.jsonl into each job's checkpoint folder")
+    parser.add_argument('--snapshots', action='store_true',
+                        help="save each detail page's HTML in the job's checkpoint folder (see reextract_cli.py)")
+    parser.add_argument('--metrics-file', help="write phase timings and counters here (.json, else Prometheus text)")
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument('-v', '--verbose', action='store_true', help="log every page and field")
+    verbosity.add_argument('-q', '--quiet', action='store_true', help="log warnings and errors only")
+    return parser
+
+def load_jobs(args):
+    """Jobs to run as (job, store) pairs; store is None for new jobs"""
+    defaults = {
+        'max_results': args.max_results, 'mode': args.mode,
+        'fields': [f.strip() for f in args.fields.split(',')] if args.fields else None,
+        'extractor': args.extractor, 'detail_tabs': args.detail_tabs, 'lean': not args.full_profile,
+        'location': args.location, 'tiling': args.tiling, 'bbox': args.bbox, 'tile_km': args.tile_km,
+    }
+    raw_jobs = read_job_file(args.job_file) if args.job_file else []
+    if args.keyword:
+        raw_jobs.append({'keywords': args.keyword})
+    jobs = [(normalize_job(job, defaults), None) for job in raw_jobs]
+    for job_id in args.resume:
+        if not os.path.exists(os.path.join(CHECKPOINT_DIR, job_id, CheckpointStore.MANIFEST_FILE)):
+            raise JobFileError(f"no checkpoint for job {job_id} in {CHECKPOINT_DIR}")
+        store = CheckpointStore.open(job_id)
+        jobs.append((normalize_job(store.manifest()['params'], defaults), store))
+    if not jobs:
+        raise JobFileError("nothing to do: give a job file, --keyword or --resume")
+    return jobs
+
+def write_metrics(path, timer, pool, pacer):
+    snapshot = timer.snapshot()
+    snapshot['pool'] = pool.stats()
+    snapshot['pacer'] = pacer.stats()
+    with open(path, 'w', encoding='utf-8') as handle:
+        if path.endswith('.json'):
+            json.dump(snapshot, handle, indent=2)
+        else:
+            handle.write(render_prometheus(snapshot))
+
+def install_interrupt_handler(cancel):
+    """Make the first Ctrl-C set cancel and a second one raise KeyboardInterrupt; returns the old handler"""
+    def interrupt(signum, frame):
+        if cancel.is_set():
+            raise KeyboardInterrupt
+        print("Interrupted; stopping after the current pages (Ctrl-C again to stop now)", file=sys.stderr)
+        cancel.set()
+    if threading.current_thread() is not threading.main_thread():
+        return None  # Signal handlers can only be set from the main thread
+    return signal.signal(signal.SIGINT, interrupt)
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    try:
+        jobs = load_jobs(args)
+    except (JobFileError, OSError) as e:
+        parser.print_usage(sys.stderr)
+        print(f"{parser.prog}: error: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    fmt = args.format or ('ndjson' if args.output.endswith(('.jsonl', '.ndjson'))
+                          else 'parquet' if args.output.endswith('.parquet') else 'csv')
+    if fmt == 'parquet' and (args.output == '-' or pyarrow is None):
+        parser.print_usage(sys.stderr)
+        print(f"{parser.prog}: error: Parquet output needs pyarrow and an --output file", file=sys.stderr)
+        return EXIT_USAGE
+    log_level = logging.DEBUG if args.verbose else logging.WARNING if args.quiet else logging.INFO
+    cache = None if args.no_cache else ResultCache()
+    pool = DriverPool(args.pool_size)
+    if args.output == '-':
+        handle = sys.stdout
+    elif fmt == 'parquet':
+        handle = open(args.output, 'wb')
+    else:
+        handle = open(args.output, 'w', newline='', encoding='utf-8')
+    writer = ResultWriter(handle, fmt)
+    timer = PhaseTimer()
+    pacer = Pacer()  # Shared so later jobs start at the pace the earlier ones settled on
+    partial = False
+    cancel = threading.Event()
+    previous_handler = install_interrupt_handler(cancel)
+    try:
+        for job, store in jobs:
+            store = scrape_google_maps(
+                job['keywords'], job['location'], job['max_results'], CliProgress(writer, store is not None),
+                pool_size=args.pool_size, pool=pool, extractor=job['extractor'], mode=job['mode'],
+                fields=job['fields'], detail_tabs=job['detail_tabs'], cache=cache,
+                force_refresh=args.force_refresh, store=store, log_level=log_level,
+                log_jsonl=args.log_jsonl, lean=job['lean'], timer=timer, tiling=job['tiling'], bbox=job['bbox'],
+                tile_km=job['tile_km'], pacer=pacer, snapshots=args.snapshots, cancel=cancel,
+            )
+            if not store.manifest()['complete']:
+                partial = True
+                print(f"Job {store.job_id} is incomplete; resume it with --resume {store.job_id}", file=sys.stderr)
+            store.close()
+            if cancel.is_set():
+                return EXIT_INTERRUPTED
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+    except Exception as e:
+        logging.getLogger("maps_scraper").exception("Batch run failed: %s", e)
+        return EXIT_ERROR
+    finally:
+        if previous_handler is not None:
+            signal.signal(signal.SIGINT, previous_handler)
+        if args.metrics_file:
+            write_metrics(args.metrics_file, timer, pool, pacer)
+        pool.close()
+        writer.close()
+        if handle is not sys.stdout:
+            handle.close()
+
+    if partial:
+        return EXIT_PARTIAL
+    if not writer.count:
+        return EXIT_EMPTY
+    return EXIT_OK
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,17 @@
 import streamlit as st
 import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+import atexit
+import itertools
+import logging
+import os
 import time
 from datetime import datetime
-import io
+
+from maps_scraper import (
+    CACHE_TTL_HOURS, DEFAULT_LEAN_PROFILE, DEFAULT_POOL_SIZE, DEFAULT_WAIT_TIMEOUTS, DETAIL_EXTRACTORS,
+    EXPORT_FORMATS, EXTRACTION_MODES, LOCATION_BBOXES, MAX_POOL_SIZE, METRICS_PORT, RESULT_COLUMNS, RESULT_DTYPES,
+    RESULT_FIELDS, CheckpointStore, DriverPool, JobManager, MetricsServer, Pacer, ResultCache, pyarrow, resolve_bbox,
+)
 
 # Page config
 st.set_page_config(
@@ -41,351 +45,75 @@ if 'scraping_complete' not in st.session_state:
     st.session_state.scraping_complete = False
 if 'results_df' not in st.session_state:
     st.session_state.results_df = None
+if 'cache_stats' not in st.session_state:
+    st.session_state.cache_stats = None
+if 'job_dir' not in st.session_state:
+    st.session_state.job_dir = None  # Checkpoint directory of the loaded results
+if 'exports' not in st.session_state:
+    st.session_state.exports = {}  # Export format -> file written from the loaded job's checkpoint
+if 'summary' not in st.session_state:
+    st.session_state.summary = None  # Headline numbers of the loaded job, computed while it ran
+if 'page_stats' not in st.session_state:
+    st.session_state.page_stats = {}  # Latest per-page network summary for each browsing profile
+if 'timing' not in st.session_state:
+    st.session_state.timing = None  # Phase timings and event counters of the loaded job
+if 'job_id' not in st.session_state:
+    # Reattach to the job in the URL after a reload
+    st.session_state.job_id = st.experimental_get_query_params().get('job', [None])[0]
+if 'loaded_job_id' not in st.session_state:
+    st.session_state.loaded_job_id = None
 
-def setup_driver():
-    """Setup Chrome driver with options"""
-    chrome_options = Options()
-    chrome_options.add_argument('--headless')
-    chrome_options.add_argument('--no-sandbox')
-    chrome_options.add_argument('--disable-dev-shm-usage')
-    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-    chrome_options.add_argument('--log-level=3')
-    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    chrome_options.add_experimental_option('useAutomationExtension', False)
-    
-    driver = webdriver.Chrome(options=chrome_options)
-    driver.maximize_window()
-    return driver
+# Download formats offered for finished jobs (Parquet only when pyarrow is installed)
+DOWNLOAD_FORMATS = {'CSV': ('csv', "text/csv"), 'NDJSON': ('ndjson', "application/x-ndjson")}
+if pyarrow is not None:
+    DOWNLOAD_FORMATS['Parquet'] = ('parquet', "application/vnd.apache.parquet")
 
-def scrape_google_maps(keywords, location, max_results_per_keyword, progress_bar, status_text, log_container=None):
-    """Scrape Google Maps for business information"""
-    all_results = []
-    total_keywords = len(keywords)
-    logs = []  # Store logs for browser display
-    
-    def log(message, also_print=True):
-        """Log to both console and browser"""
-        if also_print:
-            print(message)
-        logs.append(message)
-        if log_container:
-            # Display last 50 logs in browser
-            log_container.text_area("Debug Logs", "\n".join(logs[-50:]), height=400, key=f"logs_{len(logs)}")
-    
-    # Log: Driver initialization
-    log(f"\n{'='*80}")
-    log(f"[INIT] Starting scraper with {total_keywords} keywords")
-    log(f"[INIT] Location: {location}")
-    log(f"[INIT] Max results per keyword: {max_results_per_keyword}")
-    log(f"{'='*80}\n")
-    
-    driver = setup_driver()
-    log(f"[DRIVER] Chrome driver initialized successfully")
-    
-    try:
-        for idx, keyword in enumerate(keywords):
-            log(f"\n{'='*80}")
-            log(f"[KEYWORD {idx+1}/{total_keywords}] Processing: '{keyword}'")
-            log(f"{'='*80}")
-            
-            status_text.text(f"🔍 Scraping: {keyword} in {location}...")
-            
-            # Build search URL
-            search_query = f"{keyword} in {location}"
-            url = f"https://www.google.com/maps/search/{search_query.replace(' ', '+')}"
-            log(f"[URL] Constructed search URL: {url}")
-            
-            log(f"[NAV] Navigating to URL...")
-            driver.get(url)
-            log(f"[NAV] Page loaded, current URL: {driver.current_url}")
-            
-            # Wait for page to fully load and results to populate
-            # Using longer wait time as proven in working code (main_scraper.py line 36)
-            log(f"[WAIT] Waiting 15 seconds for page to fully load...")
-            time.sleep(15)
-            log(f"[WAIT] Wait complete")
-            
-            # Verify the results container loaded
-            # This XPath matches the working code pattern (main_scraper.py line 42)
-            log(f"[CONTAINER] Searching for results container with XPath: '//div[contains(@aria-label, \"Results for\")]'")
-            try:
-                results_container = driver.find_element(By.XPATH, '//div[contains(@aria-label, "Results for")]')
-                aria_label = results_container.get_attribute("aria-label")
-                log(f"[CONTAINER] ✓ Results container found! aria-label: '{aria_label}'")
-            except Exception as e:
-                # If results container doesn't load, skip this keyword
-                log(f"[CONTAINER] ✗ FAILED to find results container")
-                log(f"[CONTAINER] Exception: {str(e)}")
-                log(f"[CONTAINER] Page source length: {len(driver.page_source)} characters")
-                log(f"[CONTAINER] Skipping keyword '{keyword}'")
-                status_text.text(f"⚠️ Could not find results for: {keyword} in {location}")
-                continue
-            
-            # Scroll to load more results
-            # Using the proven XPath selector from working code (main_scraper.py line 42)
-            results_count = 0
-            scroll_attempts = 0
-            max_scroll_attempts = max_results_per_keyword // 20 + 3
-            
-            log(f"\n[SCROLL] Starting scroll phase - max attempts: {max_scroll_attempts}, target results: {max_results_per_keyword}")
-            
-            while scroll_attempts < max_scroll_attempts and results_count < max_results_per_keyword:
-                try:
-                    # Find all result elements using the working XPath selector
-                    # This selector scopes to the results sidebar container (main_scraper.py line 42, 108, 114)
-                    xpath_selector = '//div[contains(@aria-label, "Results for")]/div/div[./a]'
-                    log(f"[SCROLL] Attempt {scroll_attempts + 1}/{max_scroll_attempts} - Finding elements with XPath: '{xpath_selector}'")
-                    elements = driver.find_elements(By.XPATH, xpath_selector)
-                    
-                    if elements:
-                        log(f"[SCROLL] ✓ Found {len(elements)} elements")
-                        # Scroll to last element to load more results
-                        # Using the proven pattern from working code (main_scraper.py line 43)
-                        last_element = elements[-1]
-                        log(f"[SCROLL] Scrolling to last element (index {len(elements)-1})...")
-                        driver.execute_script("arguments[0].scrollIntoView();", last_element)
-                        # Use longer wait time as in working code (main_scraper.py line 45)
-                        log(f"[SCROLL] Waiting 5 seconds after scroll...")
-                        time.sleep(5)
-                        
-                        results_count = len(elements)
-                        scroll_attempts += 1
-                        log(f"[SCROLL] Current results count: {results_count}")
-                    else:
-                        # No elements found, stop scrolling
-                        log(f"[SCROLL] ✗ No elements found, stopping scroll")
-                        break
-                except Exception as e:
-                    log(f"[SCROLL] ✗ Exception during scroll: {str(e)}")
-                    break
-            
-            log(f"[SCROLL] Scroll phase complete - Total elements found: {results_count}")
-            
-            # Extract data from each listing
-            # Re-fetch elements using the same working XPath selector (main_scraper.py line 114)
-            log(f"\n[EXTRACT] Re-fetching elements for data extraction...")
-            elements = driver.find_elements(By.XPATH, '//div[contains(@aria-label, "Results for")]/div/div[./a]')
-            log(f"[EXTRACT] Found {len(elements)} elements to process")
-            log(f"[EXTRACT] Will process up to {min(len(elements), max_results_per_keyword)} elements")
-            
-            for i, element in enumerate(elements[:max_results_per_keyword]):
-                if i >= max_results_per_keyword:
-                    break
-                
-                log(f"\n[ITEM {i+1}/{min(len(elements), max_results_per_keyword)}] Processing element at index {i}")
-                    
-                try:
-                    # Click on the listing to load details
-                    # Re-fetch elements to avoid stale element reference (main_scraper.py line 117)
-                    # Use retry logic from working code (main_scraper.py line 115-126)
-                    retry_count = 0
-                    max_retries = 3
-                    click_successful = False
-                    
-                    log(f"[CLICK] Starting click attempts (max retries: {max_retries})")
-                    
-                    while retry_count < max_retries:
-                        try:
-                            # Re-fetch elements to avoid stale references
-                            log(f"[CLICK] Retry {retry_count + 1}/{max_retries} - Re-fetching elements...")
-                            current_elements = driver.find_elements(By.XPATH, '//div[contains(@aria-label, "Results for")]/div/div[./a]')
-                            log(f"[CLICK] Found {len(current_elements)} elements")
-                            
-                            if i >= len(current_elements):
-                                log(f"[CLICK] ✗ Index {i} out of range (only {len(current_elements)} elements)")
-                                break
-                            
-                            # Click the element at index i
-                            log(f"[CLICK] Attempting to click element at index {i}...")
-                            current_elements[i].click()
-                            log(f"[CLICK] ✓ Click successful!")
-                            
-                            # Use longer wait time as in working code (main_scraper.py line 118)
-                            log(f"[CLICK] Waiting 5 seconds for details to load...")
-                            time.sleep(5)
-                            click_successful = True
-                            break  # Click succeeded, exit retry loop
-                            
-                        except Exception as click_error:
-                            # If click fails, scroll to the CORRECT element at index i and retry
-                            retry_count += 1
-                            log(f"[CLICK] ✗ Click failed: {str(click_error)}")
-                            
-                            if retry_count < max_retries:
-                                try:
-                                    # Scroll to element at index i (not [-1])
-                                    log(f"[CLICK] Attempting to scroll to element at index {i}...")
-                                    elem = driver.find_elements(By.XPATH, '//div[contains(@aria-label, "Results for")]/div/div[./a]')[i]
-                                    driver.execute_script("arguments[0].scrollIntoView();", elem)
-                                    log(f"[CLICK] Scroll successful, waiting 5 seconds...")
-                                    time.sleep(5)
-                                    # Continue loop to retry the click
-                                except Exception as scroll_error:
-                                    # If scroll fails, exit retry loop
-                                    log(f"[CLICK] ✗ Scroll failed: {str(scroll_error)}")
-                                    break
-                            else:
-                                # Max retries reached, exit retry loop
-                                log(f"[CLICK] ✗ Max retries reached, giving up on this element")
-                                break
-                    
-                    if not click_successful:
-                        log(f"[ITEM {i+1}] ✗ Failed to click element, skipping...")
-                        continue
-                    
-                    item = {}
-                    log(f"[DATA] Extracting business data...")
-                    
-                    # Extract name
-                    try:
-                        item['name'] = driver.find_element(By.CSS_SELECTOR, "h1.fontHeadlineLarge").text
-                        log(f"[DATA] ✓ Name: '{item['name']}'")
-                    except Exception as e:
-                        item['name'] = ""
-                        log(f"[DATA] ✗ Name extraction failed: {str(e)}")
-                    
-                    # Extract link
-                    try:
-                        item['link'] = driver.current_url
-                        log(f"[DATA] ✓ Link: {item['link']}")
-                    except Exception as e:
-                        item['link'] = ""
-                        log(f"[DATA] ✗ Link extraction failed: {str(e)}")
-                    
-                    # Extract rating
-                    try:
-                        item['rating'] = driver.find_element(By.CSS_SELECTOR, "div[jsaction='pane.rating.moreReviews']").text.split('\n')[0]
-                        log(f"[DATA] ✓ Rating: {item['rating']}")
-                    except Exception as e:
-                        item['rating'] = ""
-                        log(f"[DATA] ✗ Rating extraction failed: {str(e)}")
-                    
-                    # Extract reviews
-                    try:
-                        reviews_text = driver.find_element(By.CSS_SELECTOR, 'button[jsaction="pane.rating.moreReviews"]').text
-                        item['reviews'] = reviews_text.split()[0].replace('(', '').replace(')', '')
-                        log(f"[DATA] ✓ Reviews: {item['reviews']}")
-                    except Exception as e:
-                        item['reviews'] = ""
-                        log(f"[DATA] ✗ Reviews extraction failed: {str(e)}")
-                    
-                    # Extract status
-                    try:
-                        item['status'] = driver.find_element(By.CSS_SELECTOR, "span.ZDu9vd").text.split('·')[0].strip()
-                        log(f"[DATA] ✓ Status: {item['status']}")
-                    except Exception as e:
-                        item['status'] = ""
-                        log(f"[DATA] ✗ Status extraction failed: {str(e)}")
-                    
-                    # Extract address
-                    try:
-                        address_elem = driver.find_element(By.CSS_SELECTOR, "button[data-item-id='address']")
-                        item['address'] = address_elem.get_attribute("aria-label").split(":")[-1].strip()
-                        log(f"[DATA] ✓ Address: {item['address']}")
-                    except Exception as e:
-                        item['address'] = ""
-                        log(f"[DATA] ✗ Address extraction failed: {str(e)}")
-                    
-                    # Extract website
-                    try:
-                        item['website'] = driver.find_element(By.CSS_SELECTOR, "a[data-tooltip='Open website']").get_attribute("href")
-                        log(f"[DATA] ✓ Website: {item['website']}")
-                    except Exception as e:
-                        item['website'] = ""
-                        log(f"[DATA] ✗ Website extraction failed: {str(e)}")
-                    
-                    # Extract phone
-                    try:
-                        phone_elem = driver.find_element(By.CSS_SELECTOR, "button[data-item-id*='phone']")
-                        item['phone'] = phone_elem.get_attribute("aria-label").split(":")[-1].strip()
-                        log(f"[DATA] ✓ Phone: {item['phone']}")
-                    except Exception as e1:
-                        try:
-                            item['phone'] = driver.find_element(By.CSS_SELECTOR, "button[data-tooltip='Copy phone number']").get_attribute("aria-label").split(":")[-1].strip()
-                            log(f"[DATA] ✓ Phone (fallback): {item['phone']}")
-                        except Exception as e2:
-                            item['phone'] = ""
-                            log(f"[DATA] ✗ Phone extraction failed: {str(e1)}, fallback also failed: {str(e2)}")
-                    
-                    # Extract opening hours
-                    try:
-                        item['opening_hours'] = driver.find_element(By.CSS_SELECTOR, "div.t39EBf.GUrTXd").get_attribute("aria-label")
-                        log(f"[DATA] ✓ Opening hours: {item['opening_hours']}")
-                    except Exception as e:
-                        item['opening_hours'] = ""
-                        log(f"[DATA] ✗ Opening hours extraction failed: {str(e)}")
-                    
-                    item['keyword'] = keyword
-                    item['location'] = location
-                    item['scraped_at'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    
-                    if item['name']:  # Only add if we got at least a name
-                        all_results.append(item)
-                        log(f"[ITEM {i+1}] ✓ Successfully added to results (Total: {len(all_results)})")
-                    else:
-                        log(f"[ITEM {i+1}] ✗ Skipped - no name extracted")
-                    
-                    # Navigate back to results list so we can click the next element
-                    # This is critical because clicking an element changes the DOM
-                    log(f"[NAV] Navigating back to results list...")
-                    try:
-                        # Click the back button to return to the results list
-                        back_button = driver.find_element(By.CSS_SELECTOR, "button[aria-label*='Back']")
-                        back_button.click()
-                        log(f"[NAV] ✓ Clicked back button")
-                        time.sleep(2)  # Wait for results list to reload
-                    except Exception as nav_error:
-                        # If back button fails, try alternative: re-navigate to the search URL
-                        log(f"[NAV] ✗ Back button failed: {str(nav_error)}")
-                        log(f"[NAV] Attempting to re-navigate to search URL...")
-                        try:
-                            driver.get(url)
-                            time.sleep(5)  # Wait for page to reload
-                            log(f"[NAV] ✓ Re-navigated to search URL")
-                        except Exception as url_error:
-                            log(f"[NAV] ✗ Re-navigation failed: {str(url_error)}")
-                    
-                    # Update status
-                    status_text.text(f"🔍 Scraping: {keyword} in {location} - Found {len(all_results)} businesses")
-                    
-                except Exception as e:
-                    log(f"[ITEM {i+1}] ✗ Exception during extraction: {str(e)}")
-                    # Try to navigate back even if extraction failed
-                    try:
-                        back_button = driver.find_element(By.CSS_SELECTOR, "button[aria-label*='Back']")
-                        back_button.click()
-                        time.sleep(2)
-                    except:
-                        pass
-                    continue
-            
-            # Update progress bar
-            progress_bar.progress((idx + 1) / total_keywords)
-            
-            log(f"\n[KEYWORD {idx+1}/{total_keywords}] Complete - Collected {len([r for r in all_results if r['keyword'] == keyword])} results for '{keyword}'")
-            log(f"[SUMMARY] Total results so far: {len(all_results)}")
-            
-    finally:
-        log(f"\n{'='*80}")
-        log(f"[CLEANUP] Closing Chrome driver...")
-        driver.quit()
-        log(f"[CLEANUP] Driver closed")
-        log(f"{'='*80}\n")
-    
-    log(f"\n{'='*80}")
-    log(f"[FINAL] Scraping complete!")
-    log(f"[FINAL] Total results collected: {len(all_results)}")
-    log(f"[FINAL] Keywords processed: {total_keywords}")
-    if all_results:
-        log(f"[FINAL] Results breakdown by keyword:")
-        for kw in keywords:
-            count = len([r for r in all_results if r['keyword'] == kw])
-            log(f"[FINAL]   - '{kw}': {count} results")
-    else:
-        log(f"[FINAL] ⚠️ WARNING: No results collected!")
-    log(f"{'='*80}\n")
-    
-    return all_results
+# Rows shown in the results preview; the full results are only read by exports
+PREVIEW_ROWS = 10
+
+# While a job runs the page re-renders every interval, showing the tail of the job's log
+LOG_UI_LINES = 200
+JOB_POLL_INTERVAL = float(os.environ.get("SCRAPER_UI_POLL_INTERVAL", "1.0"))
+
+@st.cache_resource
+def get_driver_pool():
+    """Process-wide pool of warm Chrome sessions reused across reruns and jobs"""
+    pool = DriverPool(MAX_POOL_SIZE)
+    atexit.register(pool.close)
+    return pool
+
+@st.cache_resource
+def get_result_cache():
+    """Process-wide result cache"""
+    cache = ResultCache()
+    cache.purge_expired()
+    return cache
+
+@st.cache_resource
+def get_job_manager():
+    """Process-wide background job runner shared by every browser session"""
+    # One pacer for every job, since Maps throttles the whole process's traffic together
+    manager = JobManager(pool=get_driver_pool(), cache=get_result_cache(), pacer=Pacer())
+    atexit.register(manager.shutdown)
+    if METRICS_PORT:
+        # Fleet dashboards scrape every job of this process from here
+        atexit.register(MetricsServer(manager.metrics).start().close)
+    return manager
+
+def results_frame(rows):
+    """Typed DataFrame built straight from result rows (float rating, nullable int reviews, categoricals)"""
+    return pd.DataFrame.from_records(rows, columns=RESULT_COLUMNS).astype(RESULT_DTYPES)
+
+def show_timing(snapshot):
+    """Per-phase timing table and event counters of a job"""
+    if snapshot['phases']:
+        st.dataframe(pd.DataFrame([
+            {'phase': name, 'count': s['count'], 'total (s)': round(s['total'], 2), 'mean (s)': round(s['mean'], 3),
+             'p50 (s)': round(s['p50'], 3), 'p95 (s)': round(s['p95'], 3), 'max (s)': round(s['max'], 3)}
+            for name, s in sorted(snapshot['phases'].items(), key=lambda kv: -kv[1]['total'])
+        ]), use_container_width=True, hide_index=True)
+    if snapshot['counters']:
+        st.caption("Events — " + ", ".join(f"{name}: {n}" for name, n in sorted(snapshot['counters'].items())))
 
 # Main UI
 col1, col2 = st.columns([2, 1])
@@ -411,12 +139,122 @@ with col1:
         max_results = st.slider(
             "Max results per keyword",
             min_value=10,
-            max_value=100,
+            max_value=120,
             value=20,
             step=10,
-            help="Maximum number of results to scrape for each keyword"
+            help="Maximum number of results to scrape for each keyword (Google Maps stops at about 120 per search)"
+        )
+        
+        with st.expander("🧭 City-wide tiling"):
+            tiling = st.checkbox(
+                "Tile the location",
+                value=False,
+                help="Search a grid of map viewports instead of one search, splitting busy tiles, "
+                     "to get past the ~120 results Maps returns per search"
+            )
+            bbox_input = st.text_input(
+                "Bounding box (south,west,north,east)",
+                value="",
+                help=f"Leave empty to use the built-in box for: {', '.join(sorted(LOCATION_BBOXES))}"
+            )
+            tiled_max_results = st.number_input(
+                "Max results per keyword when tiling",
+                min_value=100,
+                max_value=50000,
+                value=2000,
+                step=100
+            )
+        
+        pool_size = st.slider(
+            "Parallel browsers",
+            min_value=1,
+            max_value=MAX_POOL_SIZE,
+            value=min(DEFAULT_POOL_SIZE, MAX_POOL_SIZE),
+            step=1,
+            help="Number of headless Chrome instances scraping keywords in parallel (default from SCRAPER_POOL_SIZE)"
+        )
+        
+        mode = st.radio(
+            "Extraction mode",
+            options=EXTRACTION_MODES,
+            format_func=lambda name: {
+                'full': "Full (open every listing)",
+                'fast': "Fast (read result cards, open listings only for missing fields)",
+                'network': "Network (fast, plus the search data Maps loads in the background)",
+            }[name],
+            horizontal=True
+        )
+        
+        fields = st.multiselect(
+            "Fields to collect (fast and network mode)",
+            options=RESULT_FIELDS,
+            default=['name', 'link', 'rating', 'reviews', 'category', 'status', 'address'],
+            help="Phone, website and opening hours are not shown on result cards and need a detail visit"
+        )
+        
+        extractor = st.selectbox(
+            "Field extractor",
+            options=list(DETAIL_EXTRACTORS),
+            format_func=lambda name: {
+                'js': "JavaScript (one round trip per listing)",
+                'webdriver': "WebDriver (one round trip per field)",
+            }[name],
+            help="Extraction latency per listing is reported in the debug logs for comparison"
+        )
+        
+        detail_tabs = st.number_input(
+            "Detail tabs per browser",
+            min_value=1,
+            max_value=8,
+            value=1,
+            step=1,
+            help="Place pages loaded in parallel in each browser before extracting them one by one"
+        )
+        
+        force_refresh = st.checkbox(
+            "Force refresh",
+            value=False,
+            help=f"Ignore cached results (kept for {CACHE_TTL_HOURS:g}h) and scrape everything again"
+        )
+        
+        lean_profile = st.checkbox(
+            "Lean browsing",
+            value=DEFAULT_LEAN_PROFILE,
+            help="Block images, media, fonts and map tiles and use a smaller window; only text is scraped"
+        )
+        
+        verbose_logs = st.checkbox(
+            "Verbose logs",
+            value=False,
+            help="Also log every scroll, page load and extracted field (slower with many results)"
+        )
+        
+        log_jsonl = st.checkbox(
+            "Save JSONL log",
+            value=False,
+            help="Write every log record as JSON to log.jsonl in the job's checkpoint folder"
+        )
+        
+        save_snapshots = st.checkbox(
+            "Save page snapshots",
+            value=False,
+            help="Keep each detail page's HTML (compressed) in the job's checkpoint folder, so fields can be "
+                 "re-extracted later with reextract_cli.py without scraping again"
         )
         
+        with st.expander("⏱️ Wait timeouts (seconds)"):
+            wait_timeouts = {}
+            for wait_name, default_timeout in DEFAULT_WAIT_TIMEOUTS.items():
+                wait_timeouts[wait_name] = st.number_input(
+                    wait_name.replace('_', ' ').capitalize(),
+                    min_value=1,
+                    max_value=120,
+                    value=default_timeout,
+                    step=1,
+                    key=f"wait_timeout_{wait_name}",
+                    help="Upper bound; the scraper continues as soon as the page is ready"
+                )
+        
         submit_button = st.form_submit_button("🚀 Start Scraping", use_container_width=True)
     
     st.markdown('</div>', unsafe_allow_html=True)
@@ -438,9 +276,55 @@ with col2:
     
     **Note:** Scraping may take several minutes depending on the number of keywords and results.
     """)
+    pool_stats = get_driver_pool().stats()
+    st.caption(f"🔥 Warm browser sessions: {pool_stats['running']} running, {pool_stats['idle']} idle, "
+               f"{pool_stats['recycled']} recycled")
     st.markdown('</div>', unsafe_allow_html=True)
 
+manager = get_job_manager()
+
+def attach_job(job_id):
+    """Follow a job in this session and in the URL, so a reload comes back to it"""
+    st.session_state.job_id = job_id
+    st.experimental_set_query_params(job=job_id)
+
+# Interrupted jobs can be resumed from their checkpoint
+resume_job = None
+active_checkpoints = manager.active_checkpoints()
+interrupted_jobs = [job for job in CheckpointStore.list_jobs() if job['job_id'] not in active_checkpoints]
+if interrupted_jobs:
+    with st.expander(f"♻️ Resume an interrupted job ({len(interrupted_jobs)})"):
+        resume_job = st.selectbox(
+            "Interrupted job",
+            interrupted_jobs,
+            format_func=lambda job: (
+                f"{datetime.fromtimestamp(job['started_at']).strftime('%Y-%m-%d %H:%M')} — "
+                f"{len(job['done_keywords'])}/{len(job['params']['keywords'])} keywords done — "
+                f"{', '.join(job['params']['keywords'])} in {job['params']['location']}"
+            )
+        )
+        if not st.button("▶️ Resume selected job", use_container_width=True):
+            resume_job = None
+
+# Jobs of every session; any of them can be followed from here
+listed_jobs = manager.jobs()
+if listed_jobs:
+    running = sum(job.state == 'running' for job in listed_jobs)
+    queued = sum(job.state == 'queued' for job in listed_jobs)
+    with st.expander(f"🗂️ Jobs ({running} running, {queued} queued, limit {manager.max_concurrent} at a time)"):
+        for listed in listed_jobs:
+            job_col, action_col = st.columns([4, 1])
+            job_col.markdown(
+                f"**{listed.state}** — {', '.join(listed.params['keywords'])} in {listed.params['location']} — "
+                f"{listed.completed}/{listed.total} keywords, {listed.result_count} results "
+                f"(submitted {datetime.fromtimestamp(listed.submitted_at).strftime('%H:%M:%S')})"
+            )
+            if listed.id != st.session_state.job_id and action_col.button("Follow", key=f"follow_{listed.id}"):
+                attach_job(listed.id)
+                st.rerun()
+
 # Scraping logic
+job_params = None
 if submit_button:
     keywords_list = [k.strip() for k in keywords_input.split('\n') if k.strip()]
     
@@ -449,36 +333,112 @@ if submit_button:
     elif not location:
         st.error("❌ Please enter a location")
     else:
-        st.session_state.scraping_complete = False
-        st.session_state.results_df = None
-        
-        st.markdown("---")
-        st.markdown("### 🔄 Scraping in Progress...")
-        
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        
-        # Create expandable log container
-        with st.expander("🔍 Debug Logs (Click to expand)", expanded=False):
-            log_container = st.empty()
-        
-        try:
-            results = scrape_google_maps(keywords_list, location, max_results, progress_bar, status_text, log_container)
-            
-            if results:
-                df = pd.DataFrame(results)
-                st.session_state.results_df = df
-                st.session_state.scraping_complete = True
-                
-                status_text.text(f"✅ Scraping complete! Found {len(results)} businesses")
-                progress_bar.progress(1.0)
-                
+        bbox = None
+        if tiling:
+            try:
+                bbox = resolve_bbox(bbox_input.strip() or location)
+            except ValueError as e:
+                st.error(f"❌ {e}")
             else:
-                st.warning("⚠️ No results found. Try different keywords or location.")
-                
-        except Exception as e:
-            st.error(f"❌ An error occurred: {str(e)}")
-            st.error("Please try again or adjust your search parameters.")
+                if bbox is None:
+                    st.error("❌ Enter a bounding box: this location has no built-in one")
+        if not tiling or bbox is not None:
+            job_params = {
+                'keywords': keywords_list, 'location': location,
+                'max_results': tiled_max_results if tiling else max_results,
+                'mode': mode, 'fields': fields, 'extractor': extractor, 'detail_tabs': detail_tabs,
+                'lean': lean_profile, 'tiling': tiling, 'bbox': bbox, 'tile_km': None, 'store': None,
+            }
+elif resume_job is not None:
+    job_params = dict({'lean': DEFAULT_LEAN_PROFILE, 'tiling': False, 'bbox': None, 'tile_km': None},
+                      **resume_job['params'], store=CheckpointStore.open(resume_job['job_id']))
+
+if job_params:
+    job = manager.submit(
+        job_params['keywords'], job_params['location'], job_params['max_results'],
+        wait_timeouts=wait_timeouts, pool_size=pool_size, extractor=job_params['extractor'],
+        mode=job_params['mode'], fields=job_params['fields'], detail_tabs=job_params['detail_tabs'],
+        force_refresh=force_refresh, store=job_params['store'],
+        log_level=logging.DEBUG if verbose_logs else logging.INFO, log_jsonl=log_jsonl, lean=job_params['lean'],
+        tiling=job_params['tiling'], bbox=job_params['bbox'], tile_km=job_params['tile_km'],
+        snapshots=save_snapshots,
+    )
+    attach_job(job.id)
+    st.session_state.scraping_complete = False
+    st.session_state.results_df = None
+
+job = manager.get(st.session_state.job_id) if st.session_state.job_id else None
+if st.session_state.job_id and job is None:
+    st.info("ℹ️ That job is no longer listed (the server restarted or it was cleaned up). "
+            "If it was interrupted, it can be resumed above.")
+    st.session_state.job_id = None
+    st.experimental_set_query_params()
+
+if job is not None and not job.finished:
+    st.markdown("---")
+    st.markdown("### 🔄 Scraping in Progress..." if job.state == 'running' else "### ⏳ Waiting for a free slot...")
+    
+    st.progress(job.completed / job.total if job.total else 0.0)
+    if job.cancel_event.is_set():
+        st.text("🛑 Cancelling after the current pages...")
+    elif job.status:
+        st.text(f"{job.status} ({job.completed}/{job.total} keywords done)")
+    elif job.state == 'queued':
+        st.text(f"Queued — at most {manager.max_concurrent} jobs run at a time")
+    
+    metric_col, cancel_col = st.columns([3, 1])
+    metric_col.metric("Results so far", job.result_count)
+    if not job.cancel_event.is_set() and cancel_col.button("🛑 Cancel job", use_container_width=True):
+        job.cancel()
+    
+    if job.recent_rows:
+        st.markdown("#### Latest results")
+        st.dataframe(pd.DataFrame(list(job.recent_rows)[-10:]), use_container_width=True)
+    
+    timing = job.timer.snapshot()
+    if timing['phases']:
+        with st.expander("⏱️ Timing breakdown (finished keywords)", expanded=False):
+            show_timing(timing)
+    
+    with st.expander("🔍 Debug Logs (Click to expand)", expanded=False):
+        if job.log_buffer is not None:
+            st.code(job.log_buffer.snapshot(LOG_UI_LINES)[1], language=None)
+    
+    # Poll: the job runs in the background, so this session can rerun freely
+    time.sleep(JOB_POLL_INTERVAL)
+    st.rerun()
+
+if job is not None and job.finished and st.session_state.loaded_job_id != job.id:
+    st.session_state.loaded_job_id = job.id
+    st.session_state.cache_stats = job.cache_stats
+    st.session_state.timing = job.timer.snapshot()
+    if job.pages.pages:
+        st.session_state.page_stats[job.pages.profile] = job.pages.summary()
+    
+    if job.state == 'failed':
+        st.error(f"❌ An error occurred: {job.error}")
+        st.error("Please try again or adjust your search parameters.")
+    elif job.result_count:
+        # Only the preview rows are read from the checkpoint store; exports stream from it
+        store = CheckpointStore(job.store.job_dir)
+        try:
+            st.session_state.results_df = results_frame(itertools.islice(store.iter_results(), PREVIEW_ROWS))
+        finally:
+            store.close()
+        st.session_state.job_dir = job.store.job_dir
+        st.session_state.exports = {'csv': job.csv_path}
+        st.session_state.summary = job.summary.as_dict()
+        st.session_state.scraping_complete = True
+    else:
+        st.warning("⚠️ No results found. Try different keywords or location.")
+    
+    if job.state == 'cancelled':
+        st.warning(f"🛑 Job cancelled with {job.result_count} results; it can be resumed from the list above.")
+    elif job.state == 'partial':
+        st.warning(f"⚠️ {len(job.failed_keywords)} keyword(s) failed: {', '.join(job.failed_keywords)}. "
+                   "The job can be resumed from the list above.")
+    elif job.state == 'complete' and job.result_count:
+        st.success(f"✅ Scraping complete! Found {job.result_count} businesses")
 
 # Display results
 if st.session_state.scraping_complete and st.session_state.results_df is not None:
@@ -486,41 +446,60 @@ if st.session_state.scraping_complete and st.session_state.results_df is not Non
     st.markdown("### 📊 Results Preview")
     
     df = st.session_state.results_df
+    summary = st.session_state.summary
     
-    # Stats
+    # Stats, accumulated by the job as rows came in
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric("Total Results", len(df))
+        st.metric("Total Results", summary['total'])
     with col2:
-        st.metric("With Phone", df['phone'].notna().sum())
+        st.metric("With Phone", summary['with_phone'])
     with col3:
-        st.metric("With Website", df['website'].notna().sum())
+        st.metric("With Website", summary['with_website'])
     with col4:
-        # Extract rating calculation outside f-string to avoid backslash in f-string expression
-        try:
-            avg_rating = df['rating'].str.extract(r'(\d+\.?\d*)')[0].astype(float).mean()
-            rating_display = f"{avg_rating:.1f}" if not pd.isna(avg_rating) else "N/A"
-        except:
-            rating_display = "N/A"
-        st.metric("Avg Rating", rating_display)
+        st.metric("Avg Rating", "N/A" if summary['avg_rating'] is None else f"{summary['avg_rating']:.1f}")
+    
+    cache_stats = st.session_state.cache_stats
+    if cache_stats:
+        st.caption(f"💾 Cache — keywords: {cache_stats['query_hits']} hits / {cache_stats['query_misses']} misses, "
+                   f"places: {cache_stats['place_hits']} hits / {cache_stats['place_misses']} misses")
+    
+    # Last run with each profile, so lean and full browsing can be compared side by side
+    for profile, kinds in st.session_state.page_stats.items():
+        st.caption(f"📶 Network ({profile} profile) — " + ", ".join(
+            f"{kind} pages: {s['pages']} × {s['mean_kb']:.0f} KB, {s['mean_seconds']:.1f}s load"
+            for kind, s in kinds.items()))
+    
+    timing = st.session_state.timing
+    if timing and timing['phases']:
+        with st.expander("⏱️ Timing breakdown", expanded=False):
+            show_timing(timing)
     
     # Preview table
-    st.dataframe(df.head(10), use_container_width=True)
+    st.dataframe(df, use_container_width=True)
     
-    # Download button
-    csv = df.to_csv(index=False).encode('utf-8')
+    # Download button: each format is exported from the checkpoint once, then served from disk
+    format_label = st.radio("Download format", list(DOWNLOAD_FORMATS), horizontal=True)
+    fmt, mime = DOWNLOAD_FORMATS[format_label]
+    if fmt not in st.session_state.exports:
+        store = CheckpointStore(st.session_state.job_dir)
+        try:
+            st.session_state.exports[fmt] = store.export(fmt)[0]
+        finally:
+            store.close()
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"google_maps_scrape_{timestamp}.csv"
+    filename = f"google_maps_scrape_{timestamp}{EXPORT_FORMATS[fmt]}"
     
-    st.download_button(
-        label="📥 Download Full CSV",
-        data=csv,
-        file_name=filename,
-        mime="text/csv",
-        use_container_width=True
-    )
+    with open(st.session_state.exports[fmt], 'rb') as export_file:
+        st.download_button(
+            label=f"📥 Download Full {format_label}",
+            data=export_file,
+            file_name=filename,
+            mime=mime,
+            use_container_width=True
+        )
     
-    st.success(f"✅ Ready to download! File contains {len(df)} business records.")
+    st.success(f"✅ Ready to download! File contains {summary['total']} business records.")
 
 # Footer
 st.markdown("---")
@@ -0,0 +1,55 @@
+"""Claims, releases and merges of the job-wide DedupIndex"""
+from maps_scraper import DedupIndex
+
+def row(name, keyword):
+    return {'name': name, 'address': "No. 33, Yitong St", 'keyword': keyword}
+
+def recording_index():
+    rows, merges = [], []
+    index = DedupIndex(lambda key, row, keywords: rows.append((key, keywords)),
+                       lambda key, keyword: merges.append((key, keyword)))
+    return index, rows, merges
+
+def test_duplicate_claims_merge_into_the_row():
+    index, rows, _ = recording_index()
+    key = DedupIndex.key_for("https://www.google.com/maps/place/x/data=!1s0x1:0x2")
+    assert index.claim(key, 'a')
+    assert not index.claim(key, 'b')
+    assert index.add(key, row("Fika", 'a'))
+    assert rows == [(key, ['a', 'b'])]
+    assert index.keyword_counts == {'a': 1, 'b': 1}
+
+def test_released_claim_keeps_merged_keywords():
+    index, rows, _ = recording_index()
+    key = DedupIndex.key_for("https://www.google.com/maps/place/x/data=!1s0x1:0x2")
+    assert index.claim(key, 'a')
+    assert not index.claim(key, 'b')
+    index.release(key)
+    assert not index.has_row(key)
+    # The retried search claims the place again and extracts it
+    assert index.claim(key, 'a')
+    assert not index.claim(key, 'c')
+    assert index.add(key, row("Fika", 'a'))
+    assert rows == [(key, ['a', 'b', 'c'])]
+    assert index.keyword_counts == {'a': 1, 'b': 1, 'c': 1}
+
+def test_released_claim_goes_to_the_next_keyword():
+    index, rows, _ = recording_index()
+    key = DedupIndex.key_for("https://www.google.com/maps/place/x/data=!1s0x1:0x2")
+    assert index.claim(key, 'a')
+    assert not index.claim(key, 'b')
+    index.release(key)
+    assert index.claim(key, 'b')
+    assert index.add(key, row("Fika", 'b'))
+    assert rows == [(key, ['b', 'a'])]
+
+def test_release_after_add_keeps_the_row():
+    index, rows, merges = recording_index()
+    key = DedupIndex.key_for("https://www.google.com/maps/place/x/data=!1s0x1:0x2")
+    assert index.claim(key, 'a')
+    assert index.add(key, row("Fika", 'a'))
+    index.release(key)
+    assert index.has_row(key)
+    assert not index.claim(key, 'b')
+    assert len(rows) == 1
+    assert merges == [(key, 'b')]
@@ -0,0 +1,114 @@
+"""Background jobs run by JobManager, with the browser work replaced by a fake scrape_keyword"""
+import csv
+import inspect
+import time
+
+import pytest
+
+import maps_scraper
+from maps_scraper import RESULT_FIELDS, CheckpointStore, DedupIndex, DriverPool, JobCancelled, JobManager
+
+class FakeDriver:
+    window_handles = ['tab']
+
+    def quit(self):
+        pass
+
+def fake_rows(keyword, location, count, start=0):
+    rows = []
+    for i in range(start, start + count):
+        row = {field: "" for field in RESULT_FIELDS}
+        row.update(name=f"Cafe {i}", link=f"https://www.google.com/maps/place/x/data=!1s0x{i + 1:x}:0x1",
+                   phone="02 2507 0633" if i % 2 else "", rating=4.5, keyword=keyword, location=location,
+                   scraped_at="2024-01-01 12:00:00")
+        rows.append(row)
+    return rows
+
+@pytest.fixture
+def manager():
+    manager = JobManager(max_concurrent=1, pool=DriverPool(1, factory=lambda lean, capture: FakeDriver()))
+    yield manager
+    manager.defaults['pool'].close()
+
+def run(manager, tmp_path, keywords):
+    store = CheckpointStore.create({'keywords': keywords}, root=str(tmp_path))
+    job = manager.submit(keywords, "taipei", 20, store=store, pool_size=1, log_level=30)
+    deadline = time.time() + 10
+    while not job.finished and time.time() < deadline:
+        time.sleep(0.05)
+    assert job.finished
+    return job
+
+def test_cancelled_job_summary_matches_export(manager, tmp_path, monkeypatch):
+    signature = inspect.signature(maps_scraper.scrape_keyword)
+
+    def scrape_keyword(*args, **kwargs):
+        call = signature.bind(*args, **kwargs).arguments
+        results = []
+        for row in fake_rows(call['keyword'], call['location'], 5):
+            key = DedupIndex.key_for(row['link'])
+            if call['index'].claim(key, call['keyword']) and call['index'].add(key, row):
+                results.append(row)
+        # The job is cancelled while the first keyword's details are fetched
+        call['cancel'].set()
+        raise JobCancelled(results)
+
+    monkeypatch.setattr(maps_scraper, 'scrape_keyword', scrape_keyword)
+    job = run(manager, tmp_path, ["cafe", "tea"])
+
+    assert job.state == 'cancelled'
+    with open(job.csv_path, newline='', encoding='utf-8') as handle:
+        exported = list(csv.DictReader(handle))
+    assert len(exported) == 5
+    assert job.result_count == 5
+    summary = job.summary.as_dict()
+    assert summary['total'] == 5
+    assert summary['with_phone'] == sum(1 for row in exported if row['phone'])
+    assert summary['avg_rating'] == pytest.approx(4.5)
+    assert len(job.recent_rows) == 5
+
+def test_finished_job_summary_matches_export(manager, tmp_path, monkeypatch):
+    signature = inspect.signature(maps_scraper.scrape_keyword)
+
+    def scrape_keyword(*args, **kwargs):
+        call = signature.bind(*args, **kwargs).arguments
+        start = 0 if call['keyword'] == "cafe" else 3  # Two places shared between the keywords
+        results = []
+        for row in fake_rows(call['keyword'], call['location'], 5, start):
+            key = DedupIndex.key_for(row['link'])
+            if call['index'].claim(key, call['keyword']) and call['index'].add(key, row):
+                results.append(row)
+        return results
+
+    monkeypatch.setattr(maps_scraper, 'scrape_keyword', scrape_keyword)
+    job = run(manager, tmp_path, ["cafe", "tea"])
+
+    assert job.state == 'complete'
+    assert job.result_count == 8
+    assert job.summary.total == 8
+
+@pytest.mark.parametrize('failing', ['log_phase_summary', 'export'])
+def test_failed_job_closes_its_store_and_log(manager, tmp_path, monkeypatch, failing):
+    handlers = []
+
+    class RecordingHandler(maps_scraper.JsonlLogHandler):
+        def __init__(self, path):
+            super().__init__(path)
+            handlers.append(self)
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(maps_scraper, 'scrape_keyword', lambda *args, **kwargs: [])
+    monkeypatch.setattr(maps_scraper, 'JsonlLogHandler', RecordingHandler)
+    if failing == 'export':
+        monkeypatch.setattr(CheckpointStore, 'export', fail)
+    else:
+        monkeypatch.setattr(maps_scraper, failing, fail)
+    manager.defaults['log_jsonl'] = True
+    job = run(manager, tmp_path, ["cafe"])
+
+    assert job.state == 'failed'
+    assert job.error == "disk full"
+    assert job.store._records.closed and job.store._manifest.closed
+    assert len(handlers) == 1 and handlers[0]._file.closed
@@ -0,0 +1,101 @@
+"""Decoding of Maps search payloads ('network' extraction mode)
+
+The fixtures are trimmed by hand to the parts of Maps' web client layout the
+decoder reads: search_payload.txt is a /search?tbm=map response body,
+search_document.html a search page with its first page of results, and
+search_payload_drifted.txt a body whose place arrays no longer match
+PAYLOAD_FIELD_PATHS.
+"""
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from maps_scraper import (
+    MAPS_BASE_URL, RESULT_FIELDS, PhaseTimer, decode_search_document, decode_search_payload,
+    merge_payload_places, place_key,
+)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+FIKA_ID = "0x3442a96b1c2b1b2d:0x5e9f8f0b2e1a4c11"
+KAFFA_ID = "0x3442a9a7d7d3f0c5:0x8a3c9b1d40e2f6a7"
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as handle:
+        return handle.read()
+
+def dom_card(name, feature_id, **fields):
+    card = {field: "" for field in RESULT_FIELDS}
+    card.update(name=name, link=f"{MAPS_BASE_URL}/place/{name.replace(' ', '+')}/data=!4m7!3m6!1s{feature_id}!8m2",
+                **fields)
+    return card
+
+def capture_of(*bodies):
+    places = {}
+    for body in bodies:
+        for item in decode_search_payload(body):
+            places.setdefault(place_key(item['link']), item)
+    return SimpleNamespace(places=places, responses=len(bodies), errors=0)
+
+def test_decodes_search_payload():
+    fika, kaffa = decode_search_payload(fixture('search_payload.txt'))
+    assert fika['name'] == "Fika Fika Cafe"
+    assert fika['link'] == f"{MAPS_BASE_URL}/place/Fika+Fika+Cafe/data=!4m2!3m1!1s{FIKA_ID}"
+    assert place_key(fika['link']) == FIKA_ID
+    assert fika['rating'] == 4.5
+    assert fika['reviews'] == 3821
+    assert fika['address'] == "No. 33, Yitong St, Zhongshan District, Taipei City, Taiwan 104"
+    assert fika['latitude'] == pytest.approx(25.0523497)
+    assert fika['longitude'] == pytest.approx(121.5321054)
+    assert fika['status'] == "Open"
+    assert fika['category'] == "Coffee shop"
+    assert fika['phone'] == "02 2507 0633"
+    assert fika['opening_hours'].startswith("Monday, 8 AM–9 PM; Tuesday, 8 AM–9 PM")
+
+    assert kaffa['name'] == "Simple Kaffa"
+    assert place_key(kaffa['link']) == KAFFA_ID
+    assert (kaffa['rating'], kaffa['reviews']) == (4.4, 10987)
+    # Address lines are used when the one-line address is missing
+    assert kaffa['address'] == "No. 1, Section 1, Zhongxiao W Rd, Zhongzheng District, Taipei City 100"
+    assert (kaffa['latitude'], kaffa['longitude']) == pytest.approx((25.0443126, 121.5297233))
+    assert kaffa['website'] == "https://www.simplekaffa.com/"
+    assert kaffa['phone'] == ""
+
+def test_decodes_search_document():
+    places = decode_search_document(fixture('search_document.html'))
+    assert [place['name'] for place in places] == ["Fika Fika Cafe"]
+    assert place_key(places[0]['link']) == FIKA_ID
+
+@pytest.mark.parametrize('body', ["", "<html></html>", ")]}'\n[1, 2", '{"c": 0, "d": 7}'])
+def test_unreadable_payload_decodes_to_nothing(body):
+    assert decode_search_payload(body) == []
+
+def test_drifted_layout_yields_no_wrong_values():
+    places = decode_search_payload(fixture('search_payload_drifted.txt'))
+    # The shifted place array has no feature id where one is expected and is skipped
+    assert [place_key(place['link']) for place in places] == [KAFFA_ID]
+    kaffa = places[0]
+    assert kaffa['name'] == "Simple Kaffa"
+    for field in ['rating', 'reviews', 'status', 'address', 'website', 'phone', 'opening_hours', 'category',
+                  'latitude', 'longitude']:
+        assert kaffa[field] == "", field
+
+def test_merge_fills_cards_from_payload():
+    cards = [dom_card("Fika Fika Cafe", FIKA_ID, rating="4.5", reviews="(3,821)", category="Cafe")]
+    merge_payload_places(cards, capture_of(fixture('search_payload.txt')), lambda message: None, PhaseTimer())
+    assert cards[0]['rating'] == 4.5
+    assert cards[0]['reviews'] == 3821
+    assert cards[0]['category'] == "Coffee shop"
+    assert cards[0]['phone'] == "02 2507 0633"
+    # Coordinates have no result column
+    assert 'latitude' not in cards[0] and 'longitude' not in cards[0]
+
+def test_merge_keeps_dom_values_when_payload_drifted():
+    dom = dict(rating="4.4", reviews="(10,987)", category="Coffee shop", address="No. 1, Sec. 1, Zhongxiao W Rd")
+    cards = [dom_card("Simple Kaffa", KAFFA_ID, **dom), dom_card("Fika Fika Cafe", FIKA_ID, rating="4.5")]
+    timer = PhaseTimer()
+    merge_payload_places(cards, capture_of(fixture('search_payload_drifted.txt')), lambda message: None, timer)
+    assert {field: cards[0][field] for field in dom} == dom
+    assert cards[0]['name'] == "Simple Kaffa"
+    assert cards[1]['rating'] == "4.5"
+    assert cards[1]['phone'] == ""
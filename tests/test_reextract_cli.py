@@ -0,0 +1,36 @@
+"""Merging re-extracted snapshot values into a job's stored rows"""
+import os
+
+from maps_scraper import RESULT_FIELDS, CheckpointStore
+from reextract_cli import merged_rows
+
+def link(i):
+    return f"https://www.google.com/maps/place/x/data=!4m7!3m6!1s0x{i:x}:0x1!8m2"
+
+def stored_row(i, **fields):
+    row = {field: "" for field in RESULT_FIELDS}
+    row.update(name=f"Cafe {i}", link=link(i), keyword="cafe", location="taipei", **fields)
+    return row
+
+def test_merged_rows_replace_re_extracted_fields(tmp_path):
+    job_dir = str(tmp_path / "job")
+    store = CheckpointStore(job_dir)
+    store.append_row("id:1", stored_row(1, phone="old", status="Open"), ["cafe"])
+    store.append_row("id:2", stored_row(2, phone="kept"), ["cafe"])
+    store.append_merge("id:1", "tea")
+    store.close()
+    os.remove(os.path.join(job_dir, CheckpointStore.MANIFEST_FILE))
+    items = [
+        {'name': "Cafe 1", 'link': link(1), 'phone': "first", 'status': ""},
+        {'name': "Cafe 1", 'link': link(1), 'phone': "02 2507 0633", 'status': ""},  # Later snapshot wins
+        {'name': "Cafe 3", 'link': link(3), 'phone': "not in the job"},
+    ]
+
+    rows = list(merged_rows([job_dir], iter(items), ['phone', 'status']))
+
+    assert [(row['name'], row['phone'], row['status'], row['keyword']) for row in rows] == [
+        ("Cafe 1", "02 2507 0633", "Open", "cafe; tea"),
+        ("Cafe 2", "kept", "", "cafe"),
+    ]
+    # The job directory is only read
+    assert sorted(os.listdir(job_dir)) == [CheckpointStore.RECORDS_FILE]
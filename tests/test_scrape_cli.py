@@ -0,0 +1,56 @@
+"""scrape_cli.main() end to end, with the browser work replaced by a fake scrape_keyword"""
+import csv
+import inspect
+import os
+import signal
+import threading
+import time
+
+import maps_scraper
+import scrape_cli
+from maps_scraper import RESULT_FIELDS, DedupIndex, DriverPool, JobCancelled
+
+class FakeDriver:
+    window_handles = ['tab']
+
+    def quit(self):
+        pass
+
+def test_ctrl_c_stops_the_run_and_writes_the_rows_found(tmp_path, monkeypatch):
+    signature = inspect.signature(maps_scraper.scrape_keyword)
+    searched = []
+
+    def scrape_keyword(*args, **kwargs):
+        call = signature.bind(*args, **kwargs).arguments
+        searched.append(call['keyword'])
+        results = []
+        for i in range(2):
+            row = {field: "" for field in RESULT_FIELDS}
+            row.update(name=f"{call['keyword']} {i}", keyword=call['keyword'], location=call['location'],
+                       link=f"https://www.google.com/maps/place/x/data=!1s0x{len(searched):x}:0x{i + 1:x}")
+            key = DedupIndex.key_for(row['link'])
+            if call['index'].claim(key, call['keyword']) and call['index'].add(key, row):
+                results.append(row)
+        # A slow detail phase that honours the cancel event like the real one
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            if call['cancel'].is_set():
+                raise JobCancelled(results)
+            time.sleep(0.05)
+        return results
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(maps_scraper, 'scrape_keyword', scrape_keyword)
+    monkeypatch.setattr(scrape_cli, 'DriverPool', lambda size: DriverPool(size, factory=lambda lean, capture: FakeDriver()))
+    output = tmp_path / "out.csv"
+    threading.Timer(0.5, os.kill, (os.getpid(), signal.SIGINT)).start()
+    start = time.time()
+    code = scrape_cli.main(['-k', 'a', '-k', 'b', '-k', 'c', '-l', 'Taipei', '-p', '1', '--no-cache', '-q',
+                            '-o', str(output)])
+
+    assert code == scrape_cli.EXIT_INTERRUPTED
+    assert time.time() - start < 3
+    assert searched == ['a']
+    with open(output, newline='', encoding='utf-8') as handle:
+        assert [row['name'] for row in csv.DictReader(handle)] == ["a 0", "a 1"]
+    assert signal.getsignal(signal.SIGINT) is signal.default_int_handler
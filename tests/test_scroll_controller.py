@@ -0,0 +1,50 @@
+"""ScrollController against a scripted results feed"""
+import logging
+
+from maps_scraper import FEED_STATE_JS, SCROLL_FEED_JS, ScrapeLog, ScrollController, WaitEngine
+
+class FakeFeed:
+    """A results feed that appends a page of cards per scroll and shows the end marker after the last one"""
+
+    def __init__(self, total, page=20):
+        self.total = total
+        self.page = page
+        self.loaded = min(total, page)
+
+    def link(self, i):
+        return f"https://www.google.com/maps/place/x/data=!1s0x{i + 1:x}:0x1"
+
+    def execute_script(self, script, *args):
+        end = self.loaded >= self.total
+        if script == SCROLL_FEED_JS:
+            known, scroll = args[3], args[6]
+            state = {'count': self.loaded, 'links': [self.link(i) for i in range(known, self.loaded)], 'end': end}
+            if scroll:
+                self.loaded = min(self.total, self.loaded + self.page)
+            return state
+        if script == FEED_STATE_JS:
+            return {'count': self.loaded, 'end': end}
+        raise AssertionError("unexpected script")
+
+def scroller(feed, target):
+    waits = WaitEngine(feed, {'feed_growth': 0.5}, poll_frequency=0.01)
+    return ScrollController(feed, waits, target, ScrapeLog(logging.getLogger("maps_scraper"), {})), waits
+
+def test_stops_on_the_scroll_that_reaches_the_end():
+    controller, waits = scroller(FakeFeed(60), target=200)
+    assert len(controller.run()) == 60
+    # The second scroll loads the last page; no third scroll just to see the marker
+    assert [state for state, _, _ in controller.steps] == ['growth', 'end']
+    assert controller.stats()['end']
+    assert waits.timeouts_hit['feed_growth'] == 0
+
+def test_end_already_visible_needs_no_scroll():
+    controller, _ = scroller(FakeFeed(15), target=200)
+    assert len(controller.run()) == 15
+    assert controller.steps == []
+    assert controller.end
+
+def test_stops_at_the_target():
+    controller, _ = scroller(FakeFeed(500), target=50)
+    assert len(controller.run()) == 60
+    assert not controller.end